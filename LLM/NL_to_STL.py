@@ -25,6 +25,8 @@ class NL_to_STL:
     -------
     get_specs(messages)
         Extracts the STL specification from the latest GPT response.
+    get_candidate_specs(messages, k)
+        Extracts the STL specification and asks GPT for alternative specifications.
     gpt_conversation(...)
         Conducts a GPT-powered conversation to refine natural language into specifications.
     gpt_syntax_checker(spec)
@@ -35,6 +37,8 @@ class NL_to_STL:
         Replaces placeholders in instructions with specific variables.
     extract_spec(response)
         Extracts the STL specification from a GPT response.
+    extract_all_specs(response)
+        Extracts all STL specifications from a GPT response.
     spec_accepted_check(response)
         Checks if a GPT response contains <accepted> or <rejected>.
     """
@@ -81,6 +85,40 @@ class NL_to_STL:
         spec = self.extract_spec(response)
         return spec
 
+    def get_candidate_specs(self, messages, k):
+        """
+        Extracts the STL specification from the latest GPT response, and asks GPT for alternative
+        specifications of the same task, to solve them as a portfolio (see `STL.portfolio`).
+        The alternatives are requested outside of the conversation, `messages` is not changed.
+
+        Parameters
+        ----------
+        messages : list of dict
+            List of message dictionaries from the GPT conversation.
+        k : int
+            Maximum number of candidate specifications.
+
+        Returns
+        -------
+        list of str
+            Distinct candidate specifications, the extracted specification first.
+        """
+        candidates = [self.get_specs(messages)]
+        if k <= 1:
+            return candidates
+
+        print(f"Requesting {k-1} alternative specifications...")
+        request = messages + [{
+            "role": "system",
+            "content": f"Please return {k-1} alternative specifications for the same task, that differ in how "
+                       "the task is interpreted or encoded. Return each specification between < and >."
+            }]
+        response = self.gpt.chatcompletion(request)
+        for spec in self.extract_all_specs(response):
+            if spec not in candidates and len(candidates) < k:
+                candidates.append(spec)
+        return candidates
+
     def gpt_conversation(self, 
                          instructions_file, 
                          max_inputs=10, 
@@ -89,6 +127,7 @@ class NL_to_STL:
                          status="active", 
                          automated_user=False, 
                          automated_user_input="",
+                         background_solve=None,
                          ):
         """
         Conducts a GPT-powered conversation to refine natural language into STL specifications.
@@ -109,6 +148,9 @@ class NL_to_STL:
             Whether to simulate an automated user providing predefined input (default is False).
         automated_user_input : str, optional
             Input for the automated user (default is an empty string).
+        background_solve : SolveHandle, optional
+            Trajectory generation of the previous specification that is still running. It is cancelled
+            as soon as a new specification is generated (default is None).
 
         Returns
         -------
@@ -136,6 +178,9 @@ class NL_to_STL:
         else:
             if not automated_user:
                 print("Please specify the task. Type 'quit' to exit conversation and generate the final trajectory.")
+                if background_solve is not None and not background_solve.done():
+                    print(color_text("The previous trajectory is still being generated,", 'yellow'), 
+                          "a new specification will cancel it.")
                 for _ in range(max_inputs):
                     user_input = input(color_text("User: ", 'orange'))
 
@@ -152,6 +197,9 @@ class NL_to_STL:
                     # check if < or > symbol is present in the response and exit conversation if detected
                     if '<' in response:
                         print("The final response was generated.")
+                        if background_solve is not None and not background_solve.done():
+                            background_solve.cancel(timeout=0) # main waits for the worker before the next solve
+                            print(color_text("The previous trajectory generation is cancelled.", 'yellow'))
                         break
             else:
                 print(color_text("Automated user: ", 'orange'), automated_user_input)
@@ -252,7 +300,30 @@ class NL_to_STL:
         str
             Extracted STL specification.
         """
-        last_spec = ""
+        specs = self.extract_all_specs(response)
+
+        # Check if a specification was found; raise an error if not
+        if not specs:
+            raise ValueError("No specification found in the response.")
+
+        # Return the last specification
+        return specs[-1]
+
+    def extract_all_specs(self, response):
+        """
+        Extracts all STL specifications (between <...>) from a GPT response.
+
+        Parameters
+        ----------
+        response : str
+            GPT response containing the STL specifications.
+
+        Returns
+        -------
+        list of str
+            Extracted STL specifications, in order of appearance.
+        """
+        specs = []
         start = 0
 
         while True:
@@ -262,15 +333,12 @@ class NL_to_STL:
             end = response.find(">", start)
             if end == -1:
                 break
-            last_spec = response[start + 1:end]  # Extract content between < and >
+            spec = response[start + 1:end]  # Extract content between < and >
+            if spec:
+                specs.append(spec.replace("\n", " ")) # Clean the found specification
             start = end + 1  # Move forward to continue searching
 
-        # Check if a specification was found; raise an error if not
-        if not last_spec:
-            raise ValueError("No specification found in the response.")
-
-        # Clean and return the found specification
-        return last_spec.replace("\n", " ")
+        return specs
     
     def spec_accepted_check(self, response):
         """
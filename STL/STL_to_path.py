@@ -1,7 +1,22 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
 import numpy as np
 from stlpy.systems import LinearSystem
-from stlpy.STL import LinearPredicate, NonlinearPredicate
-from stlpy.solvers import GurobiMICPSolver
+from stlpy.STL import LinearPredicate, STLTree
+from STL.backends import SolveResult, get_backend
+from STL.reachability import ReachabilityAnalyzer, SpecInfeasibleError
+from STL.batch import BatchResult, solve_batch_parallel
+from STL.simplify import SimplificationReport, simplify_spec, count_binaries
+from STL.pruning import ObstaclePruner
+from STL.free_space import decompose_free_space, split_avoidance
+from STL.warm_start import GraphSearchWarmStart
+from STL.bounds import derive_position_bounds, workspace_bounds
+from STL.spec_parser import SpecNode, SpecSyntaxError, SpecCompiler, parse_spec
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # relative cache directories start here
 
 class drone_dynamics:
     """
@@ -79,63 +94,645 @@ class drone_dynamics:
         return sys
     
 
+class TrajectoryCache:
+    """
+    A content-addressed cache for trajectories generated by the `STLSolver`.
+
+    Entries are keyed on a canonical form of the STL specification (object references are
+    resolved to their bounds and formatting is normalized) together with the solve inputs
+    x0, T, dt, max_acc and max_speed, and every solver and solve option that can change the returned
+    trajectory (see `STLSolver.cache_options`). The cache has two tiers: an in-memory LRU tier and an
+    optional on-disk tier where every entry is stored as a .npz file named after its key.
+    Infeasible results are cached as well, so a spec that is known to be infeasible is not solved again.
+
+    Parameters:
+        max_entries (int): Maximum number of entries in the in-memory tier. Default is 128.
+        cache_dir (str): Directory of the on-disk tier, relative to the repository unless it is absolute.
+                         None disables the on-disk tier. Default is None.
+
+    Attributes:
+        entries (OrderedDict): In-memory tier, mapping keys to (x, u) tuples in LRU order.
+        hits (int): Number of lookups answered by the in-memory tier.
+        disk_hits (int): Number of lookups answered by the on-disk tier.
+        misses (int): Number of lookups that required a new solve.
+
+    Methods:
+        make_key(spec, objects, x0, T, dt, max_acc, max_speed, **options):
+            Computes the cache key of a solve.
+        get(key):
+            Looks up a key. Returns (found, x, u).
+        put(key, x, u):
+            Stores a solve result. x and u are None for infeasible results.
+        stats():
+            Returns a dictionary with the hit and miss counters.
+    """
+
+    def __init__(self, max_entries=128, cache_dir=None):
+        self.max_entries = max_entries
+        if cache_dir is not None and not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(REPO_DIR, cache_dir) # independent of the working directory
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def canonical_spec(spec, objects):
+        """
+        Returns a canonical form of a specification.
+
+        The specification is parsed into its AST, which removes differences in whitespace,
+        quotes, parentheses and the order of conjunctions and disjunctions. References of the
+        form objects["name"] are resolved to the bounds of the object, so the canonical form
+        changes whenever the referenced geometry changes. Strings that cannot be parsed are
+        only whitespace-normalized.
+        """
+        if isinstance(spec, SpecNode):
+            return spec.to_string(canonical=True)
+        try:
+            return parse_spec(spec, objects).to_string(canonical=True)
+        except SpecSyntaxError:
+            return " ".join(spec.split())
+
+    def make_key(self, spec, objects, x0, T, dt, max_acc, max_speed, **options):
+        payload = {
+            'spec': self.canonical_spec(spec, objects),
+            'x0': [round(float(v), 9) for v in np.asarray(x0).ravel()],
+            'T': float(T),
+            'dt': float(dt),
+            'max_acc': float(max_acc),
+            'max_speed': float(max_speed),
+            'options': {k: repr(v) for k, v in sorted(options.items())},
+        }
+        encoded = json.dumps(payload, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            x, u = self.entries[key]
+            return True, x, u
+
+        path = self._path(key)
+        if path is not None and os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    feasible = bool(data['feasible'])
+                    x = data['x'] if feasible else None
+                    u = data['u'] if feasible else None
+            except (OSError, ValueError, KeyError):
+                pass # corrupt or partially written file: treat as a miss
+            else:
+                self.disk_hits += 1
+                self._remember(key, x, u)
+                return True, x, u
+
+        self.misses += 1
+        return False, None, None
+
+    def put(self, key, x, u):
+        self._remember(key, x, u)
+
+        path = self._path(key)
+        if path is not None:
+            feasible = x is not None
+            tmp_path = path[:-len('.npz')] + '.tmp.npz'
+            np.savez(tmp_path,
+                     x=x if feasible else np.empty((0,)),
+                     u=u if feasible else np.empty((0,)),
+                     feasible=feasible)
+            os.replace(tmp_path, path) # atomic, so readers never see a partial file
+
+    def stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
+
+    def _remember(self, key, x, u):
+        self.entries[key] = (x, u)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _path(self, key):
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+
 class STLSolver:
     """
     A solver for generating trajectories that satisfy Signal Temporal Logic (STL) specifications
-    using the `stlpy` library and Gurobi mixed-integer optimization.
+    using the `stlpy` library and mixed-integer optimization (see `micp_solver.py`).
+
+    The optimization problem is built and solved by a backend (see `backends.py`): Gurobi (default),
+    the open-source HiGHS solver, or `stlpy`'s gradient-based solver as a fast approximate mode.
+
+    The specification is parsed into an AST (see `spec_parser.py`) instead of being evaluated, so
+    malformed or malicious specifications raise a `SpecSyntaxError` before any optimization model is built.
+    Specifications that are kinematically infeasible raise a `SpecInfeasibleError` (see `reachability.py`).
 
     Parameters:
-        spec (str): STL specification as a string that defines the desired behavior.
+        spec (str or SpecNode): STL specification as a string (or parsed AST) that defines the desired behavior.
         objects (dict): Dictionary containing obstacle or goal definitions.
         x0 (numpy.ndarray): Initial state vector [x, y, z, vx, vy, vz]. Default is zeros.
         T (float): Total simulation time in seconds. Default is 10.
+        cache (TrajectoryCache): Optional cache of previously solved trajectories. Default is None.
+        backend (str or SolverBackend): Optimization backend, "gurobi", "highs" or "gradient". Default is "gurobi".
+        precheck (bool): Reject provably infeasible specifications with a `SpecInfeasibleError` before
+                         solving (see `reachability.py`). Default is True.
+        tight_bounds (bool): Bound the positions by the reachable set, the workspace and the cuboids the drone
+                             must stay inside, and derive the big-M constants from them (see `bounds.py`).
+                             Default is True.
+        session (PlanningSession): Optional session that keeps the Gurobi model between the solves of
+                                   `generate_trajectory` (see `session.py`). Default is None.
+        simplify (bool): Remove redundant parts of the specification before encoding it (see `simplify.py`).
+                         Default is True.
+        prune_obstacles (bool): Restrict the avoidance constraints to the reachable tube and add them lazily in
+                                `generate_trajectory` (see `pruning.py`). Default is False.
+        free_space (bool): Encode the top-level avoidance constraints as the position being inside one of the boxes
+                           of a decomposition of the free space of the workspace (see `free_space.py`), with the
+                           Gurobi and HiGHS backends. The positions are then restricted to the workspace (with a
+                           margin). Default is False.
+        graph_warm_start (bool): Plan a rough trajectory with A* on a voxel grid and use it as the MIP start of
+                                 `generate_trajectory`, with the Gurobi backend (see `warm_start.py`). Default is
+                                 False.
+        objective (str): Objective of the MICP, "quadratic" (control effort), "l1" or "linf" (linear control effort,
+                         an MILP) or "feasibility" (the first trajectory that satisfies the specification), see
+                         `backends.py`. Default is "quadratic".
+        spatial_index (SpatialIndex): Optional spatial index over the objects (see `Scenarios.spatial_index`), used
+                                      by the obstacle pruning. Default is None, which builds one when needed.
+
+    Attributes:
+        backend (SolverBackend): The backend, which records the build and solve time of every solve in `timings`.
+        result (SolveResult): Status, gap and trajectory of the last solve.
+        simplification (SimplificationReport): Binaries saved by simplifying the specification, None if disabled.
+        pruning (ObstaclePruner): The pruner of the last `generate_trajectory`, with its statistics, None if disabled.
+        decompositions (dict): The free space decompositions, by workspace and obstacles.
+        warm_start (GraphSearchWarmStart): The warm start of the last `generate_trajectory`, with its statistics,
+                                           None if disabled.
+        cancelled (bool): Whether `cancel` was called during the current trajectory generation.
 
     Methods:
-        generate_trajectory(dt, max_acc, max_speed, verbose=False, include_dynamics=True):
+        generate_trajectory(dt, max_acc, max_speed, verbose=False, include_dynamics=True, time_limit=None,
+                            mip_gap=None, feasible_first=False, incumbent_callback=None, threads=None):
             Generates a trajectory that satisfies the STL specification.
+        generate_trajectory_receding_horizon(dt, max_acc, max_speed, window=30, step=10, verbose=False):
+            Generates the trajectory by solving overlapping windows (see `receding_horizon.py`).
+        generate_trajectory_coarse_to_fine(dt, max_acc, max_speed, factor=4, fix_binaries=True, verbose=False):
+            Generates the trajectory by refining a solution at a coarser time step (see `multi_resolution.py`).
+        generate_trajectory_min_horizon(dt, max_acc, max_speed, N_min=1, verbose=False, time_limit=None, mip_gap=None):
+            Generates the trajectory with the smallest feasible number of time steps (see `horizon_search.py`).
+        generate_trajectory_batch(x0s, dt, max_acc, max_speed, ..., workers=1):
+            Generates trajectories from a batch of initial states with a shared model (see `batch.py`).
+        build_solver(spec_ast, x0, N, dt=None, bound_states=None):
+            Builds the optimization problem of a specification AST over N time steps.
+        solve(solver):
+            Solves a problem built by `build_solver`.
+        telemetry():
+            Returns the status and model statistics of the last solve with the shape of the specification.
+        cache_options():
+            Returns the solver and solve options that are part of the key of the solve cache.
 
     Returns:
         x (numpy.ndarray): State trajectory as a function of time.
         u (numpy.ndarray): Control inputs (accelerations) as a function of time.
     """
 
-    def __init__(self, spec, objects, x0 = np.zeros(6,), T=10):
+    def __init__(self, spec, objects, x0 = np.zeros(6,), T=10, cache=None, backend="gurobi", precheck=True,
+                 tight_bounds=True, session=None, simplify=True, prune_obstacles=False, free_space=False,
+                 graph_warm_start=False, objective="quadratic", spatial_index=None):
         self.objects = objects
         self.spec = spec
         self.x0 = x0
         self.T = T
+        self.cache = cache
+        self.backend = get_backend(backend) if isinstance(backend, str) else backend
+        self.precheck = precheck
+        self.tight_bounds = tight_bounds
+        self.session = session
+        self.simplify = simplify
+        self.simplification = None
+        self.prune_obstacles = prune_obstacles
+        self.pruning = None
+        self.free_space = free_space
+        self.decompositions = {}
+        self.graph_warm_start = graph_warm_start
+        self.warm_start = None
+        self.objective = objective
+        self.spatial_index = spatial_index
+        self.solve_options = {}
+        self.result = None
+        self.cancelled = False
+        self.spec_ast = spec if isinstance(spec, SpecNode) else None
+        self.compiler = SpecCompiler()
+
+    def get_spec_ast(self):
+        """
+        Parses the specification (once) and returns its AST.
 
-    def generate_trajectory(self, dt, max_acc, max_speed, verbose = False, include_dynamics=True):
-        self.dt = dt
-        self.verbose = verbose
-        self.max_acc = max_acc
-        self.max_speed = max_speed
-        objects = self.objects
-        N = int(self.T/self.dt)
+        Raises:
+            SpecSyntaxError: If the specification cannot be parsed.
+        """
+        if self.spec_ast is None:
+            self.spec_ast = parse_spec(self.spec, self.objects)
+        return self.spec_ast
+
+    def generate_trajectory(self, dt, max_acc, max_speed, verbose = False, include_dynamics=True,
+                            time_limit=None, mip_gap=None, feasible_first=False, incumbent_callback=None, threads=None):
+        """
+        Generates a trajectory that satisfies the STL specification.
+
+        The solve can be bounded for interactive use: it stops at the time limit or the relative MIP gap, or
+        at the first satisfying trajectory in feasible-first mode. The incumbent callback is called as
+        incumbent_callback(x, u, objective) for every improved trajectory found during the solve. The status
+        and gap of the solve are stored in `result`.
+
+        Parameters:
+            dt (float): Time step in seconds.
+            max_acc (float): Maximum absolute acceleration.
+            max_speed (float): Maximum absolute speed.
+            verbose (bool): Print the solver output. Default is False.
+            time_limit (float): Time limit of the solve in seconds. Default is None (no limit).
+            mip_gap (float): Relative MIP gap at which the solve stops. Default is None (the solver's default).
+            feasible_first (bool): Stop at the first trajectory that satisfies the specification. Default is False.
+            incumbent_callback (callable): Called with every improved trajectory. Default is None.
+            threads (int): Number of solver threads, e.g. to share the CPUs between parallel solves (Gurobi only).
+                           Default is None (the solver's choice).
+
+        Returns:
+            x (numpy.ndarray): State trajectory, None if no trajectory was found.
+            u (numpy.ndarray): Control inputs, None if no trajectory was found.
+        """
+        spec_ast, N = self._prepare(dt, max_acc, max_speed, verbose)
+        self.solve_options = {
+            'time_limit': time_limit,
+            'mip_gap': mip_gap,
+            'feasible_first': feasible_first,
+            'incumbent_callback': incumbent_callback,
+            'threads': threads,
+        }
+
+        key, found, x, u = self._cache_lookup(spec_ast)
+        if found:
+            self.result = SolveResult("infeasible" if x is None else "optimal", x, u, cached=True)
+            return x, u
+
+        if self.session is not None:
+            self._require_model_edits("planning session")
+
+        self.warm_start = None
+        if self.graph_warm_start and self.backend.supports_model_edits and spec_ast is not None:
+            self.warm_start = GraphSearchWarmStart(self.objects)
+            self.warm_start.plan(spec_ast, self.x0, N, dt, max_acc, max_speed)
+            if self.verbose:
+                print(f"Warm start: {self.warm_start.stats}")
+
+        def solve(spec_ast):
+            if self.session is not None and spec_ast is not None:
+                return self.session.solve(self, spec_ast, self.x0, N)
+            solver = self.build_solver(spec_ast, self.x0, N)
+            if self.warm_start is not None:
+                self.warm_start.apply(solver)
+            return self.solve(solver)
+
+        self.pruning = None
+        if self.prune_obstacles:
+            self.pruning = ObstaclePruner(self)
+            x, u = self.pruning.plan(spec_ast, self.x0, N, solve)
+        else:
+            x, u = solve(spec_ast)
+
+        self._cache_store(key, x, u)
+        return x, u
+
+    def generate_trajectory_receding_horizon(self, dt, max_acc, max_speed, window=30, step=10, verbose=False):
+        """
+        Generates a trajectory by solving overlapping windows of `window` time steps and committing
+        the first `step` time steps of each window. See `RecedingHorizonPlanner` for details.
+
+        Returns:
+            x (numpy.ndarray): Stitched state trajectory, same shape as returned by `generate_trajectory`. None if a
+                               window is infeasible or the stitched trajectory violates the specification (status
+                               "violated").
+            u (numpy.ndarray): Stitched control inputs.
+        """
+        from STL.receding_horizon import RecedingHorizonPlanner # imported here since it imports this module
+
+        self._require_model_edits("receding-horizon")
+
+        spec_ast, N = self._prepare(dt, max_acc, max_speed, verbose)
+
+        key, found, x, u = self._cache_lookup(spec_ast, mode='receding_horizon', window=window, step=step)
+        if found:
+            self.result = SolveResult("infeasible" if x is None else "optimal", x, u, cached=True)
+            return x, u
+
+        self.receding_horizon = RecedingHorizonPlanner(self, window=window, step=step)
+        x, u = self.receding_horizon.plan(spec_ast, self.x0, N)
+
+        self._cache_store(key, x, u)
+        return x, u
+
+    def generate_trajectory_coarse_to_fine(self, dt, max_acc, max_speed, factor=4, fix_binaries=True, verbose=False):
+        """
+        Generates a trajectory by first solving at a coarse time step factor*dt, then refining at dt
+        with the binary variables fixed or hinted from the coarse solution. See `CoarseToFinePlanner`.
+
+        Returns:
+            x (numpy.ndarray): State trajectory at time step dt, same shape as returned by `generate_trajectory`.
+            u (numpy.ndarray): Control inputs at time step dt.
+        """
+        from STL.multi_resolution import CoarseToFinePlanner # imported here since it imports this module
+
+        self._require_model_edits("coarse-to-fine")
+
+        spec_ast, N = self._prepare(dt, max_acc, max_speed, verbose)
+
+        key, found, x, u = self._cache_lookup(spec_ast, mode='coarse_to_fine', factor=factor, fix_binaries=fix_binaries)
+        if found:
+            self.result = SolveResult("infeasible" if x is None else "optimal", x, u, cached=True)
+            return x, u
+
+        self.coarse_to_fine = CoarseToFinePlanner(self, factor=factor, fix_binaries=fix_binaries)
+        x, u = self.coarse_to_fine.plan(spec_ast, self.x0, N)
+
+        self._cache_store(key, x, u)
+        return x, u
 
-        dynamics = drone_dynamics(dt=self.dt, max_acc=max_acc)
+    def generate_trajectory_min_horizon(self, dt, max_acc, max_speed, N_min=1, verbose=False, time_limit=None,
+                                        mip_gap=None):
+        """
+        Generates a trajectory with the smallest number of time steps n <= T/dt for which the specification is
+        feasible, by bisection over the horizon. See `HorizonSearch` for details. The chosen horizon and the solve
+        budget spent are stored in `horizon_search.stats`.
+
+        Returns:
+            x (numpy.ndarray): State trajectory of shape (6, n+1), None if the specification is infeasible.
+            u (numpy.ndarray): Control inputs of shape (3, n+1).
+        """
+        from STL.horizon_search import HorizonSearch
+
+        spec_ast, N = self._prepare(dt, max_acc, max_speed, verbose)
+        self.solve_options = {
+            'time_limit': time_limit,
+            'mip_gap': mip_gap,
+        }
+        self.horizon_search = HorizonSearch(self, N_min=N_min)
+        return self.horizon_search.plan(spec_ast, self.x0, N)
+
+    def generate_trajectory_batch(self, x0s, dt, max_acc, max_speed, verbose=False, time_limit=None, mip_gap=None,
+                                  feasible_first=False, threads=None, workers=1):
+        """
+        Generates trajectories that satisfy the STL specification from a batch of initial states.
+
+        The specification is compiled and encoded once per worker: the model is built with position bounds that
+        cover all initial states of the worker, and only the initial condition changes between the solves.
+        Every start gets its own reachability pre-check. The solve cache and planning session are not used.
+
+        Parameters:
+            x0s (numpy.ndarray): Initial states, shape (count, 6).
+            dt, max_acc, max_speed, verbose, time_limit, mip_gap, feasible_first, threads: See `generate_trajectory`.
+            workers (int): Number of worker processes, None for one per CPU. Default is 1 (in this process).
+
+        Returns:
+            BatchResult: Stacked trajectories x (count, 6, N+1) and u (count, 3, N+1), and the status and
+                         timings of every start.
+        """
+        x0s = np.atleast_2d(np.asarray(x0s, dtype=float))
+        if workers is None or workers > 1:
+            return solve_batch_parallel(self, x0s, dt, max_acc, max_speed, workers=workers, threads_per_solve=threads,
+                                        verbose=verbose, time_limit=time_limit, mip_gap=mip_gap,
+                                        feasible_first=feasible_first)
+
+        precheck, self.precheck = self.precheck, False # every start is checked below
+        try:
+            spec_ast, N = self._prepare(dt, max_acc, max_speed, verbose, x0s=x0s)
+        finally:
+            self.precheck = precheck
+        self.solve_options = {
+            'time_limit': time_limit,
+            'mip_gap': mip_gap,
+            'feasible_first': feasible_first,
+            'threads': threads,
+        }
+
+        batch = BatchResult.empty(len(x0s), N, x0s.shape[1])
+        starts = []
+        for i, x0 in enumerate(x0s):
+            try:
+                if self.precheck:
+                    ReachabilityAnalyzer(x0, N, dt, max_acc, max_speed).check(spec_ast)
+                starts.append(i)
+            except SpecInfeasibleError as e:
+                batch.errors[i] = str(e)
+        if not starts:
+            return batch
+
+        solver = self.build_solver(spec_ast, x0s[starts[0]], N, bound_states=x0s[starts])
+        batch.build_times.append(solver.build_time)
+        for i in starts:
+            self.backend.set_initial_state(solver, x0s[i])
+            self.solve(solver)
+            batch.set(i, self.result)
+        return batch
+
+    def build_solver(self, spec_ast, x0, N, dt=None, bound_states=None):
+        """
+        Builds the optimization problem of a specification AST over N time steps from the initial state x0
+        with the backend, using the dynamics, bounds and cost of the current solve (dt, max_acc and max_speed).
+
+        Parameters:
+            spec_ast (SpecNode): The specification. None builds the model without STL constraints.
+            x0 (numpy.ndarray): Initial state.
+            N (int): Number of time steps.
+            dt (float): Time step of the model. Default is the time step of the current solve.
+            bound_states (numpy.ndarray): Initial states, shape (count, 6), that the position bounds must cover,
+                                          so the model can be solved from each of them (see `SetInitialState`).
+                                          Default is x0 only.
+
+        Returns:
+            The backend's model (a `MICPSolver` for Gurobi), ready to be solved.
+        """
+        start_time = time.time()
+        dynamics = drone_dynamics(dt=self.dt if dt is None else dt, max_acc=self.max_acc)
             
         sys = dynamics.getSystem()      
 
         Q = np.zeros((6,6))     # state cost   : penalize position error
         R = np.eye(3)           # control cost : penalize control effort
 
-        N = int(self.T/self.dt)
-        solver = GurobiMICPSolver(eval(self.spec), sys, self.x0, N, verbose=self.verbose)
-        solver.AddQuadraticCost(Q=Q, R=R)
-        u_min = -dynamics.max_acc*np.ones(3,)  # minimum acceleration
-        u_max = dynamics.max_acc*np.ones(3,)   # maximum acceleration
-        solver.AddControlBounds(u_min, u_max)
+        bound_states = np.asarray(x0, dtype=float)[None] if bound_states is None else bound_states
+        free_space = None
+        if self.free_space and self.backend.supports_free_space and spec_ast is not None and self.objects:
+            spec_ast, free_space = self._decompose_free_space(spec_ast, N, bound_states[:, :3])
+
+        spec = self.compiler.compile(spec_ast) if spec_ast is not None else None
+        u_max = dynamics.max_acc*np.ones(3,)   # maximum absolute acceleration
         state_bounds = np.array([np.inf, np.inf, np.inf, self.max_speed, self.max_speed, self.max_speed])
-        solver.AddStateBounds(-state_bounds, state_bounds)
-        
+        position_bounds = None
+        if self.tight_bounds:
+            bounds = [derive_position_bounds(spec_ast, self.objects, np.asarray(state, dtype=float), N,
+                                             dynamics.dt, self.max_acc, self.max_speed) for state in bound_states]
+            position_bounds = (np.min([lower for lower, _ in bounds], axis=0),
+                               np.max([upper for _, upper in bounds], axis=0))
+        solver = self.backend.build(spec, sys, x0, N, Q, R, u_max, state_bounds, self.verbose,
+                                    position_bounds=position_bounds, free_space=free_space, objective=self.objective)
+        solver.build_time = time.time() - start_time
+        return solver
+
+    def _decompose_free_space(self, spec_ast, N, positions):
+        # Splits the top-level avoidance constraints from the specification and returns the rest with the
+        # (steps, FreeSpace) pairs that replace them. The decompositions are kept for the next models.
+        rest, obstacles = split_avoidance(spec_ast, N)
+        # The region extends beyond the workspace and the obstacles, so that the faces of obstacles at the border
+        # of the workspace are free
+        corners = np.array([obstacle for window in obstacles.values() for obstacle in window]).reshape(-1, 6)
+        lower, upper = workspace_bounds(self.objects, positions)
+        lower = np.minimum(lower, corners[:, 0::2].min(axis=0, initial=np.inf)) - 1.0
+        upper = np.maximum(upper, corners[:, 1::2].max(axis=0, initial=-np.inf)) + 1.0
+        region = tuple(float(v) for pair in zip(lower, upper) for v in pair)
+        free_space = []
+        for (t1, t2), window_obstacles in obstacles.items():
+            key = (region, tuple(sorted(window_obstacles)))
+            if key not in self.decompositions:
+                self.decompositions[key] = decompose_free_space(region, window_obstacles)
+            if not len(self.decompositions[key]):
+                return spec_ast, None # no free space, the disjunctive encoding shows the infeasibility
+            free_space.append((range(t1, t2 + 1), self.decompositions[key]))
+        return rest, free_space or None
+
+    def solve(self, solver):
+        """
+        Solves a solver built by `build_solver` with the solve options of the current solve. Returns (x, u), which
+        are None if no trajectory was found. The `SolveResult` is stored in `result`.
+        """
+        if self.cancelled:
+            self.result = SolveResult("cancelled")
+            return None, None
+
+        start_time = time.time()
         try:
-            x, u, _, _ = solver.Solve()
+            self.result = self.backend.solve(solver, cancel_check=lambda: self.cancelled, **self.solve_options)
         except Exception as e:
-            raise RuntimeError(f"Solver failed: {e}")
-
+            raise RuntimeError(f"Solver failed: {e}") from e
+        self.result.build_time = getattr(solver, 'build_time', np.nan)
+        x, u = self.result.x, self.result.u
+        self.backend.record(solver.T - 1, getattr(solver, 'build_time', np.nan), time.time() - start_time, x is not None,
+                            nodes=getattr(solver, 'node_count', np.nan))
         return x, u
 
+    def telemetry(self):
+        """
+        Returns the status and model statistics of the last solve (see `SolveResult`) together with the shape of
+        the specification, as a JSON-serializable dictionary. The shape is given by the number of time steps and
+        the number of nodes of every type in the specification AST, so the solve cost can be related to it
+        (see `experiments/save_results.py`). Returns None before the first solve.
+        """
+        if self.result is None:
+            return None
+        spec_ast = self.get_spec_ast()
+        node_counts = {}
+        for node in spec_ast.walk():
+            node_counts[type(node).__name__] = node_counts.get(type(node).__name__, 0) + 1
+        return {
+            'spec': str(spec_ast),
+            'backend': self.backend.name,
+            'N': int(self.T/self.dt),
+            'dt': self.dt,
+            'spec_node_counts': node_counts,
+            'binaries_saved': self.simplification.saved if self.simplification is not None else 0,
+            'obstacle_pruning': dict(self.pruning.stats) if self.pruning is not None else None,
+            **self.result.as_dict(),
+        }
+
+    def cancel(self):
+        """
+        Requests the running trajectory generation (e.g. in a `SolveHandle`) to stop. A Gurobi solve is terminated
+        and returns the best trajectory found so far. Planners stop after the current solve.
+        """
+        self.cancelled = True
+
+    def _prepare(self, dt, max_acc, max_speed, verbose, x0s=None):
+        """
+        Stores the solve parameters, parses and simplifies the specification and runs the reachability pre-check.
+        The simplification holds for all initial states x0s (default x0). Returns (spec_ast, N).
+        """
+        self.dt = dt
+        self.verbose = verbose
+        self.max_acc = max_acc
+        self.max_speed = max_speed
+        self.solve_options = {}
+        self.result = None
+        self.cancelled = False
+        N = int(self.T/self.dt)
+        spec_ast = self.get_spec_ast()
+        self.simplification = None
+        if self.simplify:
+            spec_ast = self._simplify(spec_ast, N, [self.x0] if x0s is None else x0s)
+        if self.precheck:
+            ReachabilityAnalyzer(self.x0, N, dt, max_acc, max_speed).check(spec_ast)
+        return spec_ast, N
+
+    def _simplify(self, spec_ast, N, x0s):
+        # Folds cuboids using the reachable sets of the initial states
+        reachable = [ReachabilityAnalyzer(x0, N, self.dt, self.max_acc, self.max_speed) for x0 in x0s]
+        lower = np.min([r.lower for r in reachable], axis=0)
+        upper = np.max([r.upper for r in reachable], axis=0)
+        simplified = simplify_spec(spec_ast, N, lower, upper)
+        if not isinstance(simplified, SpecNode):
+            # Trivially true or false specifications are left to the pre-check and the solver, which explain them
+            simplified = spec_ast
+        self.simplification = SimplificationReport(count_binaries(self.compiler.compile(spec_ast)),
+                                                   count_binaries(self.compiler.compile(simplified)))
+        if self.verbose and self.simplification.saved > 0:
+            print(f"Simplified the specification: {self.simplification.saved} of "
+                  f"{self.simplification.binaries_before} binaries saved.")
+        return simplified
+
+    def _require_model_edits(self, mode):
+        if not self.backend.supports_model_edits:
+            raise ValueError(f"The {mode} mode requires the gurobi backend, not '{self.backend.name}'")
+
+    def cache_options(self):
+        """
+        Returns the options of the solver and of the current solve that can change the returned trajectory, which
+        are part of the key of the solve cache: a solve stopped early at a MIP gap or time limit must not be
+        returned to a later exact request.
+        """
+        return {
+            'backend': self.backend.name,
+            'objective': self.objective,
+            'tight_bounds': self.tight_bounds,
+            'simplify': self.simplify,
+            'prune_obstacles': self.prune_obstacles,
+            'free_space': self.free_space,
+            'graph_warm_start': self.graph_warm_start,
+            'time_limit': self.solve_options.get('time_limit'),
+            'mip_gap': self.solve_options.get('mip_gap'),
+            'feasible_first': self.solve_options.get('feasible_first', False),
+        }
+
+    def _cache_lookup(self, spec_ast, **options):
+        if self.cache is None:
+            return None, False, None, None
+        key = self.cache.make_key(spec_ast, self.objects, self.x0, self.T, self.dt, self.max_acc, self.max_speed,
+                                  **self.cache_options(), **options)
+        found, x, u = self.cache.get(key)
+        if found and self.verbose:
+            print("Trajectory loaded from the solve cache.")
+        return key, found, x, u
+
+    def _cache_store(self, key, x, u):
+        # Trajectories of solves that were stopped early are not final, so they are not cached
+        if self.result is not None and self.result.status not in ("optimal", "infeasible"):
+            return
+        if self.cache is not None:
+            self.cache.put(key, x, u)
+
 
 class STL_formulas:
     """
@@ -145,14 +742,54 @@ class STL_formulas:
     a point (or system state) is inside or outside a defined cuboid in 3D space. These formulas
     can be used in trajectory planning, constraint satisfaction, or system verification tasks.
 
+    The formulas are interned: a cuboid formula is keyed on (inside/outside, bounds, tolerance) and
+    every half-space predicate on (axis, direction, offset), so repeated calls return the same shared
+    objects. Cuboids that share a face (e.g. walls in a row) also share the predicate of that face.
+    The `MICPSolver` encodes every (formula, time step) pair only once, so shared objects translate
+    directly into fewer binary variables.
+
     Methods:
         inside_cuboid(bounds, tolerance=0.1):
             Creates an STL formula specifying that the state is inside a defined cuboid.
 
         outside_cuboid(bounds, tolerance=0.1):
             Creates an STL formula specifying that the state is outside a defined cuboid.
+
+        half_space(axis, direction, offset):
+            Creates the predicate direction*y[axis] >= offset.
+
+        clear_interned():
+            Removes all interned formulas and predicates.
     """
-    
+
+    _cuboids = {}       # (inside, bounds, tolerance) -> STLFormula
+    _predicates = {}    # (axis, direction, offset) -> LinearPredicate
+
+    def half_space(axis, direction, offset):
+        """
+        Create the (interned) predicate direction*y[axis] >= offset.
+
+        Parameters:
+            axis (int): Index of the position coordinate (0: x, 1: y, 2: z).
+            direction (int): 1 for a lower bound on the coordinate, -1 for an upper bound.
+            offset (float): Offset of the half-space.
+
+        Returns:
+            LinearPredicate: The predicate, shared with every other caller using the same arguments.
+        """
+        key = (axis, direction, round(float(offset), 12))
+        if key not in STL_formulas._predicates:
+            a = np.zeros((1,6)); a[:,axis] = direction
+            STL_formulas._predicates[key] = LinearPredicate(a, offset)
+        return STL_formulas._predicates[key]
+
+    def clear_interned():
+        """
+        Remove all interned formulas and predicates.
+        """
+        STL_formulas._cuboids.clear()
+        STL_formulas._predicates.clear()
+
     def inside_cuboid(bounds, tolerance=0.1):
         """
         Create an STL formula for being inside a cuboid with specified bounds.
@@ -176,25 +813,27 @@ class STL_formulas:
             STLFormula: An STL formula specifying specifying being inside the cuboid.
         """
 
+        key = (True, tuple(float(b) for b in bounds), float(tolerance))
+        if key in STL_formulas._cuboids:
+            return STL_formulas._cuboids[key]
+
         # Unpack the bounds
         x_min, x_max, y_min, y_max, z_min, z_max = bounds
 
         # Create predicates a*y >= b for each side of the cuboid
-        a1 = np.zeros((1,6)); a1[:,0] = 1
-        right = LinearPredicate(a1, x_min + tolerance)
-        left = LinearPredicate(-a1, -x_max + tolerance)
+        right = STL_formulas.half_space(0, 1, x_min + tolerance)
+        left = STL_formulas.half_space(0, -1, -x_max + tolerance)
 
-        a2 = np.zeros((1,6)); a2[:,1] = 1
-        front = LinearPredicate(a2, y_min + tolerance)
-        back = LinearPredicate(-a2, -y_max + tolerance)
+        front = STL_formulas.half_space(1, 1, y_min + tolerance)
+        back = STL_formulas.half_space(1, -1, -y_max + tolerance)
 
-        a3 = np.zeros((1,6)); a3[:,2] = 1
-        top = LinearPredicate(a3, z_min + tolerance)
-        bottom = LinearPredicate(-a3, -z_max + tolerance)
+        top = STL_formulas.half_space(2, 1, z_min + tolerance)
+        bottom = STL_formulas.half_space(2, -1, -z_max + tolerance)
 
         # Take the conjuction across all the sides
-        inside_cuboid = right & left & front & back & top & bottom
+        inside_cuboid = STLTree([right, left, front, back, top, bottom], "and", [0]*6)
 
+        STL_formulas._cuboids[key] = inside_cuboid
         return inside_cuboid
 
 
@@ -221,23 +860,25 @@ class STL_formulas:
             STLFormula: An STL formula specifying specifying being outside the cuboid.
         """
 
+        key = (False, tuple(float(b) for b in bounds), float(tolerance))
+        if key in STL_formulas._cuboids:
+            return STL_formulas._cuboids[key]
+
         # Unpack the bounds
         x_min, x_max, y_min, y_max, z_min, z_max = bounds
 
         # Create predicates a*y >= b for each side of the rectangle
-        a1 = np.zeros((1,6)); a1[:,0] = 1
-        right = LinearPredicate(a1, x_max + tolerance)
-        left = LinearPredicate(-a1, -x_min + tolerance)
+        right = STL_formulas.half_space(0, 1, x_max + tolerance)
+        left = STL_formulas.half_space(0, -1, -x_min + tolerance)
 
-        a2 = np.zeros((1,6)); a2[:,1] = 1
-        front = LinearPredicate(a2, y_max + tolerance)
-        back = LinearPredicate(-a2, -y_min + tolerance)
+        front = STL_formulas.half_space(1, 1, y_max + tolerance)
+        back = STL_formulas.half_space(1, -1, -y_min + tolerance)
 
-        a3 = np.zeros((1,6)); a3[:,2] = 1
-        top = LinearPredicate(a3, z_max + tolerance)
-        bottom = LinearPredicate(-a3, -z_min + tolerance)
+        top = STL_formulas.half_space(2, 1, z_max + tolerance)
+        bottom = STL_formulas.half_space(2, -1, -z_min + tolerance)
 
         # Take the disjuction across all the sides
-        outside_cuboid = right | left | front | back | top | bottom
+        outside_cuboid = STLTree([right, left, front, back, top, bottom], "or", [0]*6)
 
-        return outside_cuboid
\ No newline at end of file
+        STL_formulas._cuboids[key] = outside_cuboid
+        return outside_cuboid
@@ -0,0 +1,654 @@
+"""
+backends.py
+
+Optimization backends of the `STLSolver`.
+
+A backend builds the optimization problem of a compiled STL specification for the drone dynamics and
+solves it. Every backend returns the trajectory in the same format: x of shape (6, N+1) and u of
+shape (3, N+1), or (None, None) if no trajectory was found. The available backends are:
+
+- "gurobi":   The mixed-integer encoding of `MICPSolver` with the quadratic control cost. Exact, requires
+              a Gurobi license.
+- "highs":    The same mixed-integer encoding solved with the open-source HiGHS solver through
+              `scipy.optimize.milp`. HiGHS only accepts linear objectives, so the quadratic control cost is
+              replaced by its linearization sum(|u|) (and sum(|x|) for a nonzero state cost).
+- "gradient": `stlpy`'s `ScipyGradientSolver`, which maximizes the (non-smooth) robustness with a shooting
+              method. Fast for short horizons but approximate: a trajectory is only returned if it satisfies
+              the specification and the control and speed bounds, which are enforced as penalties.
+
+The objective of the MICP backends is selectable (see `OBJECTIVES`): the quadratic control effort (an MIQP with
+Gurobi), the L1 or L-infinity control effort, or pure feasibility. The L1 and L-infinity efforts are encoded with
+auxiliary variables, so the problem stays an MILP. The robustness is maximized alongside the effort, except for
+pure feasibility, which has no objective and stops at the first trajectory that satisfies the specification.
+
+Every backend records the build and solve times of its solves in `timings`, so the fastest backend per
+scenario can be selected (see `experiments/benchmark_backends.py`).
+
+Solves can be bounded in time: a time limit, a relative MIP gap, and a feasible-first mode that stops at the
+first trajectory satisfying the specification. An incumbent callback receives every improved trajectory
+during the solve (Gurobi), or the final one (other backends). The outcome is described by a `SolveResult`.
+
+Classes:
+    - SolveResult: Trajectory, status and optimality gap of a solve.
+    - SolverBackend: Base class of the backends.
+    - GurobiBackend, HighsBackend, GradientBackend: The backends.
+    - HighsMICPSolver: The MILP encoding for HiGHS.
+
+Functions:
+    - get_backend(name): Returns a new backend instance by name.
+
+Constants:
+    - OBJECTIVES: The names of the objectives accepted by `build`.
+"""
+
+import time
+import numpy as np
+from dataclasses import dataclass, fields
+from stlpy.STL import LinearPredicate, NonlinearPredicate
+from STL.bounds import big_M, robustness_upper_bound
+
+# "quadratic": sum_t x_t'Q x_t + u_t'R u_t, "l1": sum_t q@|x_t| + r@|u_t|, "linf": sum_t max(q*|x_t|, r*|u_t|),
+# "feasibility": no objective. q and r are the diagonals of Q and R.
+OBJECTIVES = ("quadratic", "l1", "linf", "feasibility")
+
+
+@dataclass
+class SolveResult:
+    """
+    The outcome of a solve.
+
+    Attributes:
+        status (str): "optimal" (within the MIP gap), "suboptimal" (a trajectory was found but the solve was stopped
+                      early, e.g. in feasible-first mode), "timed_out" (the time limit was reached, x and u are the
+                      best trajectory found, if any), "cancelled" (the solve was cancelled, idem), "infeasible" or
+                      "violated" (a receding-horizon trajectory that violates the full specification).
+        x (numpy.ndarray): State trajectory, shape (6, N+1), None if no trajectory was found.
+        u (numpy.ndarray): Control inputs, shape (3, N+1), None if no trajectory was found.
+        objective (float): Objective value of the trajectory (nan if unknown).
+        gap (float): Relative gap between the objective and the best bound (nan if unknown).
+        solve_time (float): Solve time in seconds as reported by the backend.
+        binaries (int): Number of binary variables of the model (None if unknown, also for the counts below).
+        continuous (int): Number of continuous variables of the model.
+        constraints (int): Number of constraints of the model.
+        presolve_removed_rows (int): Number of constraints removed by presolve.
+        presolve_removed_columns (int): Number of variables removed by presolve.
+        nodes (int): Number of branch-and-bound nodes.
+        build_time (float): Build time of the model in seconds (nan if unknown).
+        cached (bool): Whether the trajectory was loaded from the solve cache instead of solved.
+
+    Methods:
+        as_dict():
+            Returns the status and statistics (without the trajectory) as a JSON-serializable dictionary.
+    """
+    status: str
+    x: np.ndarray = None
+    u: np.ndarray = None
+    objective: float = np.nan
+    gap: float = np.nan
+    solve_time: float = np.nan
+    binaries: int = None
+    continuous: int = None
+    constraints: int = None
+    presolve_removed_rows: int = None
+    presolve_removed_columns: int = None
+    nodes: int = None
+    build_time: float = np.nan
+    cached: bool = False
+
+    @property
+    def feasible(self):
+        return self.x is not None
+
+    def as_dict(self):
+        values = {f.name: getattr(self, f.name) for f in fields(self) if f.name not in ('x', 'u')}
+        values['feasible'] = self.feasible
+        for key, value in values.items():
+            if isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, float) and not np.isfinite(value):
+                value = None # nan and inf are not valid JSON
+            values[key] = value
+        return values
+
+
+class SolverBackend:
+    """
+    Base class of the optimization backends.
+
+    Attributes:
+        name (str): Name of the backend.
+        supports_model_edits (bool): Whether the built model is a `MICPSolver` that can be modified before
+                                     solving (extra costs, hints, fixed variables), as used by the
+                                     receding-horizon and coarse-to-fine planners.
+        supports_free_space (bool): Whether `build` accepts free space decompositions.
+        timings (list): One dictionary per solve with the number of time steps, build time, solve time,
+                        number of branch-and-bound nodes and whether a trajectory was found.
+
+    Methods:
+        build(spec, sys, x0, N, Q, R, u_max, x_max, verbose, position_bounds=None, free_space=None,
+              objective="quadratic"):
+            Builds the problem. spec is a compiled STL formula, or None for no STL constraints.
+            position_bounds are optional per-step position bounds (see `bounds.py`). free_space are optional
+            (steps, FreeSpace) pairs that replace avoidance constraints (see `free_space.py`). objective is one
+            of `OBJECTIVES`, with the weights Q and R.
+        solve(model, time_limit=None, mip_gap=None, feasible_first=False, incumbent_callback=None, cancel_check=None,
+              threads=None):
+            Solves a built problem and returns a `SolveResult`. The incumbent callback is called as
+            incumbent_callback(x, u, objective). The solve stops early when cancel_check() returns True, where the
+            backend supports it. threads limits the number of solver threads, where the backend supports it.
+            Stores the number of branch-and-bound nodes in model.node_count, where available.
+        set_initial_state(model, x0):
+            Changes the initial state of a built problem, to solve it again from another start.
+        statistics(model):
+            Returns the statistics of a solved problem (variable and constraint counts, presolve reductions
+            and nodes) as keyword arguments of `SolveResult`.
+    """
+    name = None
+    supports_model_edits = False
+    supports_free_space = False
+
+    def __init__(self):
+        self.timings = []
+
+    def build(self, spec, sys, x0, N, Q, R, u_max, x_max, verbose, position_bounds=None, free_space=None,
+              objective="quadratic"):
+        raise NotImplementedError
+
+    def check_objective(self, objective, supported=OBJECTIVES):
+        """
+        Raises a ValueError if the objective is unknown or not supported by the backend.
+        """
+        if objective not in supported:
+            raise ValueError(f"Objective '{objective}' is not supported by the {self.name} backend, "
+                             f"choose from {', '.join(supported)}")
+
+    def solve(self, model, time_limit=None, mip_gap=None, feasible_first=False, incumbent_callback=None,
+              cancel_check=None, threads=None):
+        raise NotImplementedError
+
+    def set_initial_state(self, model, x0):
+        model.SetInitialState(x0)
+
+    def statistics(self, model):
+        return {}
+
+    def record(self, N, build_time, solve_time, feasible, nodes=np.nan):
+        self.timings.append({
+            'N': N,
+            'build_time': build_time,
+            'solve_time': solve_time,
+            'nodes': nodes,
+            'feasible': feasible,
+        })
+
+    def mean_times(self):
+        """
+        Returns the mean (build time, solve time) over the recorded solves, or (nan, nan) if there are none.
+        """
+        if not self.timings:
+            return np.nan, np.nan
+        return (float(np.mean([t['build_time'] for t in self.timings])),
+                float(np.mean([t['solve_time'] for t in self.timings])))
+
+
+class GurobiBackend(SolverBackend):
+    name = "gurobi"
+    supports_model_edits = True
+    supports_free_space = True
+
+    def build(self, spec, sys, x0, N, Q, R, u_max, x_max, verbose, position_bounds=None, free_space=None,
+              objective="quadratic"):
+        from STL.micp_solver import MICPSolver # imported here, so the other backends run without gurobipy
+
+        self.check_objective(objective)
+        solver = MICPSolver(spec, sys, x0, N, position_bounds=position_bounds, free_space=free_space,
+                            robustness_cost=objective != "feasibility", verbose=verbose)
+        if objective == "quadratic":
+            solver.AddQuadraticCost(Q=Q, R=R)
+        elif objective == "l1":
+            solver.AddL1Cost(q=np.diag(Q), r=np.diag(R))
+        elif objective == "linf":
+            solver.AddLinfCost(q=np.diag(Q), r=np.diag(R))
+        solver.AddControlBounds(-u_max, u_max)
+        solver.AddStateBounds(-x_max, x_max)
+        return solver
+
+    def solve(self, model, time_limit=None, mip_gap=None, feasible_first=False, incumbent_callback=None,
+              cancel_check=None, threads=None):
+        from gurobipy import GRB
+
+        # Set every parameter, since a model can be solved several times (see `PlanningSession`)
+        model.model.Params.TimeLimit = GRB.INFINITY if time_limit is None else time_limit
+        model.model.Params.MIPGap = 1e-4 if mip_gap is None else mip_gap
+        model.model.Params.SolutionLimit = 1 if feasible_first else GRB.MAXINT
+        model.model.Params.Threads = 0 if threads is None else threads # 0: Gurobi's automatic choice
+
+        model.presolve_removed = (None, None)
+        def callback(gurobi_model, where):
+            if where == GRB.Callback.PRESOLVE:
+                model.presolve_removed = (gurobi_model.cbGet(GRB.Callback.PRE_ROWDEL),
+                                          gurobi_model.cbGet(GRB.Callback.PRE_COLDEL))
+            if where == GRB.Callback.MIPSOL and incumbent_callback is not None:
+                incumbent_callback(gurobi_model.cbGetSolution(model.x), gurobi_model.cbGetSolution(model.u),
+                                   gurobi_model.cbGet(GRB.Callback.MIPSOL_OBJ))
+            if cancel_check is not None and cancel_check():
+                gurobi_model.terminate()
+
+        x, u, _, solve_time = model.Solve(callback)
+        model.node_count = model.model.NodeCount
+
+        status = model.model.Status
+        if status == GRB.OPTIMAL:
+            label = "optimal"
+        elif status == GRB.TIME_LIMIT:
+            label = "timed_out"
+        elif status == GRB.INTERRUPTED:
+            label = "cancelled"
+        else:
+            label = "suboptimal" if x is not None else "infeasible"
+        objective = model.model.ObjVal if x is not None else np.nan
+        gap = (model.model.MIPGap if model.model.IsMIP else 0.0) if x is not None else np.nan
+        return SolveResult(label, x, u, objective, gap, solve_time, **self.statistics(model))
+
+    def statistics(self, model):
+        gurobi_model = model.model
+        integers = gurobi_model.NumIntVars # includes the binaries
+        return {
+            'binaries': gurobi_model.NumBinVars,
+            'continuous': gurobi_model.NumVars - integers,
+            'constraints': gurobi_model.NumConstrs + gurobi_model.NumQConstrs + gurobi_model.NumGenConstrs,
+            'presolve_removed_rows': model.presolve_removed[0],
+            'presolve_removed_columns': model.presolve_removed[1],
+            'nodes': int(model.node_count),
+        }
+
+
+class HighsBackend(SolverBackend):
+    """
+    Backend based on `HighsMICPSolver`. HiGHS only accepts linear objectives, so the "quadratic" objective is
+    replaced by the L1 effort.
+    """
+    name = "highs"
+    supports_free_space = True
+
+    def build(self, spec, sys, x0, N, Q, R, u_max, x_max, verbose, position_bounds=None, free_space=None,
+              objective="quadratic"):
+        self.check_objective(objective)
+        solver = HighsMICPSolver(spec, sys, x0, N, position_bounds=position_bounds, free_space=free_space,
+                                 robustness_cost=objective != "feasibility", verbose=verbose)
+        if objective in ("quadratic", "l1"):
+            solver.AddLinearCost(q=np.diag(Q), r=np.diag(R))
+        elif objective == "linf":
+            solver.AddLinfCost(q=np.diag(Q), r=np.diag(R))
+        solver.AddControlBounds(-u_max, u_max)
+        solver.AddStateBounds(-x_max, x_max)
+        return solver
+
+    def solve(self, model, time_limit=None, mip_gap=None, feasible_first=False, incumbent_callback=None,
+              cancel_check=None, threads=None):
+        options = {}
+        if time_limit is not None:
+            options['time_limit'] = time_limit
+        if feasible_first:
+            options['mip_rel_gap'] = np.inf # any incumbent closes the gap
+        elif mip_gap is not None:
+            options['mip_rel_gap'] = mip_gap
+
+        x, u, _, solve_time = model.Solve(**options)
+        result = model.result
+        if result.status == 0:
+            label = "optimal" if not feasible_first else "suboptimal"
+        elif result.status == 1:
+            label = "timed_out"
+        else:
+            label = "infeasible"
+        objective = result.fun if x is not None else np.nan
+        gap = getattr(result, 'mip_gap', np.nan) if x is not None else np.nan
+        if x is not None and incumbent_callback is not None:
+            incumbent_callback(x, u, objective)
+        return SolveResult(label, x, u, objective, gap, solve_time, **self.statistics(model))
+
+    def statistics(self, model):
+        # scipy does not report the presolve reductions of HiGHS
+        binaries = int(np.sum(model.integrality))
+        return {
+            'binaries': binaries,
+            'continuous': len(model.integrality) - binaries,
+            'constraints': len(model.row_lb),
+            'nodes': model.node_count,
+        }
+
+
+class GradientBackend(SolverBackend):
+    """
+    Backend based on `stlpy`'s `ScipyGradientSolver`. It always maximizes the robustness, with the quadratic
+    effort for the "quadratic" objective and without it for "feasibility". The L1 and L-infinity efforts are not
+    smooth, so they are not supported.
+
+    Parameters:
+        method (str): The `scipy.optimize.minimize` method. Default is "slsqp".
+        bound_weight (float): Weight of the penalty on control and speed bound violations. Default is 100.
+        bound_tolerance (float): Relative bound violation that is still accepted. Default is 0.01.
+    """
+    name = "gradient"
+
+    def __init__(self, method="slsqp", bound_weight=100.0, bound_tolerance=0.01):
+        super().__init__()
+        self.method = method
+        self.bound_weight = bound_weight
+        self.bound_tolerance = bound_tolerance
+
+    def build(self, spec, sys, x0, N, Q, R, u_max, x_max, verbose, position_bounds=None, free_space=None,
+              objective="quadratic"):
+        from stlpy.solvers import ScipyGradientSolver
+
+        self.check_objective(objective, ("quadratic", "feasibility"))
+
+        class BoundedGradientSolver(ScipyGradientSolver):
+            def cost(solver, u_flat):
+                u = u_flat.reshape((solver.sys.m, solver.T))
+                x, _ = solver.forward_rollout(u)
+                return (super().cost(u_flat)
+                        + self.bound_weight*np.sum(np.maximum(np.abs(u) - u_max[:,None], 0)**2)
+                        + self.bound_weight*np.sum(np.maximum(np.abs(x) - x_max[:,None], 0)**2))
+
+        if spec is None:
+            raise ValueError("The gradient backend requires an STL specification")
+        solver = BoundedGradientSolver(spec, sys, x0, N, method=self.method, verbose=verbose)
+        if objective == "quadratic":
+            solver.AddQuadraticCost(Q=Q, R=R)
+        solver.u_max, solver.x_max = u_max, x_max
+        return solver
+
+    def set_initial_state(self, model, x0):
+        model.x0 = x0
+
+    def solve(self, model, time_limit=None, mip_gap=None, feasible_first=False, incumbent_callback=None,
+              cancel_check=None, threads=None):
+        # The local optimization of scipy has no time limit or gap, a satisfying trajectory is reported as suboptimal
+        x, u, _, solve_time = model.Solve()
+        if x is None:
+            return SolveResult("infeasible", solve_time=solve_time, **self.statistics(model))
+
+        # Accept the approximate solution only if it satisfies the specification and the bounds
+        y = model.sys.C@x + model.sys.D@u
+        robustness = model.spec.robustness(y, 0)[0]
+        u_excess = np.max(np.abs(u) - model.u_max[:,None] * (1 + self.bound_tolerance))
+        x_excess = np.max(np.abs(x) - model.x_max[:,None] * (1 + self.bound_tolerance))
+        if robustness < 0 or u_excess > 0 or x_excess > 0:
+            if model.verbose:
+                print(f"Gradient solution rejected (robustness {robustness:.3f}).")
+            return SolveResult("infeasible", solve_time=solve_time, **self.statistics(model))
+        objective = float(np.squeeze(model.cost(u.flatten())))
+        if incumbent_callback is not None:
+            incumbent_callback(x, u, objective)
+        return SolveResult("suboptimal", x, u, objective, np.nan, solve_time, **self.statistics(model))
+
+    def statistics(self, model):
+        # The control inputs are the only decision variables, the bounds are penalties
+        return {'binaries': 0, 'continuous': model.sys.m*model.T, 'constraints': 0}
+
+
+class HighsMICPSolver:
+    """
+    The mixed-integer encoding of `MICPSolver`, assembled as a sparse MILP for `scipy.optimize.milp` (HiGHS).
+
+    The variables are x (n, T), u (m, T), the robustness rho >= 0, one binary per (predicate, time step)
+    and one continuous variable in [0, 1] per (conjunction/disjunction, time step), with the same constraints
+    as `MICPSolver`. As in `stlpy`, T = N+1 and the robustness is maximized alongside the cost.
+
+    Parameters:
+        spec (STLFormula): The compiled specification. None for no STL constraints.
+        sys (LinearSystem): The system dynamics.
+        x0 (numpy.ndarray): Initial state.
+        T (int): Number of time steps N.
+        position_bounds (tuple): Optional per-step position bounds (lower, upper), as in `MICPSolver`.
+        free_space (list): Optional (steps, FreeSpace) pairs, as in `MICPSolver`.
+        M (float): Big-M constant. Default is 1000.
+        robustness_cost (bool): Whether to maximize the robustness. Default is True.
+        verbose (bool): Whether to print the HiGHS log. Default is True.
+
+    Methods:
+        AddControlBounds(u_min, u_max), AddStateBounds(x_min, x_max):
+            Bounds on every time step, as in `stlpy`.
+        AddFreeSpaceConstraints():
+            Constrains the position to the boxes of the free space decompositions, as in `MICPSolver`.
+        AddLinearCost(q, r):
+            Adds sum_t q@|x_t| + r@|u_t| to the cost.
+        AddLinfCost(q, r):
+            Adds sum_t max(q*|x_t|, r*|u_t|) to the cost.
+        SetInitialState(x0):
+            Changes the initial state in place. The position bounds must cover the new initial state.
+        Solve(time_limit=None, mip_rel_gap=None):
+            Returns (x, u, rho, solve_time), with x and u None if no solution was found. The `scipy` result is
+            stored in `result`.
+    """
+    def __init__(self, spec, sys, x0, T, position_bounds=None, free_space=None, M=1000, robustness_cost=True,
+                 verbose=True):
+        self.spec = spec
+        self.position_bounds = position_bounds
+        self.free_space = free_space or []
+        self.node_count = None
+        self.sys = sys
+        self.x0 = x0
+        self.T = T+1
+        self.M = float(M)
+        self.verbose = verbose
+
+        self.lb, self.ub, self.c, self.integrality = [], [], [], []
+        self.rows, self.cols, self.vals, self.row_lb, self.row_ub = [], [], [], [], []
+
+        self.x = self.AddVariables((sys.n, self.T))
+        self.u = self.AddVariables((sys.m, self.T))
+        self.rho = self.AddVariables(1, lb=0.0)[0]
+
+        self.AddDynamicsConstraints()
+        self.AddSTLConstraints()
+        if robustness_cost:
+            self.c[self.rho] -= 1.0
+
+    def AddVariables(self, shape, lb=-np.inf, ub=np.inf, integer=False):
+        """
+        Adds variables and returns their indices as an array of the given shape.
+        """
+        count = int(np.prod(shape))
+        start = len(self.lb)
+        self.lb += [lb]*count
+        self.ub += [ub]*count
+        self.c += [0.0]*count
+        self.integrality += [int(integer)]*count
+        return np.arange(start, start + count).reshape(shape)
+
+    def AddConstraint(self, indices, coefficients, lb=-np.inf, ub=np.inf):
+        """
+        Adds the constraint lb <= sum(coefficients * variables[indices]) <= ub.
+        """
+        row = len(self.row_lb)
+        for index, coefficient in zip(indices, coefficients):
+            if coefficient != 0:
+                self.rows.append(row)
+                self.cols.append(int(index))
+                self.vals.append(float(coefficient))
+        self.row_lb.append(lb)
+        self.row_ub.append(ub)
+
+    def AddDynamicsConstraints(self):
+        n, m = self.sys.n, self.sys.m
+        for i in range(n):
+            self.lb[self.x[i,0]] = self.ub[self.x[i,0]] = float(self.x0[i])
+        for t in range(self.T-1):
+            for i in range(n):
+                # x[i,t+1] - A[i]@x[:,t] - B[i]@u[:,t] == 0
+                indices = np.concatenate([[self.x[i,t+1]], self.x[:,t], self.u[:,t]])
+                coefficients = np.concatenate([[1.0], -self.sys.A[i], -self.sys.B[i]])
+                self.AddConstraint(indices, coefficients, 0.0, 0.0)
+
+    def SetInitialState(self, x0):
+        self.x0 = x0
+        for i in range(self.sys.n):
+            self.lb[self.x[i,0]] = self.ub[self.x[i,0]] = float(x0[i])
+
+    def AddControlBounds(self, u_min, u_max):
+        for t in range(self.T):
+            for i in range(self.sys.m):
+                self._tighten(self.u[i,t], u_min[i], u_max[i])
+
+    def AddStateBounds(self, x_min, x_max):
+        for t in range(self.T):
+            for i in range(self.sys.n):
+                self._tighten(self.x[i,t], x_min[i], x_max[i])
+
+    def AddLinearCost(self, q, r):
+        for weights, variables in ((q, self.x), (r, self.u)):
+            for i, weight in enumerate(weights):
+                if weight == 0:
+                    continue
+                for t in range(self.T):
+                    # s >= |v|, with s in the cost
+                    s = self.AddVariables(1, lb=0.0)[0]
+                    self.c[s] += float(weight)
+                    self.AddConstraint([s, variables[i,t]], [1.0, -1.0], lb=0.0)
+                    self.AddConstraint([s, variables[i,t]], [1.0, 1.0], lb=0.0)
+
+    def AddLinfCost(self, q, r):
+        for t in range(self.T):
+            # s >= weight*|v| for every weighted entry v of x_t and u_t, with s in the cost
+            s = None
+            for weights, variables in ((q, self.x), (r, self.u)):
+                for i, weight in enumerate(weights):
+                    if weight == 0:
+                        continue
+                    if s is None:
+                        s = self.AddVariables(1, lb=0.0)[0]
+                        self.c[s] += 1.0
+                    self.AddConstraint([s, variables[i,t]], [1.0, -float(weight)], lb=0.0)
+                    self.AddConstraint([s, variables[i,t]], [1.0, float(weight)], lb=0.0)
+
+    def AddSTLConstraints(self):
+        self.encoded = {}
+        self.rho_max = np.inf
+        if self.position_bounds is not None:
+            for t in range(self.T):
+                for i in range(3):
+                    self._tighten(self.x[i,t], self.position_bounds[0][i,t], self.position_bounds[1][i,t])
+        self.AddFreeSpaceConstraints()
+
+        if self.spec is None:
+            self.ub[self.rho] = 0.0 # keep the robustness cost bounded, as in `MICPSolver`
+            return
+
+        if self.position_bounds is not None:
+            self.rho_max = robustness_upper_bound(self.spec, *self.position_bounds)
+            self.ub[self.rho] = self.rho_max
+
+        z_spec = self.AddSubformulaVariable(self.spec, 0)
+        self.lb[z_spec] = 1.0
+
+    def AddFreeSpaceConstraints(self):
+        """
+        Constrains the position to one of the boxes of every free space decomposition, as in `MICPSolver`.
+        """
+        for steps, free_space in self.free_space:
+            for t in steps:
+                lower = np.array([self.lb[self.x[i,t]] for i in range(3)])
+                upper = np.array([self.ub[self.x[i,t]] for i in range(3)])
+                boxes, M_lower, M_upper = free_space.big_M(lower, upper, self.M)
+                z = self.AddVariables(len(boxes), lb=0.0, ub=1.0, integer=True)
+                self.AddConstraint(z, np.ones(len(boxes)), 1.0, 1.0)
+                for j, k in enumerate(boxes):
+                    for i in range(3):
+                        # x - M*z >= box_lower - M and x + M*z <= box_upper + M
+                        if M_lower[j,i] > 0:
+                            self.AddConstraint([self.x[i,t], z[j]], [1.0, -M_lower[j,i]],
+                                               lb=free_space.lower[k,i] - M_lower[j,i])
+                        if M_upper[j,i] > 0:
+                            self.AddConstraint([self.x[i,t], z[j]], [1.0, M_upper[j,i]],
+                                               ub=free_space.upper[k,i] + M_upper[j,i])
+
+    def AddSubformulaVariable(self, formula, t):
+        """
+        Returns the index of a variable z that can only take value 1 if the formula is satisfied at
+        time step t, memoized on (formula, t) as in `MICPSolver`.
+        """
+        key = (id(formula), t)
+        if key in self.encoded:
+            return self.encoded[key]
+
+        if isinstance(formula, LinearPredicate):
+            # a.T*(C x + D u) - b + (1-z)*M >= rho
+            z = self.AddVariables(1, lb=0.0, ub=1.0, integer=True)[0]
+            M = self.M
+            if self.position_bounds is not None:
+                M = big_M(formula, self.position_bounds[0][:,t], self.position_bounds[1][:,t], self.rho_max, self.M)
+            a = formula.a.ravel()
+            indices = np.concatenate([self.x[:,t], self.u[:,t], [self.rho, z]])
+            coefficients = np.concatenate([a@self.sys.C, a@self.sys.D, [-1.0, -M]])
+            self.AddConstraint(indices, coefficients, lb=float(np.ravel(formula.b)[0]) - M)
+
+        elif isinstance(formula, NonlinearPredicate):
+            raise TypeError("Mixed integer programming does not support nonlinear predicates")
+
+        else:
+            z_subs = [self.AddSubformulaVariable(subformula, t + formula.timesteps[i])
+                      for i, subformula in enumerate(formula.subformula_list)]
+            z = self.AddVariables(1, lb=0.0, ub=1.0)[0]
+            if formula.combination_type == "and":
+                for z_sub in z_subs:
+                    self.AddConstraint([z, z_sub], [1.0, -1.0], ub=0.0)
+            else: # combination_type == "or"
+                self.AddConstraint([z] + z_subs, [1.0] + [-1.0]*len(z_subs), ub=0.0)
+
+        self.encoded[key] = z
+        return z
+
+    def Solve(self, time_limit=None, mip_rel_gap=None):
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        from scipy.sparse import csr_matrix
+
+        options = {'disp': self.verbose}
+        if time_limit is not None:
+            options['time_limit'] = time_limit
+        if mip_rel_gap is not None:
+            options['mip_rel_gap'] = mip_rel_gap
+
+        A = csr_matrix((self.vals, (self.rows, self.cols)), shape=(len(self.row_lb), len(self.lb)))
+        start_time = time.time()
+        result = milp(np.array(self.c),
+                      constraints=LinearConstraint(A, self.row_lb, self.row_ub),
+                      integrality=np.array(self.integrality),
+                      bounds=Bounds(self.lb, self.ub),
+                      options=options)
+        solve_time = time.time() - start_time
+        self.result = result
+        self.node_count = getattr(result, 'mip_node_count', None)
+
+        if result.x is not None:
+            x = result.x[self.x]
+            u = result.x[self.u]
+            rho = result.x[self.rho]
+            if self.verbose:
+                print(f"Solve time: {solve_time}\nRobustness: {rho}")
+        else:
+            if self.verbose:
+                print(f"\nOptimization failed: {result.message}\n")
+            x, u, rho = None, None, -np.inf
+        return x, u, rho, solve_time
+
+    def _tighten(self, index, lb, ub):
+        self.lb[index] = max(self.lb[index], float(lb))
+        self.ub[index] = min(self.ub[index], float(ub))
+
+
+BACKENDS = {
+    "gurobi": GurobiBackend,
+    "highs": HighsBackend,
+    "gradient": GradientBackend,
+}
+
+def get_backend(name):
+    """
+    Returns a new backend instance by name ("gurobi", "highs" or "gradient").
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown solver backend '{name}', choose from {sorted(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,100 @@
+"""
+background.py
+
+Trajectory generation in a worker thread.
+
+A long MICP solve on the main thread blocks the conversation: the user cannot refine or abort the task,
+and Ctrl-C ends the whole session. A `SolveHandle` runs the trajectory generation of an `STLSolver` in a
+worker thread instead (Gurobi releases the GIL while optimizing) and behaves like a future:
+
+- `done()` / `wait(timeout)` / `result(timeout)` to poll or wait for the trajectory,
+- `incumbent` with the best trajectory found so far, updated through the incumbent callback,
+- `cancel()` to stop the solve, e.g. when a newer specification supersedes it. The Gurobi solve is
+  terminated and returns its incumbent. By default `cancel` waits until the worker thread has stopped,
+  since Gurobi models (and the model of a `PlanningSession`) must not be solved from two threads at once.
+  Backends that cannot be interrupted run until they finish. With a timeout, `cancel` returns the incumbent
+  known at that time, and the caller must `wait()` before the solver is used again.
+
+Classes:
+    - SolveHandle: Future-like handle of a trajectory generation running in a worker thread.
+
+Functions:
+    - solve_in_background(stl_solver, dt, max_acc, max_speed, **kwargs): Starts `generate_trajectory` in a worker thread.
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+class SolveHandle:
+    """
+    Future-like handle of a trajectory generation running in a worker thread.
+
+    Parameters:
+        stl_solver (STLSolver): The solver that is used by the target, and cancelled by `cancel`.
+        target (callable): Called as target(*args, incumbent_callback=callback, **kwargs) in the worker thread.
+                           Returns (x, u) or x.
+
+    Attributes:
+        incumbent (tuple): (x, u, objective) of the best trajectory found so far, None if there is none.
+        cancelled (bool): Whether `cancel` was called.
+
+    Methods:
+        done():
+            Returns True if the trajectory generation has finished.
+        wait(timeout=None):
+            Waits until the trajectory generation has finished or the timeout has passed. Returns done().
+        result(timeout=None):
+            Returns the result of the target, or raises its exception.
+        cancel(timeout=None):
+            Stops the trajectory generation, waits for the worker thread (at most timeout seconds, None for no
+            limit), and returns (x, u) of the best trajectory found, or (None, None).
+    """
+    def __init__(self, stl_solver, target, *args, **kwargs):
+        self.stl_solver = stl_solver
+        self.incumbent = None
+        self.cancelled = False
+        self.future = Future()
+        kwargs['incumbent_callback'] = self._on_incumbent
+        self.thread = threading.Thread(target=self._run, args=(target, args, kwargs), daemon=True)
+        self.thread.start()
+
+    def _run(self, target, args, kwargs):
+        try:
+            self.future.set_result(target(*args, **kwargs))
+        except BaseException as e:
+            self.future.set_exception(e)
+
+    def _on_incumbent(self, x, u, objective):
+        self.incumbent = (x, u, objective)
+
+    def done(self):
+        return self.future.done()
+
+    def wait(self, timeout=None):
+        self.thread.join(timeout)
+        return self.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def cancel(self, timeout=None):
+        self.cancelled = True
+        self.stl_solver.cancel()
+        if self.wait(timeout):
+            try:
+                result = self.result()
+            except Exception:
+                result = None
+            if isinstance(result, tuple) and result[0] is not None:
+                return result[:2]
+        if self.incumbent is not None:
+            return self.incumbent[:2]
+        return None, None
+
+
+def solve_in_background(stl_solver, dt, max_acc, max_speed, **kwargs):
+    """
+    Starts `stl_solver.generate_trajectory(dt, max_acc, max_speed, **kwargs)` in a worker thread and returns its `SolveHandle`.
+    """
+    return SolveHandle(stl_solver, stl_solver.generate_trajectory, dt, max_acc, max_speed, **kwargs)
@@ -0,0 +1,124 @@
+"""
+batch.py
+
+Solving one specification from many initial states.
+
+Coverage tests run the same specification from dozens of initial states (e.g. perturbations of
+`Scenarios.x0`). Building a new `STLSolver` and model for every start repeats the parsing, compilation
+and encoding of the specification. `STLSolver.generate_trajectory_batch` instead builds one model per
+worker, with position bounds that cover all of its initial states, and only changes the initial
+condition between the solves. The starts are split over worker processes, each with its own share of
+the Gurobi threads.
+
+Classes:
+    - BatchResult: Stacked trajectories, statuses and timings of a batch.
+
+Functions:
+    - solve_batch_parallel(stl_solver, x0s, dt, max_acc, max_speed, workers=None, threads_per_solve=None, **kwargs):
+        Splits a batch over worker processes.
+"""
+
+import os
+import multiprocessing
+import numpy as np
+from dataclasses import dataclass, field
+
+
+@dataclass
+class BatchResult:
+    """
+    The outcome of solving a specification from a batch of initial states.
+
+    Attributes:
+        x (numpy.ndarray): State trajectories, shape (count, 6, N+1), nan for starts without a trajectory.
+        u (numpy.ndarray): Control inputs, shape (count, 3, N+1), nan for starts without a trajectory.
+        status (list): Status of every start (see `SolveResult`).
+        objective (numpy.ndarray): Objective value of every start (nan if unknown).
+        solve_time (numpy.ndarray): Solve time of every start in seconds (nan if it was not solved).
+        build_times (list): Build time of every model in seconds, one model per worker.
+        errors (list): Reason why a start was not solved (e.g. the conflict found by the reachability check), or None.
+    """
+    x: np.ndarray
+    u: np.ndarray
+    status: list
+    objective: np.ndarray
+    solve_time: np.ndarray
+    build_times: list = field(default_factory=list)
+    errors: list = None
+
+    @classmethod
+    def empty(cls, count, N, n=6, m=3):
+        return cls(np.full((count, n, N+1), np.nan), np.full((count, m, N+1), np.nan), ["infeasible"]*count,
+                   np.full(count, np.nan), np.full(count, np.nan), [], [None]*count)
+
+    @property
+    def feasible(self):
+        """
+        Boolean mask of the starts with a trajectory.
+        """
+        return ~np.isnan(self.x).all(axis=(1, 2))
+
+    def set(self, i, result):
+        """
+        Stores the `SolveResult` of start i.
+        """
+        self.status[i] = result.status
+        self.objective[i] = result.objective
+        self.solve_time[i] = result.solve_time
+        if result.x is not None:
+            self.x[i], self.u[i] = result.x, result.u
+
+    def merge(self, indices, other):
+        """
+        Stores the results of another batch, solved for the starts with the given indices.
+        """
+        for j, i in enumerate(indices):
+            self.x[i], self.u[i] = other.x[j], other.u[j]
+            self.status[i] = other.status[j]
+            self.objective[i] = other.objective[j]
+            self.solve_time[i] = other.solve_time[j]
+            self.errors[i] = other.errors[j]
+        self.build_times += other.build_times
+
+
+def _solve_chunk(task):
+    # Solves a part of the batch in a worker process, with a single model
+    from STL.STL_to_path import STLSolver
+
+    spec, objects, x0s, T, dt, max_acc, max_speed, solver_kwargs, kwargs = task
+    solver = STLSolver(spec, objects, x0s[0], T, **solver_kwargs)
+    return solver.generate_trajectory_batch(x0s, dt, max_acc, max_speed, workers=1, **kwargs)
+
+
+def solve_batch_parallel(stl_solver, x0s, dt, max_acc, max_speed, workers=None, threads_per_solve=None, **kwargs):
+    """
+    Splits a batch over worker processes, each solving its starts with `generate_trajectory_batch` and a
+    single model. The workers use the backend of the solver by name and its configuration; the cache and the
+    session stay in this process. Returns the merged `BatchResult`.
+    """
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(x0s)))
+    threads_per_solve = threads_per_solve or max(1, cpus // workers)
+    chunks = [indices for indices in np.array_split(np.arange(len(x0s)), workers) if len(indices)]
+    solver_kwargs = {
+        'backend': stl_solver.backend.name,
+        'precheck': stl_solver.precheck,
+        'tight_bounds': stl_solver.tight_bounds,
+        'simplify': stl_solver.simplify,
+        'prune_obstacles': stl_solver.prune_obstacles,
+        'free_space': stl_solver.free_space,
+        'graph_warm_start': stl_solver.graph_warm_start,
+        'objective': stl_solver.objective,
+        'spatial_index': stl_solver.spatial_index,
+    }
+    kwargs['threads'] = threads_per_solve
+    tasks = [(stl_solver.spec, stl_solver.objects, x0s[indices], stl_solver.T, dt, max_acc, max_speed,
+              solver_kwargs, kwargs) for indices in chunks]
+
+    N = int(stl_solver.T/dt)
+    batch = BatchResult.empty(len(x0s), N, x0s.shape[1])
+    # spawn instead of fork: the calling process may hold a Gurobi environment, which is not fork-safe
+    with multiprocessing.get_context("spawn").Pool(len(chunks)) as pool:
+        for indices, result in zip(chunks, pool.map(_solve_chunk, tasks)):
+            batch.merge(indices, result)
+    return batch
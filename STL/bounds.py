@@ -0,0 +1,135 @@
+"""
+bounds.py
+
+Derivation of tight position bounds and big-M constants for the mixed-integer encoding.
+
+Without position bounds, the big-M constant of every predicate (a.T*y - b + (1-z)*M >= rho) has to be
+a large default (M = 1000), which gives a weak LP relaxation and slow branch-and-bound. The position of
+the drone is however bounded at every time step by:
+
+- the reachable set from x0 under the speed and acceleration bounds (see `ReachabilityAnalyzer`),
+- the workspace of the scenario: the bounding box of all objects and the initial position,
+- cuboids the drone must stay inside (a top-level always inside_cuboid, e.g. `room_bounds`).
+
+With per-step position bounds [lower_t, upper_t], the predicate value a.T*y_t - b lies in a known
+interval, and the robustness is bounded by the largest value of any predicate. The big-M constant of a
+predicate at step t only needs to cover the difference between the two.
+
+Functions:
+    - derive_position_bounds(spec_ast, objects, x0, N, dt, max_acc, max_speed, workspace=True):
+        Returns per-step lower and upper position bounds, each of shape (3, N+1).
+    - workspace_bounds(objects, positions): Bounding box of the objects and positions.
+    - predicate_range(formula, lower, upper): Range of a predicate's value over a position box.
+    - robustness_upper_bound(spec, lower, upper): Upper bound of the robustness of a compiled formula.
+    - big_M(formula, lower, upper, rho_max, default): Big-M constant of a predicate over a position box.
+"""
+
+import numpy as np
+from stlpy.STL import LinearPredicate
+from STL.spec_parser import Cuboid, And, Always
+from STL.reachability import ReachabilityAnalyzer
+
+
+def derive_position_bounds(spec_ast, objects, x0, N, dt, max_acc, max_speed, workspace=True):
+    """
+    Returns per-step position bounds (lower, upper), each of shape (3, N+1).
+
+    Parameters:
+        spec_ast (SpecNode): The specification, None for no specification.
+        objects (dict): Objects of the scenario, used for the workspace bounds.
+        x0 (numpy.ndarray): Initial state.
+        N (int): Number of time steps.
+        dt, max_acc, max_speed (float): Time step and bounds of the dynamics.
+        workspace (bool): Restrict the positions to the bounding box of the objects and x0. Default is True.
+    """
+    reachability = ReachabilityAnalyzer(x0, N, dt, max_acc, max_speed)
+    lower, upper = reachability.lower.copy(), reachability.upper.copy()
+
+    if workspace and objects:
+        _intersect(lower, upper, range(N+1), *workspace_bounds(objects, x0[None, :3]))
+
+    for node in _conjuncts(spec_ast):
+        if isinstance(node, Always) and isinstance(node.arg, Cuboid) and node.arg.inside:
+            steps = range(node.t1, min(node.t2, N) + 1)
+            cuboid_lower = np.array(node.arg.bounds[0::2]) + node.arg.tolerance
+            cuboid_upper = np.array(node.arg.bounds[1::2]) - node.arg.tolerance
+            _intersect(lower, upper, steps, cuboid_lower, cuboid_upper)
+
+    return lower, upper
+
+
+def workspace_bounds(objects, positions):
+    """
+    Returns the corners (lower, upper) of the workspace: the bounding box of the objects and the given
+    positions, of shape (count, 3) (e.g. the initial positions).
+    """
+    corners = np.array([bounds for bounds in objects.values()], dtype=float)
+    lower = np.minimum(corners[:, 0::2].min(axis=0), np.min(positions, axis=0))
+    upper = np.maximum(corners[:, 1::2].max(axis=0), np.max(positions, axis=0))
+    return lower, upper
+
+
+def _intersect(lower, upper, steps, box_lower, box_upper):
+    # Intersects the bounds of the given steps with a box, skipping steps where the intersection is empty
+    # (the infeasibility is then left to the solver)
+    for t in steps:
+        new_lower = np.maximum(lower[:, t], box_lower)
+        new_upper = np.minimum(upper[:, t], box_upper)
+        if np.all(new_lower <= new_upper):
+            lower[:, t], upper[:, t] = new_lower, new_upper
+
+
+def _conjuncts(node):
+    if node is None:
+        return []
+    if isinstance(node, And):
+        return [c for arg in node.args for c in _conjuncts(arg)]
+    return [node]
+
+
+def predicate_range(formula, lower, upper):
+    """
+    Returns the (minimum, maximum) of a.T*y - b over the position box [lower, upper], or
+    (-inf, inf) if the predicate depends on other outputs than the position.
+    """
+    a = formula.a.ravel()
+    if np.any(a[3:] != 0):
+        return -np.inf, np.inf
+    b = float(np.ravel(formula.b)[0])
+    low = np.sum(np.minimum(a[:3]*lower, a[:3]*upper)) - b
+    high = np.sum(np.maximum(a[:3]*lower, a[:3]*upper)) - b
+    return low, high
+
+
+def robustness_upper_bound(spec, lower, upper):
+    """
+    Returns an upper bound of the robustness of a compiled formula, for positions within the
+    per-step bounds. At least one predicate is active in a satisfying trajectory, so the robustness
+    is at most the largest value any predicate can take.
+    """
+    box_lower, box_upper = lower.min(axis=1), upper.max(axis=1)
+    rho_max = -np.inf
+    stack, seen = [spec], set()
+    while stack:
+        formula = stack.pop()
+        if id(formula) in seen:
+            continue
+        seen.add(id(formula))
+        if isinstance(formula, LinearPredicate):
+            rho_max = max(rho_max, predicate_range(formula, box_lower, box_upper)[1])
+        else:
+            stack.extend(formula.subformula_list)
+    return max(rho_max, 0.0)
+
+
+def big_M(formula, lower, upper, rho_max, default):
+    """
+    Returns the smallest big-M constant of a predicate at a time step with position bounds [lower, upper],
+    such that a.T*y - b + M >= rho holds for every position in the box and rho <= rho_max.
+    Returns the default if the bounds do not give a smaller constant.
+    """
+    low, _ = predicate_range(formula, lower, upper)
+    M = rho_max - low
+    if not np.isfinite(M) or M >= default:
+        return default
+    return max(M, 0.0)
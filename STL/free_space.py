@@ -0,0 +1,179 @@
+"""
+free_space.py
+
+Decomposition of the free space of a scenario into overlapping boxes, used to encode obstacle avoidance
+without the disjunction over the faces of every obstacle.
+
+An `outside_cuboid(...).always(t1, t2)` constraint is encoded as a disjunction of the six half-spaces of
+the cuboid, with one binary variable per face and time step: 6 * obstacles binaries per step. The free
+space between the obstacles can however be covered by a set of axis-aligned boxes. Avoiding all obstacles
+is then equivalent to being inside one of the boxes, which takes one binary variable per box and time step
+(and only for the boxes that intersect the position bounds of the step).
+
+The decomposition works on the rectilinear grid spanned by the faces of the obstacles and the region: every
+grid cell is either free or inside an obstacle. Starting from a free cell that is not covered yet, a box is
+grown one layer of cells at a time in all six directions, as long as the layer is free. Boxes may grow over
+covered cells, so the boxes overlap and are maximal. This is repeated until every free cell is covered.
+
+The boxes are closed, like the avoidance constraints: a position on the (tolerance-expanded) face of an
+obstacle is free. Positions are restricted to the region, which should extend beyond the obstacles, so that
+their faces at the border of the region are free as well. The seam between two touching obstacles is not
+free, unlike in the disjunctive encoding, which allows a time step exactly on the shared face.
+
+Classes:
+    - FreeSpace: A decomposition of the free space into boxes.
+
+Functions:
+    - decompose_free_space(region, obstacles): Returns the `FreeSpace` of a region with obstacles.
+    - split_avoidance(spec_ast, N): Splits the top-level avoidance constraints from a specification.
+"""
+
+import numpy as np
+from STL.spec_parser import Cuboid, And, Always
+
+
+class FreeSpace:
+    """
+    A decomposition of the free space of a region into overlapping axis-aligned boxes.
+
+    Parameters:
+        region (tuple): Bounds (xmin, xmax, ymin, ymax, zmin, zmax) of the region.
+        obstacles (list): Bounds of the obstacles, in the same format.
+        lower, upper (numpy.ndarray): Corners of the boxes, each of shape (count, 3).
+
+    Attributes:
+        boxes (list): Bounds of the boxes, in the format of the objects of `Scenarios`.
+
+    Methods:
+        contains(positions): Whether positions of shape (3, T) are in the free space.
+        candidates(lower, upper): Boolean mask of the boxes that intersect the position box [lower, upper].
+        big_M(lower, upper, default): The boxes and big-M constants of the encoding at a time step.
+    """
+    def __init__(self, region, obstacles, lower, upper):
+        self.region = tuple(region)
+        self.obstacles = [tuple(obstacle) for obstacle in obstacles]
+        self.lower = lower
+        self.upper = upper
+
+    def __len__(self):
+        return len(self.lower)
+
+    @property
+    def boxes(self):
+        return [tuple(float(v) for pair in zip(lower, upper) for v in pair)
+                for lower, upper in zip(self.lower, self.upper)]
+
+    def contains(self, positions):
+        positions = np.asarray(positions, dtype=float)[:, None, :] # (3, 1, T)
+        inside = np.all((positions >= self.lower.T[:, :, None]) & (positions <= self.upper.T[:, :, None]), axis=0)
+        return np.any(inside, axis=0)
+
+    def candidates(self, lower, upper):
+        return np.all((self.upper >= lower) & (self.lower <= upper), axis=1)
+
+    def big_M(self, lower, upper, default):
+        """
+        Returns the boxes that can contain a position within the bounds [lower, upper] (all boxes if none can,
+        so the infeasibility is left to the solver), and the big-M constants (M_lower, M_upper) of
+        position >= box_lower - M_lower*(1-z) and position <= box_upper + M_upper*(1-z), each of shape (boxes, 3).
+        A constant of 0 marks a constraint that always holds within the bounds.
+        """
+        boxes = np.flatnonzero(self.candidates(lower, upper))
+        if not len(boxes):
+            boxes = np.arange(len(self))
+        M_lower = np.minimum(np.maximum(self.lower[boxes] - lower, 0.0), default)
+        M_upper = np.minimum(np.maximum(upper - self.upper[boxes], 0.0), default)
+        return boxes, M_lower, M_upper
+
+
+def decompose_free_space(region, obstacles):
+    """
+    Decomposes the free space of a region into overlapping boxes.
+
+    Parameters:
+        region (tuple): Bounds (xmin, xmax, ymin, ymax, zmin, zmax) of the region.
+        obstacles (list): Bounds of the obstacles, in the same format. The interior of an obstacle is not free,
+                          its faces are. Obstacles (or parts of them) outside the region are ignored.
+
+    Returns:
+        FreeSpace: The boxes, which together cover exactly the free space of the region.
+    """
+    region_lower = np.array(region[0::2], dtype=float)
+    region_upper = np.array(region[1::2], dtype=float)
+    clipped = []
+    for obstacle in obstacles:
+        lower = np.maximum(np.array(obstacle[0::2], dtype=float), region_lower)
+        upper = np.minimum(np.array(obstacle[1::2], dtype=float), region_upper)
+        if np.all(lower < upper):
+            clipped.append((lower, upper))
+
+    # The grid lines of every axis are the faces of the region and of the obstacles
+    grid = [np.unique(np.concatenate([[region_lower[i], region_upper[i]]] +
+                                     [[lower[i], upper[i]] for lower, upper in clipped])) for i in range(3)]
+    free = np.ones([len(lines) - 1 for lines in grid], dtype=bool)
+    for lower, upper in clipped:
+        cells = tuple(slice(np.searchsorted(grid[i], lower[i]), np.searchsorted(grid[i], upper[i])) for i in range(3))
+        free[cells] = False
+
+    covered = ~free
+    cell_boxes = []
+    while not np.all(covered):
+        seed = np.array(np.unravel_index(np.argmin(covered), covered.shape))
+        box = _grow(free, seed)
+        cell_boxes.append(box)
+        covered[tuple(slice(box[0][i], box[1][i] + 1) for i in range(3))] = True
+    # A box that grew over an earlier box makes it redundant
+    cell_boxes = [box for j, box in enumerate(cell_boxes)
+                  if not any(np.all(other[0] <= box[0]) and np.all(box[1] <= other[1]) for other in cell_boxes[j+1:])]
+
+    lower = np.array([[grid[i][box[0][i]] for i in range(3)] for box in cell_boxes]).reshape(-1, 3)
+    upper = np.array([[grid[i][box[1][i] + 1] for i in range(3)] for box in cell_boxes]).reshape(-1, 3)
+    return FreeSpace(region, [tuple(v for pair in zip(*obstacle) for v in pair) for obstacle in clipped], lower, upper)
+
+
+def _grow(free, seed):
+    # Grows the box of cells [first, last] from the seed cell, one free layer at a time in every direction
+    first, last = seed.copy(), seed.copy()
+    grown = True
+    while grown:
+        grown = False
+        for axis in range(3):
+            for direction in (-1, 1):
+                index = first[axis] - 1 if direction < 0 else last[axis] + 1
+                if index < 0 or index >= free.shape[axis]:
+                    continue
+                layer = [slice(first[i], last[i] + 1) for i in range(3)]
+                layer[axis] = index
+                if np.all(free[tuple(layer)]):
+                    if direction < 0:
+                        first[axis] = index
+                    else:
+                        last[axis] = index
+                    grown = True
+    return first, last
+
+
+def split_avoidance(spec_ast, N):
+    """
+    Splits the avoidance constraints (always outside a cuboid) from the top-level conjunction of a specification
+    with N time steps.
+
+    Returns:
+        rest (SpecNode): The specification without the avoidance constraints, None if nothing remains.
+        obstacles (dict): Maps every time window (t1, t2), clamped to the horizon, to the bounds of the obstacles
+                          that are avoided during it, expanded by their tolerance.
+    """
+    conjuncts = list(spec_ast.args) if isinstance(spec_ast, And) else [spec_ast]
+    rest, obstacles = [], {}
+    for node in conjuncts:
+        if isinstance(node, Always) and isinstance(node.arg, Cuboid) and not node.arg.inside and node.t1 <= N:
+            cuboid = node.arg
+            expanded = tuple(b - cuboid.tolerance if i % 2 == 0 else b + cuboid.tolerance
+                             for i, b in enumerate(cuboid.bounds))
+            obstacles.setdefault((node.t1, min(node.t2, N)), []).append(expanded)
+        else:
+            rest.append(node)
+
+    if not rest:
+        return None, obstacles
+    return (rest[0] if len(rest) == 1 else And(tuple(rest))), obstacles
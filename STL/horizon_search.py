@@ -0,0 +1,140 @@
+"""
+horizon_search.py
+
+Search for the shortest horizon at which a specification is feasible.
+
+The time horizon of a scenario (`Scenarios.get_time_horizon`) is a guess: a horizon that is too long
+inflates the MICP with binaries for time steps the drone does not need, and a horizon that is too short
+makes the specification infeasible. The `HorizonSearch` finds the smallest number of time steps n <= N
+for which the specification has a satisfying trajectory of n steps:
+
+- at horizon n, the time windows of the specification are clamped to [0, n] (see `simplify_spec`): the
+  `eventually` deadlines must be met within n steps, and `always` obligations only hold until step n,
+- the horizons are bisected between the largest horizon known to be infeasible and the smallest one known
+  to be feasible, assuming that feasibility is monotone in the horizon,
+- horizons that are provably infeasible are rejected without a solve: clamped specifications that are
+  trivially false, and kinematically infeasible ones (see `ReachabilityAnalyzer`). Solve results are
+  looked up in and stored to the solve cache of the `STLSolver`, so infeasible horizons are not solved again,
+- every solve is warm-started from the last feasible trajectory, stretched to the new horizon: the predicate
+  binaries and positions are given as hints (Gurobi `VarHintVal`), as in `CoarseToFinePlanner`.
+
+A solve that is stopped by the time limit without a trajectory counts as infeasible. A cancelled search
+returns the shortest feasible trajectory found so far.
+
+Classes:
+    - HorizonSearch: Finds the shortest feasible horizon of a specification for an `STLSolver`.
+"""
+
+import numpy as np
+from STL.backends import SolveResult
+from STL.simplify import simplify_spec, TRUE, FALSE
+from STL.reachability import ReachabilityAnalyzer, SpecInfeasibleError
+from STL.receding_horizon import horizon
+
+
+class HorizonSearch:
+    """
+    Finds the smallest horizon n <= N at which the specification is feasible, by bisection.
+
+    Parameters:
+        stl_solver (STLSolver): The solver whose dynamics, bounds, cache and solve options are used.
+                                Its dt, max_acc, max_speed and verbose attributes must be set.
+        N_min (int): Smallest horizon to consider. Default is 1.
+
+    Attributes:
+        stats (dict): The chosen horizon N, every probed horizon with its status, the source of the status
+                      ("solve", "cache", "precheck" or "horizon") and its solve time, and the total number of
+                      solves, solve time and build time spent.
+
+    Methods:
+        plan(spec_ast, x0, N):
+            Returns (x, u) of the shortest feasible trajectory, of shape (6, n+1) and (3, n+1), or (None, None)
+            if the specification is infeasible at horizon N.
+    """
+    def __init__(self, stl_solver, N_min=1):
+        self.stl_solver = stl_solver
+        self.N_min = max(int(N_min), 1)
+        self.stats = {}
+        self.feasible = None # (n, x, binaries) of the shortest feasible horizon so far
+
+    def plan(self, spec_ast, x0, N):
+        self.stats = {'N': None, 'probes': [], 'solves': 0, 'solve_time': 0.0, 'build_time': 0.0}
+        self.feasible = None
+
+        # The full horizon first: if it is infeasible, so is every shorter one
+        best = self._probe(spec_ast, x0, N)
+        if best[0] is None:
+            return None, None
+        low, high = min(self.N_min, N) - 1, N
+        while high - low > 1 and not self.stl_solver.cancelled:
+            n = (low + high)//2
+            result = self._probe(spec_ast, x0, n)
+            if result[0] is not None:
+                high, best = n, result
+            else:
+                low = n
+
+        x, u, solve_result = best
+        self.stl_solver.result = solve_result
+        self.stats['N'] = high
+        if self.stl_solver.verbose:
+            print(f"Shortest feasible horizon: {high} time steps ({high*self.stl_solver.dt:g} s), found with "
+                  f"{self.stats['solves']} solves in {self.stats['solve_time']:.2f} s.")
+        return x, u
+
+    def _probe(self, spec_ast, x0, n):
+        # Returns (x, u, SolveResult) at horizon n, with x and u None if it is infeasible
+        s = self.stl_solver
+        clamped = simplify_spec(spec_ast, n)
+        if clamped is FALSE or (clamped is not TRUE and horizon(clamped) > n):
+            # A deadline lies beyond the horizon, or a nested window cannot be clamped
+            return self._record(n, "infeasible", "horizon")
+        clamped = None if clamped is TRUE else clamped
+
+        if s.precheck and clamped is not None:
+            try:
+                ReachabilityAnalyzer(x0, n, s.dt, s.max_acc, s.max_speed).check(clamped)
+            except SpecInfeasibleError:
+                return self._record(n, "infeasible", "precheck")
+
+        key = None
+        if s.cache is not None:
+            key = s.cache.make_key(clamped, s.objects, x0, n*s.dt, s.dt, s.max_acc, s.max_speed,
+                                   mode='horizon_search', **s.cache_options())
+            found, x, u = s.cache.get(key)
+            if found:
+                return self._record(n, "infeasible" if x is None else "optimal", "cache", x, u)
+
+        solver = s.build_solver(clamped, x0, n)
+        if s.backend.supports_model_edits and self.feasible is not None:
+            self._hint(solver, n)
+        x, u = s.solve(solver)
+        self.stats['solves'] += 1
+        self.stats['solve_time'] += float(np.nan_to_num(s.result.solve_time))
+        self.stats['build_time'] += solver.build_time
+        if x is not None and s.backend.supports_model_edits:
+            self.feasible = (n, x, {k: z.X[0] for k, z in solver.predicate_variables.items()})
+        if key is not None and s.result.status in ("optimal", "infeasible"):
+            s.cache.put(key, x, u)
+        return self._record(n, s.result.status, "solve", x, u, s.result)
+
+    def _hint(self, solver, n):
+        # Hints the binaries and positions of the last feasible trajectory, stretched from its horizon to n
+        n_feasible, x, binaries = self.feasible
+        steps = np.minimum(np.round(np.arange(n + 1)*n_feasible/n).astype(int), n_feasible)
+        solver.x[:3,:].VarHintVal = x[:3, steps]
+        for (predicate, t), z in solver.predicate_variables.items():
+            value = binaries.get((predicate, int(steps[t])))
+            if value is not None:
+                z.VarHintVal = value
+
+    def _record(self, n, status, source, x=None, u=None, result=None):
+        self.stats['probes'].append({
+            'N': n,
+            'status': status,
+            'source': source,
+            'solve_time': result.solve_time if result is not None else 0.0,
+        })
+        if self.stl_solver.verbose:
+            print(f"Horizon {n}: {status} ({source})")
+        return x, u, result if result is not None else SolveResult(status, x, u)
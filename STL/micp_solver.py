@@ -0,0 +1,232 @@
+"""
+micp_solver.py
+
+Provides the `MICPSolver` class, the mixed-integer encoding of STL specifications used by the `STLSolver`.
+
+The class extends `stlpy`'s `GurobiMICPSolver`. The original encoding walks the formula tree and
+introduces new variables for every node it visits, so a sub-formula that occurs several times in a
+specification (e.g. the same obstacle under two temporal operators, or a face shared by two
+adjacent walls) is encoded several times, each time with its own binary variables. The `MICPSolver`
+memoizes the encoding on (formula, time step): a formula object that was already encoded at a
+given time step reuses the existing variable. Combined with the interned formulas of
+`STL_formulas` and the memoized `SpecCompiler`, structurally identical sub-formulas are encoded once.
+
+Given per-step position bounds (see `bounds.py`), the positions are bounded accordingly, the robustness
+gets an upper bound, and every predicate gets its own (much smaller) big-M constant per time step.
+
+Besides the quadratic cost of `stlpy`, the L1 and L-infinity efforts can be added as costs. They are encoded with
+auxiliary variables, so the model stays an MILP, which Gurobi solves faster than the MIQP of the quadratic cost.
+
+Avoidance constraints can be replaced by a decomposition of the free space into boxes (see `free_space.py`):
+the position is then inside one of the boxes, with one binary variable per box and time step.
+"""
+
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+from stlpy.STL import LinearPredicate, NonlinearPredicate
+from stlpy.solvers import GurobiMICPSolver
+from STL.bounds import big_M, robustness_upper_bound
+
+
+class MICPSolver(GurobiMICPSolver):
+    """
+    A `GurobiMICPSolver` that encodes every (sub-formula, time step) pair only once.
+
+    Every predicate gets a single binary variable per time step, which is shared by all the
+    formulas containing that predicate. Conjunctions and disjunctions get a continuous variable
+    in [0, 1] per time step.
+
+    Parameters:
+        See `stlpy.solvers.GurobiMICPSolver`.
+        position_bounds (tuple): Optional per-step position bounds (lower, upper), each of shape (3, N+1).
+                                 Default is None, which uses the constant big-M of `stlpy`.
+        free_space (list): Optional (steps, FreeSpace) pairs: at every step the position must be inside one of
+                           the boxes of the decomposition. Default is None.
+
+    Attributes:
+        encoded (dict): Maps (id(formula), t) to the Gurobi variable of the formula at time step t.
+        predicate_variables (dict): The subset of `encoded` of the predicates, i.e. the binary variables.
+        free_space_variables (dict): Maps (index of the decomposition, t) to the indices of the candidate boxes
+                                     and their binary variables.
+        encoding_constraints (dict): Maps (id(formula), t) to the constraints added for that encoding.
+        spec_constraint: The constraint z_spec == 1 (or rho <= 0 without a specification).
+        initial_constraint: The constraint x[:,0] == x0, changed by `SetInitialState`.
+        shared_encodings (int): Number of times an existing encoding was reused.
+        rho_max (float): Upper bound of the robustness derived from the position bounds (inf without bounds).
+    """
+    def __init__(self, spec, sys, x0, T, position_bounds=None, free_space=None, **kwargs):
+        # The STL constraints are added by the constructor of the parent class, so the bounds are set first
+        self.position_bounds = position_bounds
+        self.free_space = free_space or []
+        super().__init__(spec, sys, x0, T, **kwargs)
+
+    def AddDynamicsConstraints(self):
+        # As in `GurobiMICPSolver`, but keeps the initial condition, so it can be changed by `SetInitialState`
+        self.initial_constraint = self.model.addConstr( self.x[:,0] == self.x0 )
+
+        for t in range(self.T-1):
+            self.model.addConstr( self.x[:,t+1] == self.sys.A@self.x[:,t] + self.sys.B@self.u[:,t] )
+            self.model.addConstr( self.y[:,t] == self.sys.C@self.x[:,t] + self.sys.D@self.u[:,t] )
+        self.model.addConstr( self.y[:,self.T-1] == self.sys.C@self.x[:,self.T-1] + self.sys.D@self.u[:,self.T-1] )
+
+    def SetInitialState(self, x0):
+        """
+        Changes the initial state of the model in place. The position bounds must cover the new initial state.
+        """
+        self.x0 = x0
+        self.initial_constraint.RHS = x0
+
+    def AddSTLConstraints(self):
+        self.encoded = {}
+        self.predicate_variables = {}
+        self.encoding_constraints = {}
+        self.shared_encodings = 0
+
+        self.rho_max = float('inf')
+        if self.position_bounds is not None:
+            self.x[:3,:].lb = self.position_bounds[0]
+            self.x[:3,:].ub = self.position_bounds[1]
+        self.AddFreeSpaceConstraints()
+
+        # Without a specification only the dynamics, bounds and costs remain.
+        # The robustness is fixed to zero to keep the robustness cost bounded.
+        if self.spec is None:
+            self.spec_constraint = self.model.addConstr( self.rho <= 0 )
+            return
+
+        if self.position_bounds is not None:
+            self.rho_max = robustness_upper_bound(self.spec, *self.position_bounds)
+            self.rho.ub = self.rho_max
+
+        z_spec = self.AddSubformulaVariable(self.spec, 0)
+        self.spec_constraint = self.model.addConstr( z_spec == 1 )
+
+    def AddFreeSpaceConstraints(self):
+        """
+        Constrains the position to one of the boxes of every free space decomposition at its time steps.
+        """
+        self.free_space_variables = {}
+        for index, (steps, free_space) in enumerate(self.free_space):
+            for t in steps:
+                if self.position_bounds is not None:
+                    lower, upper = self.position_bounds[0][:,t], self.position_bounds[1][:,t]
+                else:
+                    lower, upper = np.full(3, -np.inf), np.full(3, np.inf)
+                boxes, M_lower, M_upper = free_space.big_M(lower, upper, self.M)
+                z = self.model.addMVar(len(boxes), vtype=GRB.BINARY)
+                self.model.addConstr( z.sum() == 1 )
+                for j, k in enumerate(boxes):
+                    for i in range(3):
+                        # position >= box_lower - (1-z)*M and position <= box_upper + (1-z)*M
+                        if M_lower[j,i] > 0:
+                            self.model.addConstr( self.x[i,t] + M_lower[j,i]*(1-z[j]) >= free_space.lower[k,i] )
+                        if M_upper[j,i] > 0:
+                            self.model.addConstr( self.x[i,t] - M_upper[j,i]*(1-z[j]) <= free_space.upper[k,i] )
+                self.free_space_variables[(index, t)] = (boxes, z)
+
+    def AddSubformulaVariable(self, formula, t):
+        """
+        Returns a variable z that can only take value 1 if the formula is satisfied at time step t,
+        adding the variable and its constraints to the model if this (formula, t) pair is new.
+        """
+        key = (id(formula), t)
+        if key in self.encoded:
+            self.shared_encodings += 1
+            return self.encoded[key]
+
+        if isinstance(formula, LinearPredicate):
+            # a.T*y - b + (1-z)*M >= rho
+            z = self.model.addMVar(1, vtype=GRB.BINARY)
+            M = self.M
+            if self.position_bounds is not None:
+                M = big_M(formula, self.position_bounds[0][:,t], self.position_bounds[1][:,t], self.rho_max, self.M)
+            constraints = [self.model.addConstr( formula.a.T@self.y[:,t] - formula.b + (1-z)*M >= self.rho )]
+            self.predicate_variables[key] = z
+
+        elif isinstance(formula, NonlinearPredicate):
+            raise TypeError("Mixed integer programming does not support nonlinear predicates")
+
+        else:
+            z_subs = [self.AddSubformulaVariable(subformula, t + formula.timesteps[i])
+                      for i, subformula in enumerate(formula.subformula_list)]
+            z = self.model.addMVar(1, vtype=GRB.CONTINUOUS, ub=1.0)
+            if formula.combination_type == "and":
+                constraints = [self.model.addConstr( z <= z_sub ) for z_sub in z_subs]
+            else: # combination_type == "or"
+                constraints = [self.model.addConstr( z <= gp.quicksum(z_subs) )]
+
+        self.encoded[key] = z
+        self.encoding_constraints[key] = constraints
+        return z
+
+    def Solve(self, callback=None):
+        """
+        Solves the model like `GurobiMICPSolver.Solve`, but returns the best solution found whenever there is one
+        (e.g. when a time limit or solution limit stops the solve early). The callback is passed to Gurobi.
+        """
+        self.model.setObjective(self.cost, GRB.MINIMIZE)
+        self.model.optimize(callback)
+
+        if self.model.SolCount > 0:
+            x = self.x.X
+            u = self.u.X
+            rho = self.rho.X[0]
+            if self.verbose:
+                print(f"\nSolution found with status {self.model.Status}.\n")
+                print("Solve time: ", self.model.Runtime)
+                print("Robustness: ", rho)
+        else:
+            if self.verbose:
+                print(f"\nOptimization failed with status {self.model.Status}.\n")
+            x = None
+            u = None
+            rho = -np.inf
+
+        return (x,u,rho,self.model.Runtime)
+
+    def AddQuadraticCost(self, Q, R):
+        for t in range(self.T):
+            self.cost += self.x[:,t]@Q@self.x[:,t] + self.u[:,t]@R@self.u[:,t]
+
+    def AddL1Cost(self, q, r):
+        """
+        Adds sum_t q@|x_t| + r@|u_t| to the cost, with auxiliary variables s >= |v| so the cost stays linear.
+        """
+        for weights, variables in ((q, self.x), (r, self.u)):
+            weights = np.asarray(weights, dtype=float)
+            rows = np.flatnonzero(weights)
+            if len(rows) == 0:
+                continue
+            s = self.model.addMVar((len(rows), self.T), lb=0.0)
+            self.model.addConstr( s >= variables[rows,:] )
+            self.model.addConstr( s >= -variables[rows,:] )
+            self.cost += gp.quicksum(weights[i]*s[j,t] for j, i in enumerate(rows) for t in range(self.T))
+
+    def AddTargetCost(self, t, target, weight, linear=False):
+        """
+        Adds weight*||p_t - target||^2 to the cost for the position p_t at time step t, or weight*||p_t - target||_1
+        with auxiliary variables if linear, so the L1, L-infinity and feasibility objectives stay linear.
+        """
+        error = self.x[:3, t] - np.asarray(target, dtype=float)
+        if not linear:
+            self.cost += weight*(error@error)
+            return
+        s = self.model.addMVar(3, lb=0.0)
+        self.model.addConstr( s >= error )
+        self.model.addConstr( s >= -error )
+        self.cost += weight*s.sum()
+
+    def AddLinfCost(self, q, r):
+        """
+        Adds sum_t max(q*|x_t|, r*|u_t|) to the cost, with one auxiliary variable per time step so the cost
+        stays linear.
+        """
+        s = self.model.addMVar(self.T, lb=0.0)
+        for weights, variables in ((q, self.x), (r, self.u)):
+            for i, weight in enumerate(np.asarray(weights, dtype=float)):
+                if weight == 0:
+                    continue
+                self.model.addConstr( s >= weight*variables[i,:] )
+                self.model.addConstr( s >= -weight*variables[i,:] )
+        self.cost += s.sum()
@@ -0,0 +1,136 @@
+"""
+multi_resolution.py
+
+Coarse-to-fine time discretization for trajectory generation.
+
+Most of the MICP solve time goes into the discrete structure of the solution: which side of every
+obstacle the drone passes (the active disjunct of each `outside_cuboid`) and when each `eventually`
+fires. This structure hardly depends on the time step. The `CoarseToFinePlanner` therefore:
+
+1. solves the specification at a coarse time step factor*dt, with all time intervals of the specification
+   scaled to the coarse time grid (N/factor steps instead of N),
+2. builds the model at the target time step dt and transfers the predicate binaries of the coarse
+   solution: a fine binary is fixed to 1 when the predicate was active at both neighbouring coarse time
+   steps, and every fine binary gets the coarse value as a hint (Gurobi `VarHintVal`). The transitions
+   between coarse time steps stay free, so the fine problem keeps only a small number of free binaries.
+3. If the fixed problem is infeasible, the fixings are released and the fine problem is solved with the
+   hints only.
+
+The returned (x, u) have the same shape as those of the monolithic solve at dt. The cuboid predicates
+are interned by `STL_formulas`, so the coarse and fine models share the predicate objects and their
+binaries can be matched by (predicate, time step).
+
+Classes:
+    - CoarseToFinePlanner: Plans a trajectory at a coarse time step and refines it.
+
+Functions:
+    - scale_times(node, factor, N_coarse): Maps the time intervals of a specification to the coarse time grid.
+"""
+
+import math
+import time
+import numpy as np
+from STL.spec_parser import Cuboid, And, Or, Always, Eventually, Until
+
+
+def scale_times(node, factor, N_coarse):
+    """
+    Maps the time intervals of a specification from the fine to the coarse time grid.
+
+    `always` intervals are widened to the enclosing coarse steps, so the coarse solution respects them at
+    least as strictly. `eventually` and `until` deadlines are narrowed to coarse steps inside the fine
+    interval where possible, so the coarse solution fires at a time that is also valid at the fine resolution.
+    All times are clipped to [0, N_coarse].
+    """
+    clip = lambda t: min(max(t, 0), N_coarse)
+
+    if isinstance(node, Cuboid):
+        return node
+    if isinstance(node, (And, Or)):
+        return type(node)(tuple(scale_times(arg, factor, N_coarse) for arg in node.args))
+
+    if isinstance(node, Always):
+        t1, t2 = clip(node.t1 // factor), clip(math.ceil(node.t2 / factor))
+        return Always(scale_times(node.arg, factor, N_coarse), t1, t2)
+
+    t1, t2 = clip(math.ceil(node.t1 / factor)), clip(node.t2 // factor)
+    if t1 > t2: # no coarse step inside the interval, use the nearest one
+        t1 = t2 = clip(round(node.t1 / factor))
+    if isinstance(node, Eventually):
+        return Eventually(scale_times(node.arg, factor, N_coarse), t1, t2)
+    return Until(scale_times(node.left, factor, N_coarse), scale_times(node.right, factor, N_coarse), t1, t2)
+
+
+class CoarseToFinePlanner:
+    """
+    Plans a trajectory for an `STLSolver` at a coarse time step and refines it at the target time step.
+
+    Parameters:
+        stl_solver (STLSolver): The solver whose dynamics, bounds and cost are used.
+                                Its dt, max_acc, max_speed and verbose attributes must be set.
+        factor (int): Ratio between the coarse and the target time step. Default is 4.
+        fix_binaries (bool): Fix binaries that are active on both neighbouring coarse steps (True), or only
+                             pass the coarse solution as hints (False). Default is True.
+
+    Attributes:
+        stats (dict): Coarse and fine solve times, numbers of fixed and hinted binaries, and whether the
+                      fixings had to be released.
+
+    Methods:
+        plan(spec_ast, x0, N):
+            Returns (x, u) at the target time step, or (None, None) if the problem is infeasible.
+    """
+    def __init__(self, stl_solver, factor=4, fix_binaries=True):
+        assert factor >= 1, "factor should be a positive integer"
+        self.stl_solver = stl_solver
+        self.factor = int(factor)
+        self.fix_binaries = fix_binaries
+        self.stats = {}
+
+    def plan(self, spec_ast, x0, N):
+        N_coarse = max(N // self.factor, 1)
+        coarse_spec = scale_times(spec_ast, self.factor, N_coarse)
+
+        # 1. Coarse solve
+        start_time = time.time()
+        coarse = self.stl_solver.build_solver(coarse_spec, x0, N_coarse, dt=self.stl_solver.dt*self.factor)
+        x_coarse, _ = self.stl_solver.solve(coarse)
+        self.stats = {'coarse_steps': N_coarse, 'coarse_time': time.time() - start_time}
+
+        fine = self.stl_solver.build_solver(spec_ast, x0, N)
+        if x_coarse is None:
+            # The coarse grid can be too restrictive (e.g. a short eventually window): solve without guidance
+            self.stats.update({'fixed': 0, 'hinted': 0, 'released': False})
+            return self._solve_fine(fine)
+
+        # 2. Transfer the predicate binaries
+        coarse_values = {key: z.X[0] > 0.5 for key, z in coarse.predicate_variables.items()}
+        fixed = []
+        hinted = 0
+        for (predicate, t), z in fine.predicate_variables.items():
+            c0 = min(t // self.factor, N_coarse)
+            c1 = min(c0 + 1, N_coarse) if t % self.factor else c0
+            nearest = min(round(t / self.factor), N_coarse)
+            hint = coarse_values.get((predicate, nearest))
+            if hint is not None:
+                z.VarHintVal = float(hint)
+                hinted += 1
+            if self.fix_binaries and coarse_values.get((predicate, c0)) and coarse_values.get((predicate, c1)):
+                z.lb = 1.0
+                fixed.append(z)
+        self.stats.update({'fixed': len(fixed), 'hinted': hinted, 'released': False})
+
+        # 3. Fine solve, releasing the fixings if they make the problem infeasible
+        x, u = self._solve_fine(fine)
+        if x is None and fixed:
+            for z in fixed:
+                z.lb = 0.0
+            self.stats['released'] = True
+            x, u = self._solve_fine(fine)
+        return x, u
+
+    def _solve_fine(self, fine):
+        start_time = time.time()
+        x, u = self.stl_solver.solve(fine)
+        self.stats['fine_time'] = self.stats.get('fine_time', 0.0) + time.time() - start_time
+        return x, u
@@ -0,0 +1,138 @@
+"""
+portfolio.py
+
+Parallel solving of a portfolio of candidate specifications.
+
+When the LLM is unsure about a task, it can return several candidate specifications. Instead of solving and
+rejecting them one by one in the feedback loop of `main.py`, `solve_portfolio` solves all candidates at once,
+each in its own process with its own share of the Gurobi threads. Every result is checked locally: the
+trajectory must satisfy the specification (non-negative robustness, see `RobustnessMonitor`) and pass an optional
+user-defined check. The portfolio either stops at the first candidate that passes, or solves all candidates
+and ranks them by cost.
+
+Worker processes do not share the in-memory solve cache of the caller. If a `cache_dir` is given, the workers
+store their trajectories in the on-disk tier of the `TrajectoryCache`, so solving the chosen candidate again
+(e.g. in the regular pipeline) is a cache hit.
+
+Classes:
+    - PortfolioEntry: The outcome of one candidate.
+
+Functions:
+    - solve_portfolio(specs, objects, x0, T, dt, max_acc, max_speed, ...): Solves candidate specifications in parallel.
+"""
+
+import os
+import time
+import multiprocessing
+import numpy as np
+from dataclasses import dataclass
+
+
+@dataclass
+class PortfolioEntry:
+    """
+    The outcome of one candidate specification.
+
+    Attributes:
+        index (int): Index of the candidate in the portfolio.
+        spec (str): The candidate specification.
+        status (str): Status of the solve (see `SolveResult`), or "error" if the candidate could not be solved,
+                      e.g. because of a syntax error.
+        x (numpy.ndarray): State trajectory, None if there is none.
+        u (numpy.ndarray): Control inputs, None if there is none.
+        cost (float): Control effort sum(u**2) of the trajectory (nan if there is none). Unlike the objective of
+                      the solver, it does not depend on the backend, and is also known for cached trajectories.
+        robustness (float): Robustness of the trajectory with respect to the candidate (nan if there is none).
+        passed (bool): Whether the trajectory passed the local checks.
+        solve_time (float): Wall-clock time of the candidate in seconds.
+        telemetry (dict): `STLSolver.telemetry()` of the solve, None if the candidate could not be solved.
+        error (str): Reason why the candidate could not be solved, e.g. the syntax error or the conflict found
+                     by the reachability check.
+    """
+    index: int
+    spec: str
+    status: str
+    x: np.ndarray = None
+    u: np.ndarray = None
+    cost: float = np.nan
+    robustness: float = np.nan
+    passed: bool = False
+    solve_time: float = np.nan
+    telemetry: dict = None
+    error: str = None
+
+
+def _solve_candidate(task):
+    # Solves one candidate in a worker process
+    index, spec, objects, x0, T, dt, max_acc, max_speed, threads, cache_dir, solver_kwargs, solve_kwargs = task
+    from STL.STL_to_path import STLSolver, TrajectoryCache
+    from STL.reachability import SpecInfeasibleError
+    from STL.robustness import RobustnessMonitor
+
+    start_time = time.time()
+    try:
+        cache = TrajectoryCache(cache_dir=cache_dir) if cache_dir is not None else None
+        solver = STLSolver(spec, objects, x0, T, cache=cache, **solver_kwargs)
+        x, u = solver.generate_trajectory(dt, max_acc, max_speed, threads=threads, **solve_kwargs)
+        entry = PortfolioEntry(index, spec, solver.result.status, x, u, solve_time=time.time() - start_time,
+                               telemetry=solver.telemetry())
+        if x is not None:
+            entry.cost = float(np.sum(u**2))
+            # Windows that reach beyond the horizon are truncated
+            entry.robustness = RobustnessMonitor(solver.get_spec_ast()).evaluate(x)
+            entry.passed = entry.robustness >= -1e-6
+    except Exception as e:
+        status = "infeasible" if isinstance(e, SpecInfeasibleError) else "error"
+        return PortfolioEntry(index, spec, status, solve_time=time.time() - start_time, error=str(e))
+    return entry
+
+
+def _rank(entries):
+    # Passing candidates first, then by cost
+    return sorted(entries, key=lambda e: (not e.passed, e.cost if np.isfinite(e.cost) else np.inf, e.index))
+
+
+def solve_portfolio(specs, objects, x0, T, dt, max_acc, max_speed, first=True, check=None,
+                    workers=None, threads_per_solve=None, cache_dir=None, solve_kwargs=None, **solver_kwargs):
+    """
+    Solves candidate specifications in parallel processes.
+
+    Parameters:
+        specs (list): Candidate specifications (strings).
+        objects (dict): Objects of the scenario.
+        x0 (numpy.ndarray): Initial state.
+        T (float): Time horizon in seconds.
+        dt, max_acc, max_speed (float): Time step and bounds of the dynamics.
+        first (bool): Stop at the first candidate that passes the checks (True), or solve all candidates (False).
+                      Default is True.
+        check (callable): Optional additional check check(x) -> bool, evaluated in the calling process.
+        workers (int): Number of worker processes. Default is min(len(specs), number of CPUs).
+        threads_per_solve (int): Gurobi threads per candidate. Default divides the CPUs over the workers.
+        cache_dir (str): Directory of the on-disk solve cache shared with the workers. Default is None.
+        solve_kwargs (dict): Keyword arguments of `generate_trajectory`, e.g. time_limit. Default is None.
+        solver_kwargs: Keyword arguments of the `STLSolver`, e.g. backend, precheck or tight_bounds.
+
+    Returns:
+        list: The `PortfolioEntry` of every solved candidate, candidates that passed first, then by cost.
+              In first mode, candidates that were still running when the first one passed are left out.
+    """
+    cpus = os.cpu_count() or 1
+    workers = workers or max(1, min(len(specs), cpus))
+    threads_per_solve = threads_per_solve or max(1, cpus // workers)
+    tasks = [(i, spec, objects, np.asarray(x0), T, dt, max_acc, max_speed, threads_per_solve, cache_dir,
+              solver_kwargs, solve_kwargs or {}) for i, spec in enumerate(specs)]
+
+    entries = []
+    # spawn instead of fork: the calling process may hold a Gurobi environment, which is not fork-safe
+    pool = multiprocessing.get_context("spawn").Pool(workers)
+    try:
+        for entry in pool.imap_unordered(_solve_candidate, tasks):
+            if entry.passed and check is not None:
+                entry.passed = bool(check(entry.x))
+            entries.append(entry)
+            if first and entry.passed:
+                break
+    finally:
+        pool.terminate()
+        pool.join()
+    return _rank(entries)
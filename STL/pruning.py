@@ -0,0 +1,148 @@
+"""
+pruning.py
+
+Pruning of obstacle avoidance constraints that are irrelevant to the trajectory.
+
+Every `outside_cuboid(...).always(t1, t2)` in a specification adds a disjunction over the six faces of
+the cuboid at every time step of its window. Most obstacles are however far away from the trajectory
+during most of the horizon. The `ObstaclePruner` shrinks the model in two stages:
+
+1. Time restriction (exact): the window of every avoidance constraint in the top-level conjunction is
+   restricted to the time steps at which the obstacle intersects the reachable tube from x0 (see
+   `ReachabilityAnalyzer`). At the other steps the drone is certainly outside the obstacle. Obstacles
+   that never intersect the tube are dropped. The obstacles near the tube are looked up per time step in
+   the spatial index of the scenario objects (see `basics/spatial_index.py`), so large maps are not
+   scanned at every step.
+2. Lazy constraints: the specification is solved without the remaining avoidance constraints. The
+   trajectory is checked against every pruned constraint, the violated ones are added back, and the
+   reduced specification is solved again, until the trajectory satisfies the full specification.
+
+The relaxed problems have fewer constraints than the full one, so an infeasible round proves that the
+full specification is infeasible, and a trajectory that satisfies all pruned constraints satisfies the
+full specification. If the lazy rounds do not converge within `max_rounds`, the full specification is
+solved. The final trajectory is verified against the full specification.
+
+The trajectory is optimal for the control effort. The robustness is only maximized over the constraints
+in the reduced specification, so the robustness-weighted cost can differ from the full solve.
+
+Classes:
+    - ObstaclePruner: Solves a specification with lazily added avoidance constraints.
+"""
+
+import numpy as np
+from basics.spatial_index import SpatialIndex
+from STL.spec_parser import Cuboid, And, Always
+from STL.reachability import ReachabilityAnalyzer
+from STL.receding_horizon import progress
+
+
+class ObstaclePruner:
+    """
+    Solves a specification for an `STLSolver`, with avoidance constraints restricted to the reachable
+    tube and added lazily.
+
+    Parameters:
+        stl_solver (STLSolver): The solver whose dynamics, bounds and solve options are used.
+        max_rounds (int): Maximum number of lazy rounds before the full specification is solved. Default is 5.
+
+    Attributes:
+        stats (dict): The numbers of avoidance constraints, of dropped and time-restricted ones, of constraints
+                      added back, and of solved rounds.
+        satisfied (bool): Whether the trajectory satisfies the full specification.
+
+    Methods:
+        plan(spec_ast, x0, N, solve):
+            Returns (x, u) of a trajectory satisfying the specification, or (None, None). solve(spec_ast) solves
+            a (reduced) specification and returns (x, u).
+    """
+    def __init__(self, stl_solver, max_rounds=5):
+        self.stl_solver = stl_solver
+        self.max_rounds = max_rounds
+        self.stats = {}
+        self.satisfied = None
+
+    def plan(self, spec_ast, x0, N, solve):
+        s = self.stl_solver
+        reachable = ReachabilityAnalyzer(x0, N, s.dt, s.max_acc, s.max_speed)
+
+        conjuncts = list(spec_ast.args) if isinstance(spec_ast, And) else [spec_ast]
+        required = [c for c in conjuncts if not self._is_avoidance(c)]
+        avoidance = [c for c in conjuncts if self._is_avoidance(c)]
+        index, near = None, {}
+        if avoidance:
+            index = s.spatial_index if s.spatial_index is not None else SpatialIndex(s.objects or {})
+            margin = max(c.arg.tolerance for c in avoidance)
+            near = self._steps_near(index, reachable, N, margin)
+        restricted = [self._restrict(c, reachable, N, index, near) for c in avoidance]
+        pruned = [c for c in restricted if c is not None]
+        self.stats = {
+            'avoidance': len(avoidance),
+            'dropped': len(avoidance) - len(pruned),
+            'restricted': sum(c is not None and c != a for a, c in zip(avoidance, restricted)),
+            'added_back': 0,
+            'rounds': 0,
+        }
+
+        # Incumbents of the reduced problems are only reported if they satisfy the full specification
+        callback = s.solve_options.get('incumbent_callback')
+        if callback is not None:
+            s.solve_options['incumbent_callback'] = lambda x, u, objective: \
+                callback(x, u, objective) if progress(spec_ast, x, N+1) is True else None
+
+        try:
+            x, u = self._solve_lazily(spec_ast, required, pruned, N, solve)
+        finally:
+            s.solve_options['incumbent_callback'] = callback
+        self.satisfied = x is not None and progress(spec_ast, x, N+1) is True
+        return x, u
+
+    def _solve_lazily(self, spec_ast, required, pruned, N, solve):
+        active = []
+        for _ in range(self.max_rounds):
+            self.stats['rounds'] += 1
+            x, u = solve(self._conjunction(required + active))
+            if x is None or self.stl_solver.cancelled:
+                return x, u # an infeasible reduced specification proves the full one infeasible
+            violated = [c for c in pruned if progress(c, x, N+1) is not True]
+            if not violated:
+                return x, u
+            active += violated
+            pruned = [c for c in pruned if c not in violated]
+            self.stats['added_back'] += len(violated)
+
+        self.stats['rounds'] += 1
+        return solve(spec_ast)
+
+    @staticmethod
+    def _is_avoidance(node):
+        return isinstance(node, Always) and isinstance(node.arg, Cuboid) and not node.arg.inside
+
+    @staticmethod
+    def _steps_near(index, reachable, N, margin):
+        # Maps the index of every object near the reachable tube to the time steps at which it is near (a superset
+        # of the steps at which it intersects the tube expanded by margin)
+        near = {}
+        for t in range(N + 1):
+            for k in index.candidates(reachable.lower[:, t] - margin, reachable.upper[:, t] + margin):
+                near.setdefault(int(k), []).append(t)
+        return near
+
+    @staticmethod
+    def _restrict(node, reachable, N, index, near):
+        # Restricts the window to the steps at which the obstacle intersects the reachable tube, None if there are none
+        cuboid = node.arg
+        expanded_lower = np.array(cuboid.bounds[0::2]) - cuboid.tolerance
+        expanded_upper = np.array(cuboid.bounds[1::2]) + cuboid.tolerance
+        k = index.find(cuboid.bounds)
+        candidates = range(N + 1) if k is None else near.get(k, [])  # obstacles that are not scenario objects
+        steps = [t for t in candidates if node.t1 <= t <= min(node.t2, N)
+                 and np.all(reachable.upper[:, t] > expanded_lower) and np.all(reachable.lower[:, t] < expanded_upper)]
+        if not steps:
+            return None
+        return Always(cuboid, steps[0], steps[-1])
+
+    @staticmethod
+    def _conjunction(nodes):
+        if not nodes:
+            return None # no STL constraints
+        return nodes[0] if len(nodes) == 1 else And(tuple(nodes))
@@ -0,0 +1,213 @@
+"""
+reachability.py
+
+Geometric reachability pre-check of STL specifications.
+
+Many infeasible specifications are infeasible for simple kinematic reasons, e.g. a goal that is farther
+away than the drone can fly before the deadline of its `eventually`. The `ReachabilityAnalyzer` detects
+such specifications on the AST, without building the MICP:
+
+1. For the `drone_dynamics` with the speed bound |v_i| <= max_speed and the acceleration bound
+   |a_i| <= max_acc per axis, the axes are decoupled and the set of positions reachable from x0 at time
+   step k is exactly a box, computed by accelerating fully in either direction.
+2. A cuboid predicate can only hold at step k if it is satisfiable somewhere in that box. Boolean and
+   temporal operators combine these per-step checks (a necessary condition for satisfiability).
+3. For the top-level conjunction, every pair of inside_cuboid targets is checked for time-consistency:
+   two targets that must be visited at time steps ta and tb can only both be visited if the distance
+   between them can be flown in |ta - tb| steps.
+
+If a check fails, the specification is provably infeasible and a `SpecInfeasibleError` names the
+sub-formula that fails, so it can be fed back to the LLM.
+
+Classes:
+    - SpecInfeasibleError: Raised for specifications that are provably infeasible.
+    - ReachabilityAnalyzer: Checks specifications against the reachable sets of the drone.
+"""
+
+import numpy as np
+from STL.spec_parser import Cuboid, And, Or, Always, Eventually, Until
+
+
+class SpecInfeasibleError(ValueError):
+    """
+    Raised when a specification is provably infeasible.
+
+    Attributes:
+        subformula (SpecNode): The sub-formula that cannot be satisfied.
+        reason (str): Why the sub-formula cannot be satisfied.
+    """
+    def __init__(self, subformula, reason):
+        self.subformula = subformula
+        self.reason = reason
+        super().__init__(f"{subformula} cannot be satisfied: {reason}")
+
+
+class ReachabilityAnalyzer:
+    """
+    Checks STL specifications against the positions the drone can reach.
+
+    Parameters:
+        x0 (numpy.ndarray): Initial state [x, y, z, vx, vy, vz].
+        N (int): Number of time steps.
+        dt (float): Time step in seconds.
+        max_acc (float): Maximum absolute acceleration per axis.
+        max_speed (float): Maximum absolute speed per axis.
+
+    Attributes:
+        lower (numpy.ndarray): Lower corners of the reachable boxes, shape (3, N+1).
+        upper (numpy.ndarray): Upper corners of the reachable boxes, shape (3, N+1).
+
+    Methods:
+        find_conflict(spec_ast):
+            Returns (subformula, reason) for a provably infeasible specification, or None.
+        check(spec_ast):
+            Raises a `SpecInfeasibleError` for a provably infeasible specification.
+    """
+    def __init__(self, x0, N, dt, max_acc, max_speed):
+        self.x0 = np.asarray(x0, dtype=float)
+        self.N = N
+        self.dt = dt
+        self.max_speed = max_speed
+
+        # Fastest velocity profiles in the positive and negative direction of every axis
+        steps = np.arange(N)
+        v_max = np.minimum(max_speed, self.x0[3:, None] + steps*dt*max_acc)
+        v_min = np.maximum(-max_speed, self.x0[3:, None] - steps*dt*max_acc)
+        self.lower = self.x0[:3, None] + np.hstack([np.zeros((3, 1)), np.cumsum(v_min*dt, axis=1)])
+        self.upper = self.x0[:3, None] + np.hstack([np.zeros((3, 1)), np.cumsum(v_max*dt, axis=1)])
+        self._memo = {}
+
+    def check(self, spec_ast):
+        conflict = self.find_conflict(spec_ast)
+        if conflict is not None:
+            raise SpecInfeasibleError(*conflict)
+
+    def find_conflict(self, spec_ast):
+        if np.any(np.abs(self.x0[3:]) > self.max_speed):
+            return spec_ast, f"the initial velocity {self.x0[3:]} exceeds the maximum speed {self.max_speed}"
+
+        conflict = self._explain(spec_ast, 0)
+        if conflict is not None:
+            return conflict
+
+        # Time-consistency of pairs of targets in the top-level conjunction
+        targets = [target for target in map(self._target, self._conjuncts(spec_ast)) if target is not None]
+        for i, (node_a, box_a, times_a) in enumerate(targets):
+            for node_b, box_b, times_b in targets[i+1:]:
+                if not self._compatible(box_a, times_a, box_b, times_b):
+                    gap = np.max(self._gaps(box_a, box_b))
+                    return (And((node_a, node_b)),
+                            f"the targets are {gap:.2f} m apart, which cannot be flown between their time windows")
+        return None
+
+    def possible(self, node, t):
+        """
+        Returns False if the node can certainly not hold at time step t (a necessary condition).
+        """
+        key = (node, t)
+        if key not in self._memo:
+            self._memo[key] = self._possible(node, t)
+        return self._memo[key]
+
+    def _possible(self, node, t):
+        if t > self.N:
+            return False
+        if isinstance(node, Cuboid):
+            return self._cuboid_possible(node, t)
+        if isinstance(node, And):
+            return all(self.possible(arg, t) for arg in node.args)
+        if isinstance(node, Or):
+            return any(self.possible(arg, t) for arg in node.args)
+        if isinstance(node, Always):
+            return all(self.possible(node.arg, s) for s in range(t + node.t1, t + node.t2 + 1))
+        if isinstance(node, Eventually):
+            return any(self.possible(node.arg, s) for s in range(t + node.t1, t + node.t2 + 1))
+        return self._until_switch(node, t) is not None
+
+    def _until_switch(self, node, t):
+        # Earliest switching time step of an until, or None
+        for switch in range(t + node.t1, t + node.t2 + 1):
+            if self.possible(node.right, switch):
+                return switch
+            if not self.possible(node.left, switch):
+                return None
+        return None
+
+    def _cuboid_possible(self, cuboid, t):
+        lower, upper = self._shrunk_box(cuboid)
+        if cuboid.inside:
+            return bool(np.all(lower <= upper) and np.all(self.upper[:, t] >= lower) and np.all(self.lower[:, t] <= upper))
+        # outside: some face of the expanded cuboid can be passed within the reachable box
+        expanded_lower = np.array(cuboid.bounds[0::2]) - cuboid.tolerance
+        expanded_upper = np.array(cuboid.bounds[1::2]) + cuboid.tolerance
+        return bool(np.any(self.lower[:, t] <= expanded_lower) or np.any(self.upper[:, t] >= expanded_upper))
+
+    def _explain(self, node, t):
+        """
+        Returns (subformula, reason) for the smallest sub-formula that makes the node impossible at
+        time step t, or None if the node is possible.
+        """
+        if self.possible(node, t):
+            return None
+
+        if isinstance(node, And):
+            for arg in node.args:
+                if not self.possible(arg, t):
+                    return self._explain(arg, t)
+        if isinstance(node, Always):
+            for s in range(t + node.t1, t + node.t2 + 1):
+                if s > self.N:
+                    return node, f"it requires time step {s}, beyond the horizon of {self.N} steps"
+                if not self.possible(node.arg, s):
+                    if isinstance(node.arg, Cuboid):
+                        return node, self._cuboid_reason(node.arg, s)
+                    return self._explain(node.arg, s)
+
+        if isinstance(node, Cuboid):
+            return node, self._cuboid_reason(node, t)
+        if isinstance(node, (Eventually, Until)):
+            t1, t2 = t + node.t1, t + node.t2
+            target = node.arg if isinstance(node, Eventually) else node.right
+            if t1 > self.N:
+                return node, f"its time window starts at step {t1}, beyond the horizon of {self.N} steps"
+            if isinstance(target, Cuboid) and target.inside:
+                return node, f"{self._cuboid_reason(target, min(t2, self.N))} (deadline at step {t2})"
+            return node, f"no time step in [{t1}, {t2}] can satisfy it"
+        return node, f"no combination of its sub-formulas can hold at step {t}"
+
+    def _cuboid_reason(self, cuboid, t):
+        lower, upper = self._shrunk_box(cuboid)
+        if cuboid.inside and np.any(lower > upper):
+            return f"the object is smaller than twice the tolerance {cuboid.tolerance}"
+        if cuboid.inside:
+            gap = np.max(np.maximum(lower - self.upper[:, t], self.lower[:, t] - upper))
+            return f"the drone stays at least {gap:.2f} m away from it up to step {t}"
+        return f"the drone cannot leave it before step {t}"
+
+    def _shrunk_box(self, cuboid):
+        lower = np.array(cuboid.bounds[0::2]) + cuboid.tolerance
+        upper = np.array(cuboid.bounds[1::2]) - cuboid.tolerance
+        return lower, upper
+
+    def _conjuncts(self, node):
+        if isinstance(node, And):
+            return [c for arg in node.args for c in self._conjuncts(arg)]
+        return [node]
+
+    def _target(self, node):
+        # (node, box, possible time steps) of an eventually/always inside_cuboid obligation
+        if isinstance(node, (Always, Eventually)) and isinstance(node.arg, Cuboid) and node.arg.inside:
+            times = [s for s in range(node.t1, min(node.t2, self.N) + 1) if self.possible(node.arg, s)]
+            return node, self._shrunk_box(node.arg), np.array(times)
+        return None
+
+    def _gaps(self, box_a, box_b):
+        # Per-axis distance between two boxes
+        return np.maximum(0, np.maximum(box_a[0] - box_b[1], box_b[0] - box_a[1]))
+
+    def _compatible(self, box_a, times_a, box_b, times_b):
+        if len(times_a) == 0 or len(times_b) == 0:
+            return True # already reported by the per-step check
+        steps_needed = np.max(self._gaps(box_a, box_b)) / (self.max_speed*self.dt)
+        time_differences = np.abs(times_a[:, None] - times_b[None, :])
+        return bool(np.any(time_differences >= steps_needed - 1e-9))
@@ -0,0 +1,328 @@
+"""
+receding_horizon.py
+
+Receding-horizon (MPC) trajectory generation for long scenarios.
+
+The monolithic MICP has a binary variable per predicate per time step, and its solve time grows quickly
+with the horizon (e.g. 100 steps in `treasure_hunt`). The `RecedingHorizonPlanner` instead solves
+overlapping windows of `window` steps. After every window the first `step` steps are committed, and the
+specification is progressed over the committed prefix:
+
+- obligations that are already decided on the prefix are folded into true/false (an `eventually` whose
+  target was visited, an `always` over past steps, the first part of an `until`),
+- the remaining obligations are shifted to the time frame of the next window with their remaining
+  deadlines (e.g. `eventually(0, 42)` after 10 committed steps becomes `eventually(0, 32)`),
+- obligations that end beyond the window are truncated to the window. Pending `eventually`/`until`
+  targets whose deadline lies beyond the window are not enforced yet; instead a terminal cost pulls the
+  end of the window towards the target with the earliest deadline (the squared distance, or the L1 distance
+  with the linear objectives, see `MICPSolver.AddTargetCost`).
+
+The committed pieces are stitched into a single (6, N+1) trajectory, the same format as the monolithic
+solve, and the stitched trajectory is checked against the full specification. A stitched trajectory that
+violates it is not returned; its solve status is "violated".
+
+Classes:
+    - RecedingHorizonPlanner: Plans a trajectory window by window for an `STLSolver`.
+
+Functions:
+    - progress(node, states, k): Progresses a specification over the committed time steps 0..k-1.
+    - truncate(node, W): Restricts a specification to the time steps [0, W].
+"""
+
+import time
+import numpy as np
+from STL.backends import SolveResult
+from STL.simplify import simplify_spec, TRUE, FALSE
+from STL.spec_parser import Cuboid, And, Or, Always, Eventually, Until
+
+# Tolerance of the predicate evaluation on committed states. The MICP constraints only hold up
+# to the feasibility tolerance of the solver.
+EVALUATION_TOLERANCE = 1e-5
+
+
+def is_state_formula(node):
+    """
+    Returns True if the node has no temporal operators (a boolean combination of cuboids).
+    """
+    if isinstance(node, Cuboid):
+        return True
+    if isinstance(node, (And, Or)):
+        return all(is_state_formula(arg) for arg in node.args)
+    return False
+
+
+def horizon(node):
+    """
+    Returns the number of time steps after the evaluation time that the node depends on.
+    """
+    if isinstance(node, Cuboid):
+        return 0
+    if isinstance(node, (And, Or)):
+        return max(horizon(arg) for arg in node.args)
+    if isinstance(node, (Always, Eventually)):
+        return node.t2 + horizon(node.arg)
+    return node.t2 + max(horizon(node.left), horizon(node.right))
+
+
+def evaluate_state(node, position):
+    """
+    Evaluates a state formula at a single position (x, y, z).
+    """
+    if isinstance(node, Cuboid):
+        lower = np.array(node.bounds[0::2])
+        upper = np.array(node.bounds[1::2])
+        margin = node.tolerance - EVALUATION_TOLERANCE
+        if node.inside:
+            return bool(np.all(position >= lower + margin) and np.all(position <= upper - margin))
+        return bool(np.any(position >= upper + margin) or np.any(position <= lower - margin))
+    if isinstance(node, And):
+        return all(evaluate_state(arg, position) for arg in node.args)
+    return any(evaluate_state(arg, position) for arg in node.args)
+
+
+def conjunction(args):
+    """
+    Builds a conjunction of nodes and booleans, folding constants.
+    """
+    nodes = []
+    for arg in args:
+        if arg is False:
+            return False
+        if arg is not True and arg not in nodes:
+            nodes.append(arg)
+    if not nodes:
+        return True
+    return nodes[0] if len(nodes) == 1 else And(tuple(nodes))
+
+
+def disjunction(args):
+    """
+    Builds a disjunction of nodes and booleans, folding constants.
+    """
+    nodes = []
+    for arg in args:
+        if arg is True:
+            return True
+        if arg is not False and arg not in nodes:
+            nodes.append(arg)
+    if not nodes:
+        return False
+    return nodes[0] if len(nodes) == 1 else Or(tuple(nodes))
+
+
+def shift(node, d):
+    """
+    Returns a node that, evaluated at time 0, is equivalent to `node` evaluated at time d.
+    """
+    if d == 0 or isinstance(node, bool):
+        return node
+    if isinstance(node, Cuboid):
+        return Always(node, d, d)
+    if isinstance(node, (And, Or)):
+        return type(node)(tuple(shift(arg, d) for arg in node.args))
+    if isinstance(node, (Always, Eventually)):
+        return type(node)(node.arg, node.t1 + d, node.t2 + d)
+    return Until(node.left, node.right, node.t1 + d, node.t2 + d)
+
+
+def progress(node, states, k, tau=0):
+    """
+    Progresses a specification over a committed prefix.
+
+    Parameters:
+        node (SpecNode): The specification, evaluated at absolute time step tau.
+        states (numpy.ndarray): Committed states, shape (6, >=k+1). Only steps 0..k-1 are treated as the
+                                past; step k is the initial state of the next window and still constrained.
+        k (int): First time step of the next window.
+        tau (int): Absolute evaluation time step of the node. Default is 0.
+
+    Returns:
+        SpecNode or bool: The residual specification, to be evaluated at time 0 of the window that starts
+                          at absolute time step k. True/False if the specification is already decided.
+    """
+    def holds(state_node, s):
+        return evaluate_state(state_node, states[:3, s])
+
+    if is_state_formula(node):
+        return holds(node, tau) if tau < k else shift(node, tau - k)
+
+    if isinstance(node, And):
+        return conjunction([progress(arg, states, k, tau) for arg in node.args])
+    if isinstance(node, Or):
+        return disjunction([progress(arg, states, k, tau) for arg in node.args])
+
+    if isinstance(node, (Always, Eventually)):
+        start, end = tau + node.t1, tau + node.t2
+        if not is_state_formula(node.arg):
+            # Nested temporal operators: progress every time step separately
+            combine = conjunction if isinstance(node, Always) else disjunction
+            return combine([progress(node.arg, states, k, s) for s in range(start, end + 1)])
+
+        past = [holds(node.arg, s) for s in range(start, min(end + 1, k))]
+        if isinstance(node, Always):
+            if not all(past):
+                return False
+            return True if end < k else type(node)(node.arg, max(start, k) - k, end - k)
+        if any(past):
+            return True
+        return False if end < k else type(node)(node.arg, max(start, k) - k, end - k)
+
+    # Until: left holds from t1 until the switching time t', right holds at t'
+    start, end = tau + node.t1, tau + node.t2
+    if not (is_state_formula(node.left) and is_state_formula(node.right)):
+        options = []
+        for switch in range(start, end + 1):
+            options.append(conjunction([progress(node.left, states, k, s) for s in range(start, switch)]
+                                       + [progress(node.right, states, k, switch)]))
+        return disjunction(options)
+
+    for switch in range(start, min(end + 1, k)):
+        if holds(node.right, switch):
+            return True
+        if not holds(node.left, switch):
+            return False
+    if end < k:
+        return False
+    return Until(node.left, node.right, max(start, k) - k, end - k)
+
+
+def truncate(node, W):
+    """
+    Restricts a specification (evaluated at time 0) to the time steps [0, W] of a window.
+
+    Obligations that are fully inside the window are kept. `always` obligations are clipped to the window,
+    and `eventually`/`until` obligations with a deadline beyond the window are relaxed (an `until` still
+    requires its left formula to hold within the window if the right formula is not reached).
+
+    Returns:
+        SpecNode or bool: The truncated specification, True if nothing remains to be enforced in the window.
+    """
+    if isinstance(node, bool) or horizon(node) <= W:
+        return node
+    if isinstance(node, And):
+        return conjunction([truncate(arg, W) for arg in node.args])
+    if isinstance(node, Or):
+        return disjunction([truncate(arg, W) for arg in node.args])
+
+    if isinstance(node, Always):
+        reach = horizon(node.arg)
+        if node.t1 + reach > W:
+            return True
+        if reach == 0:
+            return Always(node.arg, node.t1, W)
+        return conjunction([truncate(shift(node.arg, s), W) for s in range(node.t1, node.t2 + 1)])
+
+    if isinstance(node, Eventually):
+        # the deadline is beyond the window: the obligation can still be met in a later window
+        return True
+
+    # Until with a deadline beyond the window
+    if not (is_state_formula(node.left) and is_state_formula(node.right)) or node.t1 > W:
+        return True
+    return disjunction([Until(node.left, node.right, node.t1, W), Always(node.left, node.t1, W)])
+
+
+def pending_target(node, after=0):
+    """
+    Returns (deadline, cuboid) of the pending `eventually`/`until` inside_cuboid target with the earliest
+    deadline later than `after`, or None if there is no such target.
+    """
+    candidates = []
+    for sub in ([] if isinstance(node, bool) else node.walk()):
+        if isinstance(sub, Eventually):
+            target = sub.arg
+        elif isinstance(sub, Until):
+            target = sub.right
+        else:
+            continue
+        if isinstance(target, Cuboid) and target.inside and sub.t2 > after:
+            candidates.append((sub.t2, target))
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: candidate[0])
+
+
+class RecedingHorizonPlanner:
+    """
+    Plans a trajectory for an `STLSolver` by solving overlapping windows.
+
+    Parameters:
+        stl_solver (STLSolver): The solver whose dynamics, bounds and cost are used for every window.
+                                Its dt, max_acc, max_speed and verbose attributes must be set.
+        window (int): Number of time steps per window. Default is 30.
+        step (int): Number of time steps committed after every window. Default is 10.
+        progress_weight (float): Weight of the terminal cost towards the earliest pending target. Default is 1.0.
+
+    Attributes:
+        window_stats (list): One dictionary per solved window with its start step, length, solve time and status.
+        satisfied (bool): Whether the stitched trajectory satisfies the full specification.
+
+    Methods:
+        plan(spec_ast, x0, N):
+            Returns the stitched (x, u), or (None, None) if a window is infeasible or the stitched trajectory
+            violates the full specification.
+    """
+    def __init__(self, stl_solver, window=30, step=10, progress_weight=1.0):
+        assert 0 < step <= window, "step should be positive and at most the window length"
+        self.stl_solver = stl_solver
+        self.window = window
+        self.step = step
+        self.progress_weight = progress_weight
+        self.window_stats = []
+        self.satisfied = None
+
+    def plan(self, spec_ast, x0, N):
+        x = np.full((6, N+1), np.nan)
+        u = np.full((3, N+1), np.nan)
+        x[:, 0] = x0
+        k = 0
+
+        while True:
+            W = min(self.window, N - k)
+            residual = progress(spec_ast, x, k)
+            if residual is False:
+                self.satisfied = False
+                return None, None
+
+            window_spec = truncate(residual, W)
+            solver = self.stl_solver.build_solver(None if window_spec is True else window_spec, x[:, k], W)
+
+            target = pending_target(residual, after=W)
+            if target is not None:
+                center = np.array([(target[1].bounds[2*i] + target[1].bounds[2*i+1])/2 for i in range(3)])
+                solver.AddTargetCost(W, center, self.progress_weight,
+                                     linear=self.stl_solver.objective != "quadratic")
+
+            start_time = time.time()
+            x_window, u_window = self.stl_solver.solve(solver)
+            self.window_stats.append({
+                'start': k,
+                'length': W,
+                'solve_time': time.time() - start_time,
+                'feasible': x_window is not None,
+            })
+            if x_window is None:
+                self.satisfied = False
+                return None, None
+
+            if k + W == N:
+                # Last window: commit everything
+                x[:, k:] = x_window
+                u[:, k:] = u_window
+                break
+
+            x[:, k:k+self.step+1] = x_window[:, :self.step+1]
+            u[:, k:k+self.step] = u_window[:, :self.step]
+            k += self.step
+
+        # Windows that reach past the horizon are clamped to it first, as in the monolithic solve
+        clamped = simplify_spec(spec_ast, N)
+        if clamped is TRUE or clamped is FALSE:
+            self.satisfied = clamped is TRUE
+        else:
+            self.satisfied = progress(clamped, x, N+1) is True
+        if not self.satisfied:
+            # Not a solution of the full specification, but not proof that there is none either
+            self.stl_solver.result = SolveResult("violated", x, u)
+            return None, None
+        return x, u
@@ -0,0 +1,427 @@
+"""
+robustness.py
+
+A vectorized monitor of the quantitative (robustness) semantics of specification ASTs.
+
+The robustness of a specification is positive if a trajectory satisfies it and negative if it violates it, and
+its magnitude is the margin to the boundary. The `RobustnessMonitor` computes the robustness trace of every
+sub-formula over the full trajectory with NumPy, bottom-up, instead of evaluating the compiled `stlpy` formula
+recursively at every time step:
+
+- cuboids: the signed distance margins of the six faces, with the tolerance of the cuboid, as in `STL_formulas`,
+- and/or: the minimum/maximum of the traces of the arguments,
+- always/eventually: the sliding minimum/maximum of the trace of the argument over the window (van Herk/Gil-Werman,
+  linear in the length of the trajectory, see `sliding_window`),
+- until: the maximum over the switching times t' in [t+t1, t+t2] of the minimum of the right argument at t' and of
+  the left argument over [t+t1, t'-1], as in `stlpy`.
+
+Within the horizon of the specification the robustness equals `stlpy`'s `robustness(y, 0)`. Windows that reach
+beyond the end of the trajectory are truncated: always holds after the end, eventually and until do not.
+
+Identical sub-formulas share their trace, so the traces of all sub-formulas are available for diagnosis, e.g.
+which obstacle was hit and when.
+
+The `OnlineRobustnessMonitor` computes the same traces incrementally, one state (or one trajectory segment) at a
+time, and decides whether the specification is satisfied or violated as soon as the states received so far
+determine it.
+
+Classes:
+    - RobustnessMonitor: Computes the robustness traces of a specification over a trajectory.
+    - OnlineRobustnessMonitor: Monitors the robustness of a specification on a stream of states.
+
+Functions:
+    - cuboid_trace(node, positions): The robustness of a cuboid predicate at every position.
+    - sliding_window(values, t1, t2, maximum): The minimum or maximum of values over the windows [t+t1, t+t2].
+"""
+
+from collections import deque
+import numpy as np
+from STL.spec_parser import Cuboid, And, Or, Always, Eventually, Until
+
+
+def cuboid_trace(node, positions):
+    """
+    Returns the robustness of a cuboid predicate at every position: the signed margin to the nearest face, with the
+    tolerance of the cuboid (as in `STL_formulas`).
+
+    Parameters:
+        node (Cuboid): The predicate.
+        positions (numpy.ndarray): The positions, of shape (3, T).
+
+    Returns:
+        numpy.ndarray: Shape (T,).
+    """
+    lower = np.array(node.bounds[0::2], dtype=float)[:, None]
+    upper = np.array(node.bounds[1::2], dtype=float)[:, None]
+    if node.inside:
+        return np.minimum(positions - (lower + node.tolerance), (upper - node.tolerance) - positions).min(axis=0)
+    return np.maximum((lower - node.tolerance) - positions, positions - (upper + node.tolerance)).max(axis=0)
+
+
+def sliding_window(values, t1, t2, maximum=False):
+    """
+    Returns r with r[t] = min(values[t+t1:t+t2+1]) (or max) for every t, with the van Herk/Gil-Werman algorithm:
+    the values are split into blocks of the window width, and every window is covered by the suffix of one block
+    and the prefix of the next, so the cost is linear in len(values) whatever the width.
+
+    Parameters:
+        values (numpy.ndarray): The values, of shape (T,).
+        t1, t2 (int): The window, relative to t, with 0 <= t1 <= t2.
+        maximum (bool): Whether to take the maximum instead of the minimum. Default is False.
+
+    Returns:
+        numpy.ndarray: Shape (T,). Window positions beyond the end of the values are ignored; windows that lie
+                       entirely beyond it give inf (minimum) or -inf (maximum).
+    """
+    accumulate = np.maximum.accumulate if maximum else np.minimum.accumulate
+    combine = np.maximum if maximum else np.minimum
+    identity = -np.inf if maximum else np.inf
+    values = np.asarray(values, dtype=float)
+    T, width = len(values), t2 - t1 + 1
+
+    # Windows start at t+t1, so shift the values by t1, and pad them to whole blocks beyond the last window
+    blocks = -(-(T + width) // width)
+    padded = np.full(blocks*width, identity)
+    shifted = values[t1:]
+    padded[:len(shifted)] = shifted
+    padded = padded.reshape(blocks, width)
+    prefix = accumulate(padded, axis=1).ravel()
+    suffix = accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    return combine(suffix[:T], prefix[width - 1:width - 1 + T])
+
+
+class RobustnessMonitor:
+    """
+    Computes the robustness trace of every sub-formula of a specification over a trajectory.
+
+    Parameters:
+        spec_ast (SpecNode): The specification.
+
+    Attributes:
+        traces (dict): Maps every sub-formula (AST node) to its robustness trace of the last evaluated trajectory,
+                       of shape (T,): the robustness of the sub-formula evaluated at each time step.
+
+    Methods:
+        evaluate(x):
+            Returns the robustness of the specification at time 0 for a trajectory x of shape (6, T) or (3, T).
+        satisfied(x, tolerance=1e-6):
+            Returns whether the robustness is at least -tolerance (the solvers satisfy the constraints up to a
+            numerical tolerance).
+        violations():
+            Returns (sub-formula, robustness) of the conjuncts of the specification that are violated at time 0
+            by the last evaluated trajectory.
+        report(dt=None):
+            Returns a text summary of the violations, with the time steps (or times) at which they occur.
+    """
+    def __init__(self, spec_ast):
+        self.spec_ast = spec_ast
+        self.traces = {}
+
+    def evaluate(self, x):
+        positions = np.asarray(x, dtype=float)[:3]
+        self.traces = {}
+        return float(self._trace(self.spec_ast, positions)[0])
+
+    def satisfied(self, x, tolerance=1e-6):
+        return self.evaluate(x) >= -tolerance
+
+    def violations(self):
+        conjuncts = self.spec_ast.args if isinstance(self.spec_ast, And) else (self.spec_ast,)
+        return [(node, float(self.traces[node][0])) for node in conjuncts if self.traces[node][0] < 0]
+
+    def report(self, dt=None):
+        lines = []
+        for node, robustness in self.violations():
+            line = f"{node} is violated (robustness {robustness:.3f})"
+            steps = self._violating_steps(node)
+            if len(steps):
+                # Consecutive steps as ranges
+                breaks = np.flatnonzero(np.diff(steps) > 1)
+                ranges = zip(steps[np.r_[0, breaks + 1]], steps[np.r_[breaks, len(steps) - 1]])
+                if dt is None:
+                    parts = [f"{a}" if a == b else f"{a}-{b}" for a, b in ranges]
+                    line += f", at time steps {', '.join(parts)}"
+                else:
+                    parts = [f"{a*dt:g} s" if a == b else f"{a*dt:g}-{b*dt:g} s" for a, b in ranges]
+                    line += f", at {', '.join(parts)}"
+            lines.append(line + ".")
+        return "\n".join(lines)
+
+    def _violating_steps(self, node):
+        # The steps in the window of a violated always (or of the conjunct itself) at which its argument is violated
+        if isinstance(node, Always):
+            trace = self.traces[node.arg]
+            steps = np.arange(node.t1, min(node.t2, len(trace) - 1) + 1)
+            return steps[trace[steps] < 0]
+        return np.zeros(0, dtype=int)
+
+    def _trace(self, node, positions):
+        if node in self.traces:
+            return self.traces[node]
+
+        if isinstance(node, Cuboid):
+            trace = cuboid_trace(node, positions)
+
+        elif isinstance(node, (And, Or)):
+            traces = np.array([self._trace(arg, positions) for arg in node.args])
+            trace = traces.min(axis=0) if isinstance(node, And) else traces.max(axis=0)
+
+        elif isinstance(node, (Always, Eventually)):
+            trace = sliding_window(self._trace(node.arg, positions), node.t1, node.t2,
+                                   maximum=isinstance(node, Eventually))
+
+        elif isinstance(node, Until):
+            left, right = self._trace(node.left, positions), self._trace(node.right, positions)
+            T, width = len(left), node.t2 - node.t1 + 1
+            # Beyond the end of the trajectory the right argument cannot hold and the left one is vacuous
+            left = np.concatenate([left, np.full(node.t2 + 1, np.inf)])
+            right = np.concatenate([right, np.full(node.t2 + 1, -np.inf)])
+            trace = np.full(T, -np.inf)
+            held = np.full(T, np.inf) # minimum of the left argument over [t+t1, t'-1]
+            for k in range(width):
+                switch = node.t1 + k
+                trace = np.maximum(trace, np.minimum(held, right[switch:switch + T]))
+                held = np.minimum(held, left[switch:switch + T])
+
+        else:
+            raise TypeError(f"Unknown specification node {type(node).__name__}")
+
+        self.traces[node] = trace
+        return trace
+
+
+class OnlineRobustnessMonitor:
+    """
+    Monitors the robustness of a specification online, on a stream of states, e.g. while the trajectory is flown
+    in the simulation or while segments are appended to the full trajectory.
+
+    Every sub-formula keeps the values of its robustness trace that are final: the value at step t of an
+    always/eventually over [t1, t2] is final once its argument is known up to step t+t2, and is then taken from a
+    monotonic deque of the window (the sliding minimum/maximum of Lemire, O(1) amortized per sample). The value at
+    step t of an until is computed once both arguments are known up to step t+t2, in O(t2-t1) per sample.
+
+    Before the robustness at step 0 is final, it is bounded by the final values seen so far: a violated step in
+    the window of an always bounds it from above, a satisfied step in the window of an eventually from below.
+    The verdict is decided as soon as the bounds exclude the other outcome, which for safety constraints is the
+    sample at which they are violated. `finish()` ends the stream, after which the robustness equals that of
+    `RobustnessMonitor.evaluate` on the whole trajectory (with the same truncation of the windows).
+
+    Parameters:
+        spec_ast (SpecNode): The specification.
+        tolerance (float): Robustness down to -tolerance counts as satisfied. Default is 1e-6.
+        start (int): The sample at which the specification starts (step 0 of the specification); earlier samples
+                     are ignored. Default is 0.
+
+    Attributes:
+        steps (int): The number of samples of the specification received so far.
+        verdict (str): "satisfied", "violated" or "undecided".
+        decided_at (int): The sample (step of the specification) at which the verdict was decided, or None.
+        finished (bool): Whether the stream has ended.
+
+    Methods:
+        update(state):
+            Adds one state (position first) and returns the verdict.
+        extend(x):
+            Adds the states of a trajectory segment x of shape (6, n) or (3, n) and returns the verdict.
+        finish():
+            Ends the stream and returns the robustness.
+        robustness_bounds():
+            Returns (lower, upper) bounds of the robustness of the specification, given the samples so far.
+        violations():
+            Returns the conjuncts of the specification that are already known to be violated.
+        traces():
+            Returns the final values of the robustness trace of every sub-formula, as arrays.
+    """
+    def __init__(self, spec_ast, tolerance=1e-6, start=0):
+        self.spec_ast = spec_ast
+        self.tolerance = tolerance
+        self.start = start
+        self.skipped = 0
+        self.steps = 0
+        self.verdict = "undecided"
+        self.decided_at = None
+        self.finished = False
+
+        # One stream per distinct sub-formula, children before their parents
+        self.streams = {}
+        self._build(spec_ast)
+        self.order = list(self.streams.values())
+        self.cuboids = [stream for stream in self.order if isinstance(stream, _CuboidStream)]
+
+    def update(self, state):
+        return self.extend(np.asarray(state, dtype=float).reshape(-1, 1))
+
+    def extend(self, x):
+        if self.finished:
+            raise RuntimeError("The stream of the monitor has ended.")
+        positions = np.asarray(x, dtype=float)[:3]
+        skip = min(self.start - self.skipped, positions.shape[1])
+        self.skipped += skip
+        positions = positions[:, skip:]
+        if positions.shape[1] == 0:
+            return self.verdict
+        for stream in self.cuboids:
+            stream.push(positions)
+        for stream in self.order:
+            stream.advance()
+        self.steps += positions.shape[1]
+        return self._decide()
+
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            for stream in self.order:
+                stream.advance(done=True)
+            self._decide()
+        return self.robustness_bounds()[0]
+
+    def robustness_bounds(self):
+        return self.streams[self.spec_ast].bounds()
+
+    def violations(self):
+        conjuncts = self.spec_ast.args if isinstance(self.spec_ast, And) else (self.spec_ast,)
+        return [node for node in conjuncts if self.streams[node].bounds()[1] < -self.tolerance]
+
+    def traces(self):
+        return {node: np.array(stream.values) for node, stream in self.streams.items()}
+
+    def _decide(self):
+        if self.verdict == "undecided":
+            lower, upper = self.robustness_bounds()
+            if upper < -self.tolerance:
+                self.verdict = "violated"
+            elif lower >= -self.tolerance:
+                self.verdict = "satisfied"
+            if self.verdict != "undecided":
+                self.decided_at = max(self.steps - 1, 0)
+        return self.verdict
+
+    def _build(self, node):
+        if node in self.streams:
+            return
+        for child in node.children():
+            self._build(child)
+        children = [self.streams[child] for child in node.children()]
+        if isinstance(node, Cuboid):
+            self.streams[node] = _CuboidStream(node)
+        elif isinstance(node, (And, Or)):
+            self.streams[node] = _BooleanStream(node, children)
+        elif isinstance(node, (Always, Eventually)):
+            self.streams[node] = _WindowStream(node, children)
+        elif isinstance(node, Until):
+            self.streams[node] = _UntilStream(node, children)
+        else:
+            raise TypeError(f"Unknown specification node {type(node).__name__}")
+
+
+class _Stream:
+    # The final values of the robustness trace of a sub-formula, and bounds on its value at step 0
+    def __init__(self, node, children=()):
+        self.node = node
+        self.children = children
+        self.values = []
+
+    def advance(self, done=False):
+        pass
+
+    def bounds(self):
+        if self.values:
+            return self.values[0], self.values[0]
+        return self._partial_bounds()
+
+    def _partial_bounds(self):
+        return -np.inf, np.inf
+
+
+class _CuboidStream(_Stream):
+    def push(self, positions):
+        self.values.extend(cuboid_trace(self.node, positions).tolist())
+
+
+class _BooleanStream(_Stream):
+    def advance(self, done=False):
+        combine = min if isinstance(self.node, And) else max
+        final = min(len(child.values) for child in self.children)
+        for t in range(len(self.values), final):
+            self.values.append(combine(child.values[t] for child in self.children))
+
+    def _partial_bounds(self):
+        combine = min if isinstance(self.node, And) else max
+        lower, upper = zip(*(child.bounds() for child in self.children))
+        return combine(lower), combine(upper)
+
+
+class _WindowStream(_Stream):
+    def __init__(self, node, children):
+        super().__init__(node, children)
+        self.maximum = isinstance(node, Eventually)
+        self.identity = -np.inf if self.maximum else np.inf
+        self.window = deque() # indices of the argument, with monotone values
+        self.received = 0     # number of argument values pushed into the window
+        self.head = self.identity # minimum/maximum of the argument values over [t1, t2] received so far
+
+    def advance(self, done=False):
+        arg = self.children[0].values
+        t1, t2 = self.node.t1, self.node.t2
+        while self.received < len(arg):
+            j, value = self.received, arg[self.received]
+            while self.window and (arg[self.window[-1]] <= value if self.maximum else arg[self.window[-1]] >= value):
+                self.window.pop()
+            self.window.append(j)
+            if t1 <= j <= t2:
+                self.head = max(self.head, value) if self.maximum else min(self.head, value)
+            self.received += 1
+            if j >= t2:
+                self._emit(j - t2)
+        if done:
+            # Truncate the windows that reach beyond the end of the stream
+            while len(self.values) < len(arg):
+                self._emit(len(self.values))
+
+    def _emit(self, t):
+        arg = self.children[0].values
+        while self.window and self.window[0] < t + self.node.t1:
+            self.window.popleft()
+        self.values.append(arg[self.window[0]] if self.window else self.identity)
+
+    def _partial_bounds(self):
+        # The argument values received so far bound the value at step 0 from one side
+        child = self.children[0].bounds()
+        if self.maximum:
+            lower = max(self.head, child[0]) if self.node.t1 == 0 else self.head
+            return lower, np.inf
+        upper = min(self.head, child[1]) if self.node.t1 == 0 else self.head
+        return -np.inf, upper
+
+
+class _UntilStream(_Stream):
+    def __init__(self, node, children):
+        super().__init__(node, children)
+        self.switch = node.t1 # next switching time t' of the value at step 0
+        self.held = np.inf    # minimum of the left argument over [t1, switch-1]
+        self.best = -np.inf   # maximum over the switching times so far
+
+    def advance(self, done=False):
+        left, right = self.children[0].values, self.children[1].values
+        t1, t2 = self.node.t1, self.node.t2
+
+        # Switching times of the value at step 0, for its bounds
+        while self.switch <= t2 and self.switch < min(len(left), len(right)):
+            self.best = max(self.best, min(self.held, right[self.switch]))
+            self.held = min(self.held, left[self.switch])
+            self.switch += 1
+
+        # Beyond the end of the stream the right argument cannot hold and the left one is vacuous
+        final = len(left) if done else min(len(left) + 1, len(right)) - t2
+        for t in range(len(self.values), final):
+            value, held = -np.inf, np.inf
+            for switch in range(t + t1, t + t2 + 1):
+                if switch >= len(right):
+                    break
+                value = max(value, min(held, right[switch]))
+                held = min(held, left[switch]) if switch < len(left) else held
+            self.values.append(value)
+
+    def _partial_bounds(self):
+        # Later switching times cannot exceed the minimum of the left argument so far
+        return self.best, max(self.best, self.held) if self.switch <= self.node.t2 else self.best
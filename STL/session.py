@@ -0,0 +1,161 @@
+"""
+session.py
+
+Incremental reuse of the Gurobi model across the feedback iterations of a conversation.
+
+Every iteration of the feedback loop in `main.py` solves a new specification from the same initial
+state, horizon and time step. The dynamics constraints, control and state bounds and the cost
+of the model are the same every time; only the STL constraints change. The `PlanningSession` keeps one
+`MICPSolver` per (x0, N, dt, max_acc, max_speed, objective) and swaps the specification in place:
+
+- encodings of (sub-formula, time step) pairs that also occur in the new specification are kept. The
+  cuboid formulas are interned by `STL_formulas` and the session compiles every specification with the
+  same `SpecCompiler`, so a predicate shared with the previous specification keeps its binary variable,
+- encodings that are no longer used are removed from the model, new ones are added,
+- the big-M constants of the kept predicates are updated to the bounds of the new specification,
+- the last solution is given to Gurobi as a MIP start: the states, inputs and the kept binaries. Without a
+  last solution, the graph-search warm start of the `STLSolver` is used, if any (see `warm_start.py`).
+
+Classes:
+    - PlanningSession: Keeps the model of a planning problem across specifications.
+"""
+
+import time
+import numpy as np
+from stlpy.STL import LinearPredicate
+from STL.bounds import big_M, derive_position_bounds, robustness_upper_bound
+from STL.spec_parser import SpecCompiler
+
+
+class PlanningSession:
+    """
+    Keeps the Gurobi model of a planning problem and swaps specifications in and out of it.
+
+    Parameters:
+        objects (dict): Objects of the scenario, used for the position bounds.
+
+    Attributes:
+        solver (MICPSolver): The current model, None before the first solve.
+        last_solution (dict): Values of the states, inputs and binaries of the last feasible solve.
+        stats (dict): Statistics of the last solve: whether the model was rebuilt, the numbers of kept,
+                      added and removed encodings, the number of MIP start values and the swap time.
+
+    Methods:
+        solve(stl_solver, spec_ast, x0, N):
+            Solves a specification with the dynamics, bounds and cost of an `STLSolver`. Returns (x, u).
+    """
+    def __init__(self, objects):
+        self.objects = objects
+        self.compiler = SpecCompiler()
+        self.solver = None
+        self.key = None
+        self.formulas = {}          # (id(formula), t) -> formula, keeps the encoded formulas (and their ids) alive
+        self.last_solution = None
+        self.stats = {}
+
+    def solve(self, stl_solver, spec_ast, x0, N):
+        start_time = time.time()
+        key = (tuple(np.round(np.asarray(x0, dtype=float), 9)), N, stl_solver.dt, stl_solver.max_acc, stl_solver.max_speed,
+               stl_solver.objective)
+        rebuilt = key != self.key
+        if rebuilt:
+            self.solver = stl_solver.build_solver(None, x0, N)
+            self.key = key
+            self.formulas = {}
+            self.last_solution = None
+        self.solver.model.setParam('OutputFlag', int(bool(stl_solver.verbose)))
+
+        kept, added, removed = self._swap_spec(stl_solver, spec_ast, x0, N)
+        started = self._set_start()
+        if not started and stl_solver.warm_start is not None:
+            started = stl_solver.warm_start.apply(self.solver)
+        self.solver.build_time = time.time() - start_time
+        self.stats = {
+            'rebuilt': rebuilt,
+            'kept': kept,
+            'added': added,
+            'removed': removed,
+            'start_values': started,
+            'swap_time': self.solver.build_time,
+        }
+
+        x, u = stl_solver.solve(self.solver)
+        if x is not None:
+            self.last_solution = {
+                'x': x,
+                'u': u,
+                'binaries': {k: z.X[0] for k, z in self.solver.predicate_variables.items()},
+            }
+        return x, u
+
+    def _swap_spec(self, stl_solver, spec_ast, x0, N):
+        solver = self.solver
+        model = solver.model
+        formula = self.compiler.compile(spec_ast)
+
+        # Bounds of the new specification
+        if stl_solver.tight_bounds:
+            lower, upper = derive_position_bounds(spec_ast, self.objects, np.asarray(x0, dtype=float), N,
+                                                  stl_solver.dt, stl_solver.max_acc, stl_solver.max_speed)
+            solver.position_bounds = (lower, upper)
+            solver.rho_max = robustness_upper_bound(formula, lower, upper)
+        else:
+            lower, upper = np.full((3, N+1), -np.inf), np.full((3, N+1), np.inf)
+            solver.position_bounds = None
+            solver.rho_max = float('inf')
+        solver.x[:3,:].lb = lower
+        solver.x[:3,:].ub = upper
+        solver.rho.ub = solver.rho_max
+
+        # Remove the encodings that the new specification does not use
+        used = {}
+        self._collect(formula, 0, used)
+        unused = [k for k in solver.encoded if k not in used]
+        for k in unused:
+            model.remove(solver.encoding_constraints.pop(k))
+            model.remove(solver.encoded.pop(k))
+            solver.predicate_variables.pop(k, None)
+            self.formulas.pop(k, None)
+        kept = len(solver.encoded)
+
+        # Update the big-M constants of the kept predicates to the new bounds
+        model.update()
+        for k, z in solver.predicate_variables.items():
+            predicate, t = used[k], k[1]
+            M = solver.M
+            if solver.position_bounds is not None:
+                M = big_M(predicate, lower[:,t], upper[:,t], solver.rho_max, solver.M)
+            constraint = solver.encoding_constraints[k][0].tolist()[0]
+            model.chgCoeff(constraint, z.tolist()[0], -M)
+            constraint.RHS = float(np.ravel(predicate.b)[0]) - M
+
+        # Encode the new specification, reusing the kept encodings
+        model.remove(solver.spec_constraint)
+        z_spec = solver.AddSubformulaVariable(formula, 0)
+        solver.spec_constraint = model.addConstr( z_spec == 1 )
+        self.formulas.update(used)
+        solver.spec = formula
+        return kept, len(solver.encoded) - kept, len(unused)
+
+    def _collect(self, formula, t, used):
+        # All (id(formula), t) pairs that encoding the formula at time step t visits
+        key = (id(formula), t)
+        if key in used:
+            return
+        used[key] = formula
+        if not isinstance(formula, LinearPredicate):
+            for i, subformula in enumerate(formula.subformula_list):
+                self._collect(subformula, t + formula.timesteps[i], used)
+
+    def _set_start(self):
+        solver = self.solver
+        if self.last_solution is None:
+            return 0
+        solver.x.Start = self.last_solution['x']
+        solver.u.Start = self.last_solution['u']
+        started = 0
+        for k, z in solver.predicate_variables.items():
+            if k in self.last_solution['binaries']: # binaries added since the last solution have no start value
+                z.Start = self.last_solution['binaries'][k]
+                started += 1
+        return started
@@ -0,0 +1,228 @@
+"""
+simplify.py
+
+A rewrite pass on the specification AST, applied before the specification is encoded.
+
+Specifications generated by the LLM are often redundant: the same obstacle avoidance conjoined twice,
+nested `always` operators over the same object, time windows that extend past the horizon, or obstacles
+the drone cannot reach anyway. Every redundant node costs binary variables in the mixed-integer encoding.
+`simplify_spec` rewrites the AST into an equivalent one:
+
+- nested conjunctions and disjunctions are flattened, and duplicate arguments removed,
+- time windows are clamped to the horizon [0, N]: steps after the end of the trajectory do not exist,
+  so an `always` only constrains, and an `eventually` can only be satisfied, up to step N,
+- nested `always` (or `eventually`) operators are merged into one window, and temporal operators over
+  identical sub-formulas are merged: overlapping or adjacent `always` windows in a conjunction
+  (and `eventually` windows in a disjunction) are joined, and operators that are implied by another
+  argument are removed,
+- trivially true or false parts are folded: cuboids that are empty after the tolerance, and, given
+  position bounds such as the reachable set, cuboids the drone is certainly inside or outside of at the
+  time steps the cuboid is evaluated.
+
+The satisfying trajectories of the simplified specification are the same. The robustness can only be
+larger, since folded predicates no longer bound it.
+
+Classes:
+    - SimplificationReport: Numbers of binaries before and after the simplification.
+
+Functions:
+    - simplify_spec(spec_ast, N, lower=None, upper=None): Returns the simplified AST, TRUE or FALSE.
+    - count_binaries(formula): Number of binary variables of the mixed-integer encoding of a compiled formula.
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from stlpy.STL import LinearPredicate
+from STL.spec_parser import Cuboid, And, Or, Always, Eventually, Until
+
+
+class _Constant:
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return "TRUE" if self.value else "FALSE"
+
+
+TRUE = _Constant(True)
+FALSE = _Constant(False)
+
+
+@dataclass
+class SimplificationReport:
+    """
+    The effect of a simplification on the mixed-integer encoding.
+
+    Attributes:
+        binaries_before (int): Binary variables of the original specification.
+        binaries_after (int): Binary variables of the simplified specification.
+    """
+    binaries_before: int
+    binaries_after: int
+
+    @property
+    def saved(self):
+        return self.binaries_before - self.binaries_after
+
+
+def simplify_spec(spec_ast, N, lower=None, upper=None):
+    """
+    Simplifies a specification AST evaluated at time step 0 of a trajectory with N time steps.
+
+    Parameters:
+        spec_ast (SpecNode): The specification.
+        N (int): Number of time steps.
+        lower, upper (numpy.ndarray): Optional per-step position bounds, each of shape (3, N+1), that every
+                                      trajectory satisfies (e.g. the reachable set, see `ReachabilityAnalyzer`).
+                                      Used to fold cuboids that are certainly satisfied or violated.
+
+    Returns:
+        The simplified AST, or `TRUE` / `FALSE` if the specification is trivially satisfied or violated.
+    """
+    return _Simplifier(N, lower, upper).simplify(spec_ast, 0, 0)
+
+
+def count_binaries(formula):
+    """
+    Returns the number of binary variables of the mixed-integer encoding of a compiled formula: one per
+    distinct (predicate, time step) pair, as in `MICPSolver`.
+    """
+    binaries, visited = set(), set()
+    stack = [(formula, 0)]
+    while stack:
+        formula, t = stack.pop()
+        if (id(formula), t) in visited:
+            continue
+        visited.add((id(formula), t))
+        if isinstance(formula, LinearPredicate):
+            binaries.add((id(formula), t))
+        else:
+            stack.extend((subformula, t + formula.timesteps[i]) for i, subformula in enumerate(formula.subformula_list))
+    return len(binaries)
+
+
+class _Simplifier:
+    # Every node is simplified with the range [a, b] of time steps at which it is evaluated
+
+    def __init__(self, N, lower, upper):
+        self.N = N
+        self.lower = lower
+        self.upper = upper
+
+    def simplify(self, node, a, b):
+        if isinstance(node, Cuboid):
+            return self._cuboid(node, a, b)
+        if isinstance(node, (And, Or)):
+            return self._boolean(node, a, b)
+        if isinstance(node, (Always, Eventually)):
+            return self._temporal(node, a, b)
+        return self._until(node, a, b)
+
+    def _clamp(self, t2, a, b):
+        # The window can only be clamped if it has the same end at every evaluation time step
+        return min(t2, self.N - b) if a == b else t2
+
+    def _cuboid(self, node, a, b):
+        shrunk_lower = np.array(node.bounds[0::2]) + node.tolerance
+        shrunk_upper = np.array(node.bounds[1::2]) - node.tolerance
+        if node.inside and np.any(shrunk_lower > shrunk_upper):
+            return FALSE
+        if self.lower is None or b > self.N:
+            return node
+
+        lower, upper = self.lower[:, a:b+1], self.upper[:, a:b+1]
+        expanded_lower = np.array(node.bounds[0::2]) - node.tolerance
+        expanded_upper = np.array(node.bounds[1::2]) + node.tolerance
+        # Outside holds if the position box is beyond a face of the expanded cuboid on some axis
+        outside = np.any((upper <= expanded_lower[:, None]) | (lower >= expanded_upper[:, None]), axis=0)
+        # Inside holds if the position box is within the shrunk cuboid
+        inside = np.all((lower >= shrunk_lower[:, None]) & (upper <= shrunk_upper[:, None]), axis=0)
+        # Inside is violated if the position box misses the shrunk cuboid on some axis
+        missed = np.any((upper < shrunk_lower[:, None]) | (lower > shrunk_upper[:, None]), axis=0)
+        # Outside is violated if the position box is strictly within the expanded cuboid
+        trapped = np.all((lower > expanded_lower[:, None]) & (upper < expanded_upper[:, None]), axis=0)
+
+        if node.inside:
+            return TRUE if np.all(inside) else FALSE if np.all(missed) else node
+        return TRUE if np.all(outside) else FALSE if np.all(trapped) else node
+
+    def _boolean(self, node, a, b):
+        conjunction = isinstance(node, And)
+        absorbing, neutral = (FALSE, TRUE) if conjunction else (TRUE, FALSE)
+
+        args = []
+        for arg in node.args:
+            arg = self.simplify(arg, a, b)
+            if arg is absorbing:
+                return absorbing
+            if arg is neutral:
+                continue
+            for flat in (arg.args if type(arg) is type(node) else (arg,)):
+                if flat not in args:
+                    args.append(flat)
+
+        merged = self._merge_windows(args, conjunction)
+        while merged != args: # a joined window can overlap another one
+            args, merged = merged, self._merge_windows(merged, conjunction)
+        if not args:
+            return neutral
+        if len(args) == 1:
+            return args[0]
+        return type(node)(tuple(args))
+
+    def _merge_windows(self, args, conjunction):
+        # In a conjunction, always windows over the same formula are joined, and an eventually is implied by
+        # one with a window inside its own. In a disjunction, the same holds with always and eventually swapped.
+        joined, implied = (Always, Eventually) if conjunction else (Eventually, Always)
+        merged = []
+        for arg in args:
+            if isinstance(arg, joined):
+                for i, other in enumerate(merged):
+                    if type(other) is joined and other.arg == arg.arg and arg.t1 <= other.t2 + 1 and other.t1 <= arg.t2 + 1:
+                        merged[i] = joined(arg.arg, min(arg.t1, other.t1), max(arg.t2, other.t2))
+                        break
+                else:
+                    merged.append(arg)
+            elif isinstance(arg, implied):
+                # Replace the operators this one implies, unless an operator implies this one
+                if any(type(other) is implied and other.arg == arg.arg and arg.t1 <= other.t1 and other.t2 <= arg.t2
+                       for other in merged):
+                    continue
+                merged = [other for other in merged if not (type(other) is implied and other.arg == arg.arg
+                                                            and other.t1 <= arg.t1 and arg.t2 <= other.t2)]
+                merged.append(arg)
+            else:
+                merged.append(arg)
+        return merged
+
+    def _temporal(self, node, a, b):
+        always = isinstance(node, Always)
+        t1, t2 = node.t1, self._clamp(node.t2, a, b)
+        if t2 < t1:
+            return TRUE if always else FALSE # an empty window
+
+        arg = self.simplify(node.arg, a + t1, b + t2)
+        if isinstance(arg, _Constant):
+            return arg
+        if type(arg) is type(node):
+            # always[t1, t2] always[s1, s2] = always[t1 + s1, t2 + s2], and the same for eventually
+            return type(node)(arg.arg, t1 + arg.t1, t2 + arg.t2)
+        if t1 == t2 == 0:
+            return arg
+        return type(node)(arg, t1, t2)
+
+    def _until(self, node, a, b):
+        t1, t2 = node.t1, self._clamp(node.t2, a, b)
+        if t2 < t1:
+            return FALSE
+
+        # The left formula is evaluated from t1 until the switching time step, the right formula at the switch
+        right = self.simplify(node.right, a + t1, b + t2)
+        if isinstance(right, _Constant):
+            return right
+        left = self.simplify(node.left, a + t1, b + t2)
+        if left is TRUE:
+            return self._temporal(Eventually(right, t1, t2), a, b)
+        if left is FALSE:
+            return self._temporal(Eventually(right, t1, t1), a, b)
+        return Until(left, right, t1, t2)
@@ -0,0 +1,390 @@
+"""
+spec_parser.py
+
+A small parser and compiler for the STL specifications generated by the LLM.
+
+The specifications follow the grammar given to the LLM in `LLM/instructions/ChatGPT_instructions.txt`:
+
+    spec      := conj ('|' conj)*
+    conj      := postfix ('&' postfix)*
+    postfix   := primary ('.' temporal)*
+    temporal  := 'eventually' '(' int ',' int ')'
+               | 'always' '(' int ',' int ')'
+               | 'until' '(' spec ',' int ',' int ')'
+    primary   := 'STL_formulas' '.' ('inside_cuboid' | 'outside_cuboid') '(' bounds [',' ['tolerance' '='] number] ')'
+               | '(' spec ')'
+    bounds    := 'objects' '[' string ']' | '(' number (',' number)*5 ')' | '[' number (',' number)*5 ']'
+
+Instead of running `eval` on the raw LLM string, the specification is parsed into a typed,
+immutable and hashable abstract syntax tree (AST). Structurally identical subtrees compare
+and hash equal, so the AST can be used as a dictionary key, and the `SpecCompiler` turns it
+into `stlpy` formulas while building every distinct subtree only once.
+
+Classes:
+    - SpecSyntaxError: Raised when a specification cannot be parsed.
+    - Cuboid, And, Or, Always, Eventually, Until: The AST nodes.
+    - SpecCompiler: Compiles AST nodes into `stlpy` formulas with memoized sub-formulas.
+
+Functions:
+    - parse_spec(spec, objects): Parses a specification string into an AST.
+"""
+
+import re
+from dataclasses import dataclass, field
+from stlpy.STL import STLTree
+
+
+class SpecSyntaxError(ValueError):
+    """
+    Raised when a specification does not follow the specification grammar.
+
+    Attributes:
+        spec (str): The specification that failed to parse.
+        position (int): Character offset in `spec` where the error was detected.
+        reason (str): Description of the error.
+    """
+    def __init__(self, reason, spec, position):
+        self.reason = reason
+        self.spec = spec
+        self.position = position
+        pointer = " " * position + "^"
+        super().__init__(f"{reason} (at position {position})\n    {spec}\n    {pointer}")
+
+
+@dataclass(frozen=True)
+class SpecNode:
+    """
+    Base class of the specification AST nodes.
+
+    Nodes are immutable and compare structurally. Fields that only carry presentation
+    information (object names) are excluded from comparison and hashing.
+    """
+
+    def children(self):
+        return ()
+
+    def walk(self):
+        """
+        Yields this node and all its descendants in pre-order.
+        """
+        yield self
+        for child in self.children():
+            yield from child.walk()
+
+    def __str__(self):
+        return self.to_string(canonical=False)
+
+
+@dataclass(frozen=True)
+class Cuboid(SpecNode):
+    """
+    Being inside (inside=True) or outside (inside=False) of an axis-aligned cuboid.
+    """
+    inside: bool
+    bounds: tuple
+    tolerance: float = 0.1
+    name: str = field(default=None, compare=False)
+
+    def to_string(self, canonical=True):
+        function = "inside_cuboid" if self.inside else "outside_cuboid"
+        if self.name is not None and not canonical:
+            bounds = f'objects["{self.name}"]'
+        else:
+            bounds = "(" + ", ".join(repr(float(b)) for b in self.bounds) + ")"
+        tolerance = f", {float(self.tolerance)!r}" if canonical or self.tolerance != 0.1 else ""
+        return f"STL_formulas.{function}({bounds}{tolerance})"
+
+
+@dataclass(frozen=True)
+class _Boolean(SpecNode):
+    args: tuple
+    operator = None
+
+    def children(self):
+        return self.args
+
+    def to_string(self, canonical=True):
+        parts = [arg.to_string(canonical) for arg in self.args]
+        if canonical:
+            parts = sorted(parts) # conjunction and disjunction are commutative
+        return "(" + f" {self.operator} ".join(parts) + ")"
+
+
+@dataclass(frozen=True)
+class And(_Boolean):
+    operator = "&"
+
+
+@dataclass(frozen=True)
+class Or(_Boolean):
+    operator = "|"
+
+
+@dataclass(frozen=True)
+class _Temporal(SpecNode):
+    arg: SpecNode
+    t1: int
+    t2: int
+    function = None
+
+    def children(self):
+        return (self.arg,)
+
+    def to_string(self, canonical=True):
+        return f"{self.arg.to_string(canonical)}.{self.function}({self.t1}, {self.t2})"
+
+
+@dataclass(frozen=True)
+class Always(_Temporal):
+    function = "always"
+
+
+@dataclass(frozen=True)
+class Eventually(_Temporal):
+    function = "eventually"
+
+
+@dataclass(frozen=True)
+class Until(SpecNode):
+    """
+    `left` holds at every step until `right` holds at some step in [t1, t2].
+    """
+    left: SpecNode
+    right: SpecNode
+    t1: int
+    t2: int
+
+    def children(self):
+        return (self.left, self.right)
+
+    def to_string(self, canonical=True):
+        return f"{self.left.to_string(canonical)}.until({self.right.to_string(canonical)}, {self.t1}, {self.t2})"
+
+
+_TOKEN_REGEX = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<string>"[^"]*"|'[^']*')
+  | (?P<op>[.()\[\],&|=])
+""", re.VERBOSE)
+
+
+class _Parser:
+    """
+    Recursive descent parser for the specification grammar.
+    """
+    def __init__(self, spec, objects):
+        self.spec = spec
+        self.objects = objects
+        self.tokens = self._tokenize(spec)
+        self.index = 0
+
+    def _tokenize(self, spec):
+        tokens = []
+        position = 0
+        while position < len(spec):
+            match = _TOKEN_REGEX.match(spec, position)
+            if match is None:
+                raise SpecSyntaxError(f"Unexpected character {spec[position]!r}", spec, position)
+            if match.lastgroup != 'space':
+                tokens.append((match.lastgroup, match.group(), position))
+            position = match.end()
+        tokens.append(('end', '', len(spec)))
+        return tokens
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def error(self, reason, token=None):
+        token = token or self.peek()
+        return SpecSyntaxError(reason, self.spec, token[2])
+
+    def expect(self, value, description=None):
+        token = self.peek()
+        if token[1] != value or token[0] == 'string':
+            found = "end of specification" if token[0] == 'end' else repr(token[1])
+            raise self.error(f"Expected {description or repr(value)}, found {found}")
+        return self.advance()
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek()[0] != 'end':
+            raise self.error(f"Unexpected {self.peek()[1]!r}, expected '&', '|' or the end of the specification")
+        return node
+
+    def parse_or(self):
+        args = [self.parse_and()]
+        while self.peek()[1] == '|':
+            self.advance()
+            args.append(self.parse_and())
+        return args[0] if len(args) == 1 else Or(tuple(args))
+
+    def parse_and(self):
+        args = [self.parse_postfix()]
+        while self.peek()[1] == '&':
+            self.advance()
+            args.append(self.parse_postfix())
+        return args[0] if len(args) == 1 else And(tuple(args))
+
+    def parse_postfix(self):
+        node = self.parse_primary()
+        while self.peek()[1] == '.':
+            self.advance()
+            token = self.advance()
+            if token[1] in ('always', 'eventually'):
+                self.expect('(')
+                t1, t2 = self.parse_interval()
+                self.expect(')')
+                node = (Always if token[1] == 'always' else Eventually)(node, t1, t2)
+            elif token[1] == 'until':
+                self.expect('(')
+                other = self.parse_or()
+                self.expect(',')
+                t1, t2 = self.parse_interval()
+                self.expect(')')
+                node = Until(node, other, t1, t2)
+            else:
+                raise self.error(f"Unknown temporal function {token[1]!r}, expected 'always', 'eventually' or 'until'", token)
+        return node
+
+    def parse_interval(self):
+        start = self.peek()
+        t1 = self.parse_time()
+        self.expect(',')
+        t2 = self.parse_time()
+        if t1 > t2:
+            raise self.error(f"Empty time interval [{t1}, {t2}]", start)
+        return t1, t2
+
+    def parse_time(self):
+        token = self.advance()
+        if token[0] != 'number':
+            raise self.error("Expected an integer time step", token)
+        value = float(token[1])
+        if value != int(value) or value < 0:
+            raise self.error(f"Time steps must be non-negative integers, found {token[1]}", token)
+        return int(value)
+
+    def parse_number(self):
+        token = self.advance()
+        if token[0] != 'number':
+            raise self.error("Expected a number", token)
+        return float(token[1])
+
+    def parse_primary(self):
+        token = self.peek()
+        if token[1] == '(' and token[0] == 'op':
+            self.advance()
+            node = self.parse_or()
+            self.expect(')')
+            return node
+        if token[1] != 'STL_formulas':
+            raise self.error("Expected 'STL_formulas.inside_cuboid(...)', 'STL_formulas.outside_cuboid(...)' or '('")
+        self.advance()
+        self.expect('.')
+        function = self.advance()
+        if function[1] not in ('inside_cuboid', 'outside_cuboid'):
+            raise self.error(f"Unknown logic function {function[1]!r}, expected 'inside_cuboid' or 'outside_cuboid'", function)
+        self.expect('(')
+        bounds, name = self.parse_bounds()
+        tolerance = 0.1
+        if self.peek()[1] == ',':
+            self.advance()
+            if self.peek()[1] == 'tolerance':
+                self.advance()
+                self.expect('=')
+            tolerance = self.parse_number()
+        self.expect(')')
+        return Cuboid(function[1] == 'inside_cuboid', bounds, tolerance, name)
+
+    def parse_bounds(self):
+        token = self.peek()
+        if token[1] == 'objects':
+            self.advance()
+            self.expect('[')
+            key = self.advance()
+            if key[0] != 'string':
+                raise self.error("Expected an object name in quotes", key)
+            name = key[1][1:-1]
+            if name not in self.objects:
+                raise self.error(f"Unknown object {name!r}, available objects: {', '.join(self.objects)}", key)
+            self.expect(']')
+            return tuple(float(b) for b in self.objects[name]), name
+
+        if token[1] in ('(', '['):
+            closing = ')' if token[1] == '(' else ']'
+            self.advance()
+            bounds = [self.parse_number()]
+            while self.peek()[1] == ',':
+                self.advance()
+                bounds.append(self.parse_number())
+            self.expect(closing)
+            if len(bounds) != 6:
+                raise self.error(f"Bounds need 6 values (xmin, xmax, ymin, ymax, zmin, zmax), found {len(bounds)}", token)
+            return tuple(bounds), None
+
+        raise self.error("Expected bounds: objects[\"name\"] or (xmin, xmax, ymin, ymax, zmin, zmax)")
+
+
+def parse_spec(spec, objects):
+    """
+    Parses a specification string into an AST.
+
+    Parameters:
+        spec (str): The specification, e.g. 'STL_formulas.inside_cuboid(objects["goal"]).eventually(0, 10)'.
+        objects (dict): Dictionary of objects and their bounds used to resolve objects["name"].
+
+    Returns:
+        SpecNode: The root of the AST.
+
+    Raises:
+        SpecSyntaxError: If the specification does not follow the grammar, with the position of the error.
+    """
+    return _Parser(spec, objects).parse()
+
+
+class SpecCompiler:
+    """
+    Compiles specification ASTs into `stlpy` formulas.
+
+    Compiled sub-formulas are memoized on their (structural) AST node, so a subtree that
+    occurs several times in a specification, or in several specifications compiled with the
+    same compiler, is only built once and the resulting `stlpy` objects are shared.
+
+    Methods:
+        compile(node):
+            Returns the `stlpy` formula of an AST node.
+    """
+    def __init__(self):
+        self.memo = {}
+
+    def compile(self, node):
+        if node not in self.memo:
+            self.memo[node] = self._compile(node)
+        return self.memo[node]
+
+    def _compile(self, node):
+        # Imported here since STL_to_path imports this module
+        from STL.STL_to_path import STL_formulas
+
+        if isinstance(node, Cuboid):
+            if node.inside:
+                return STL_formulas.inside_cuboid(node.bounds, node.tolerance)
+            return STL_formulas.outside_cuboid(node.bounds, node.tolerance)
+        if isinstance(node, _Boolean):
+            subformulas = [self.compile(arg) for arg in node.args]
+            combination = "and" if isinstance(node, And) else "or"
+            return STLTree(subformulas, combination, [0] * len(subformulas))
+        if isinstance(node, Always):
+            return self.compile(node.arg).always(node.t1, node.t2)
+        if isinstance(node, Eventually):
+            return self.compile(node.arg).eventually(node.t1, node.t2)
+        if isinstance(node, Until):
+            return self.compile(node.left).until(self.compile(node.right), node.t1, node.t2)
+        raise TypeError(f"Unknown specification node {type(node).__name__}")
@@ -7,6 +7,21 @@ It supports:
 - Visualizing trajectories relative to predefined objects.
 - Validating task completion based on scenario-specific rules.
 
+Which objects the drone is inside at every time step (the occupancy matrix) is computed by `occupancy`, which
+compares all positions with the stacked bounds of all objects using NumPy broadcasting.
+
+Between two time steps the drone moves along a straight segment, which can cut through the corner of a thin
+object while both time steps are outside of it. `segment_intersections` tests every segment against every
+object with the slab method, and `TrajectoryAnalyzer.get_crossings` turns the hits into entry and exit times.
+
+Given the spatial index of the scenario (see `basics/spatial_index.py`), the analyzer only tests the positions
+and segments against the objects in their grid cells, which scales to maps with many objects.
+
+Functions:
+- stack_bounds(objects): Returns the bounds of all objects as one (n_obj, 6) array.
+- occupancy(bounds, positions): Returns the boolean (n_obj, T) occupancy matrix of a trajectory.
+- segment_intersections(bounds, positions): Returns where the segments between time steps intersect the objects.
+
 Dependencies:
 - numpy
 - matplotlib
@@ -19,6 +34,63 @@ import matplotlib.pyplot as plt
 from LLM.GPT import GPT
 from LLM.NL_to_STL import NL_to_STL
 from basics.logger import color_text
+from basics.spatial_index import segment_box_intervals
+
+def stack_bounds(objects):
+    """
+    Returns the bounds of all objects as one array.
+
+    Parameters:
+    - objects (dict): Dictionary with object names as keys and boundary tuples (xmin, xmax, ymin, ymax, zmin, zmax)
+                      as values.
+
+    Returns:
+    - ndarray: Bounds of shape (n_obj, 6), in the order of the dictionary.
+    """
+    return np.array(list(objects.values()), dtype=float).reshape(-1, 6)
+
+def occupancy(bounds, positions):
+    """
+    Computes whether each position is inside each object (boundaries included), in one pass over the axes.
+
+    Parameters:
+    - bounds (ndarray): Object bounds of shape (n_obj, 6), see `stack_bounds`.
+    - positions (ndarray): Positions of shape (3, T), or states of shape (6, T).
+
+    Returns:
+    - ndarray: Boolean array of shape (n_obj, T), True where the position at time step t is inside object i.
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    inside = np.ones((bounds.shape[0], positions.shape[1]), dtype=bool)
+    compare = np.empty_like(inside)
+    for axis in range(3):
+        # Update in place, so the only temporaries are of shape (n_obj, T)
+        np.greater_equal(positions[axis], bounds[:, 2*axis, None], out=compare)
+        inside &= compare
+        np.less_equal(positions[axis], bounds[:, 2*axis+1, None], out=compare)
+        inside &= compare
+    return inside
+
+def segment_intersections(bounds, positions):
+    """
+    Intersects the straight segments between consecutive positions with the objects (boundaries included), using
+    the slab method: on each axis the segment is inside the slab of the object for a parameter interval, and it
+    intersects the object where the intervals of the three axes overlap.
+
+    Parameters:
+    - bounds (ndarray): Object bounds of shape (n_obj, 6), see `stack_bounds`.
+    - positions (ndarray): Positions of shape (3, T), or states of shape (6, T).
+
+    Returns:
+    - tuple: (hit, entry, exit), each of shape (n_obj, T-1). hit is True where segment j (from time step j to j+1)
+             intersects object i, entry and exit are the fractions of the segment in [0, 1] at which it enters and
+             leaves the object (nan where there is no hit).
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    positions = np.asarray(positions, dtype=float)[:3]
+    return segment_box_intervals(bounds[:, 0::2].T[:, :, None], bounds[:, 1::2].T[:, :, None],
+                                 positions[:, None, :-1], np.diff(positions, axis=1)[:, None, :])
 
 class TrajectoryAnalyzer:
     """
@@ -29,6 +101,7 @@ class TrajectoryAnalyzer:
     - x (ndarray): Array of drone positions at each time step.
     - N (int): Number of time steps.
     - dt (float): Time interval between steps.
+    - spatial_index (SpatialIndex): Optional spatial index over the objects, e.g. `Scenarios.spatial_index`.
 
     Methods:
     - GPT_spec_check: Uses GPT to validate task specifications based on the drone's trajectory.
@@ -36,9 +109,10 @@ class TrajectoryAnalyzer:
     - task_accomplished_check: Validates if the task was completed successfully based on scenario-specific conditions.
     - get_inside_objects_text: Generates a text summary of the drone's interactions with objects.
     - get_inside_objects_array: Creates a binary array indicating whether the drone is inside each object at each time step.
+    - get_crossings: Returns the time intervals in which the segments between the time steps are inside each object.
     - is_inside: Checks if a point is within a defined object's boundaries.
     """
-    def __init__(self, objects, x, N, dt):
+    def __init__(self, objects, x, N, dt, spatial_index=None):
         """
         Initializes the TrajectoryAnalyzer with objects, trajectory data, and simulation parameters.
 
@@ -47,13 +121,17 @@ class TrajectoryAnalyzer:
         - x (ndarray): Array of drone positions at each time step (shape: 3xN).
         - N (int): Number of time steps in the trajectory.
         - dt (float): Time interval between steps.
+        - spatial_index (SpatialIndex): Optional spatial index over the same objects. Default is None (the
+                                        positions and segments are tested against all objects).
         """
         self.objects = objects
+        self.bounds = stack_bounds(objects)
+        self.spatial_index = spatial_index
         self.x = x
         self.N = N
         self.dt = dt
 
-    def GPT_spec_check(self, objects, inside_objects_array, previous_messages):
+    def GPT_spec_check(self, objects, inside_objects_array, previous_messages, crossings=None):
         """
         Uses GPT to validate task specifications based on the drone's trajectory.
 
@@ -61,6 +139,7 @@ class TrajectoryAnalyzer:
         - objects (dict): Dictionary defining objects in the environment.
         - inside_objects_array (ndarray): Binary array indicating if the drone is inside objects over time.
         - previous_messages (list): List of previous conversation messages for GPT.
+        - crossings (dict): Optional crossings of the segments between the time steps, see `get_crossings`.
 
         Returns:
         - str: GPT's response to the specification check.
@@ -73,7 +152,7 @@ class TrajectoryAnalyzer:
         instructions = translator.insert_instruction_variables(instructions_template) # insert variables into the instructions template
         messages.insert(0, {"role": "system", "content": instructions}) # insert the instructions at the beginning of the messages
 
-        inside_objects_text = self.get_inside_objects_text(inside_objects_array) # get text description of the inside objects array
+        inside_objects_text = self.get_inside_objects_text(inside_objects_array, crossings) # get text description of the inside objects array
         messages.append({"role": "system", "content": inside_objects_text}) # append the inside objects text to the messages  
 
         print("Instruction messages:", messages)
@@ -116,13 +195,17 @@ class TrajectoryAnalyzer:
 
         return fig, ax
     
-    def task_accomplished_check(self, inside_objects_array, scenario_name):
+    def task_accomplished_check(self, inside_objects_array, scenario_name, crossings=None):
         """
         Validates whether the task was accomplished based on the scenario.
 
+        Goals must be reached at a time step. With crossings, obstacles and walls must also be avoided between the
+        time steps, and the door must not be entered (at any time) before the key is reached.
+
         Parameters:
         - inside_objects_array (ndarray): Binary array indicating if the drone is inside objects over time.
         - scenario_name (str): Name of the scenario ('reach_avoid' or 'treasure_hunt').
+        - crossings (dict): Optional crossings of the segments between the time steps, see `get_crossings`.
 
         Returns:
         - bool: True if the task was accomplished, False otherwise.
@@ -130,6 +213,7 @@ class TrajectoryAnalyzer:
         objects_inside = {}
         for i, object in enumerate(self.objects.keys()):
             objects_inside[object] = inside_objects_array[i,:]
+        crossings = crossings or {}
 
         if scenario_name == "reach_avoid":
             # test if goal is reached
@@ -139,7 +223,7 @@ class TrajectoryAnalyzer:
             obstacles_avoided = True
             for object in self.objects.keys():
                 if 'obstacle' in object:
-                    obstacle_crossed = 1 in objects_inside[object]
+                    obstacle_crossed = 1 in objects_inside[object] or bool(crossings.get(object))
                     if obstacle_crossed: obstacles_avoided = False
 
             task_accomplished = False
@@ -163,7 +247,7 @@ class TrajectoryAnalyzer:
             walls_avoided = True
             for object in self.objects.keys():
                 if 'wall' in object:
-                    wall_crossed = 1 in objects_inside[object]
+                    wall_crossed = 1 in objects_inside[object] or bool(crossings.get(object))
                     if wall_crossed: walls_avoided = False
 
             # test if the door is crossed before the key is reached
@@ -182,6 +266,12 @@ class TrajectoryAnalyzer:
                 door_crossed = False
 
             door_before_key = door_crossed and key_crossed and door_time < key_time
+            if crossings.get('door'):
+                # The door can be entered between the time steps: the earlier of the first time step inside and
+                # the first crossing, compared in seconds
+                door_entry = crossings['door'][0][0]
+                door_time = min(door_time*self.dt, door_entry) if door_crossed else door_entry
+                door_before_key = key_crossed and door_time < key_time*self.dt
 
             task_accomplished = False
             if chest_reached and walls_avoided and not door_before_key:
@@ -198,12 +288,14 @@ class TrajectoryAnalyzer:
 
             return task_accomplished
 
-    def get_inside_objects_text(self, inside_objects_array):
+    def get_inside_objects_text(self, inside_objects_array, crossings=None):
         """
         Generates a textual summary of the drone's interactions with objects.
 
         Parameters:
         - inside_objects_array (ndarray): Binary array indicating if the drone is inside objects over time.
+        - crossings (dict): Optional crossings of the segments between the time steps, see `get_crossings`. Crossings
+                            that do not contain a time step are added to the summary.
 
         Returns:
         - str: Text summary of interactions.
@@ -220,23 +312,56 @@ class TrajectoryAnalyzer:
             else:
                 inside_times = np.where(inside_objects_array[i,:] == 1)[0] # get the times when the drone is inside the object
                 output += f"The drone is inside the {object} at times {inside_times}.\n"
+            for entry, exit in (crossings or {}).get(object, []):
+                steps = np.arange(np.ceil(entry/self.dt - 1e-9), np.floor(exit/self.dt + 1e-9) + 1).astype(int)
+                if not np.any(inside_objects_array[i, steps[steps < T]] == 1):
+                    output += (f"The drone passes through the {object} between time steps, "
+                               f"from {entry:.2f} s to {exit:.2f} s.\n")
         return output
     
     def get_inside_objects_array(self):
         """
-        Creates a binary array indicating whether the drone is inside each object at each time step.
+        Creates a binary array indicating whether the drone is inside each object at each time step (see `occupancy`).
 
         Returns:
-        - ndarray: Binary array (shape: NxT) for N objects over T time steps.
+        - ndarray: Binary array (shape: NxT) of 0.0 and 1.0 for N objects over T time steps.
         """
-        T = self.x.shape[1]
-        N = len(self.objects)
-        inside_array = np.zeros((N,T))
-        for i, object in enumerate(self.objects.values()):
-            for j in range(T):
-                inside_array[i,j] = self.is_inside(self.x[:3,j], object)
+        if self.spatial_index is not None:
+            return self.spatial_index.occupancy(self.x[:3]).astype(float)
+        return occupancy(self.bounds, self.x[:3]).astype(float)
 
-        return inside_array
+    def get_crossings(self):
+        """
+        Returns the time intervals in which the straight segments between consecutive time steps are inside each
+        object (see `segment_intersections`). Intervals of consecutive segments that touch are merged.
+
+        Returns:
+        - dict: Object names as keys, lists of (entry time, exit time) in seconds as values. Objects that are never
+                entered have an empty list.
+        """
+        if self.spatial_index is not None:
+            # Only the candidate pairs of the spatial index are tested
+            objects, segments = self.spatial_index.segment_pairs(self.x[:3])
+            positions = self.x[:3]
+            pair_hit, pair_entry, pair_exit = segment_box_intervals(
+                self.bounds[objects, 0::2].T, self.bounds[objects, 1::2].T,
+                positions[:, segments], positions[:, segments + 1] - positions[:, segments])
+            shape = (len(self.objects), max(positions.shape[1] - 1, 0))
+            hit, entry, exit = np.zeros(shape, dtype=bool), np.full(shape, np.nan), np.full(shape, np.nan)
+            hit[objects, segments], entry[objects, segments], exit[objects, segments] = pair_hit, pair_entry, pair_exit
+        else:
+            hit, entry, exit = segment_intersections(self.bounds, self.x[:3])
+        crossings = {}
+        for i, object in enumerate(self.objects.keys()):
+            intervals = []
+            for j in np.flatnonzero(hit[i]):
+                interval = ((j + entry[i,j])*self.dt, (j + exit[i,j])*self.dt)
+                if intervals and interval[0] <= intervals[-1][1] + 1e-9:
+                    intervals[-1] = (intervals[-1][0], max(intervals[-1][1], interval[1]))
+                else:
+                    intervals.append(interval)
+            crossings[object] = [(float(a), float(b)) for a, b in intervals]
+        return crossings
 
     def is_inside(self, point, object):
         """
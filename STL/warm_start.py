@@ -0,0 +1,303 @@
+"""
+warm_start.py
+
+Graph-search warm start for the mixed-integer encoding.
+
+Gurobi often spends most of a solve finding the first trajectory that satisfies the specification. A rough
+trajectory is however easy to find with a discrete planner, and a mixed-integer start (the values of the
+binary variables) lets Gurobi complete it to a feasible solution by solving a single convex problem.
+The `GraphSearchWarmStart`:
+
+1. reads the tasks from the top-level conjunction of the specification: obstacles to avoid (always outside),
+   cuboids to stay inside (always inside), goals with their time windows (eventually inside, possibly with
+   a dwell time `eventually(always(inside))`), and obstacles to avoid until a goal is reached
+   (`outside.until(inside)`). The goals are visited in the order of their deadlines.
+2. voxelizes the workspace (the bounding box of the objects and x0) and plans the path to every goal
+   with A* over the 26-connected free voxels, with the obstacles that are active during that leg. A voxel is
+   free if it does not intersect the interior of any (tolerance-expanded) obstacle. Diagonal moves are only
+   allowed if they do not cut the corner of an occupied voxel.
+3. follows the path at a fraction of the maximum speed on every axis (or at the maximum speed, if a deadline is
+   missed otherwise), hovers in a goal until its window opens and for its dwell time, and derives x and u from
+   the positions with the discrete dynamics of the drone.
+4. sets the trajectory and the implied binary values (a predicate is active if it holds at the position)
+   as the start of the model (Gurobi `Start`).
+
+The start is only a suggestion: if it violates the specification (e.g. a deadline that the path misses) or
+the bounds, Gurobi discards it, and the solve is the same as without it.
+
+Classes:
+    - GraphSearchWarmStart: Plans a rough trajectory and sets it as the MIP start of a model.
+"""
+
+import time
+import heapq
+import itertools
+import numpy as np
+from stlpy.STL import LinearPredicate
+from STL.spec_parser import Cuboid, And, Always, Eventually, Until
+from STL.receding_horizon import progress
+from STL.bounds import workspace_bounds
+
+
+class GraphSearchWarmStart:
+    """
+    Plans a rough trajectory for a specification with A* on a voxel grid, and sets it as the MIP start of models
+    built by the `STLSolver`.
+
+    Parameters:
+        objects (dict): Objects of the scenario, used for the workspace.
+        resolution (float): Edge length of the voxels in meters. Default is 0.25.
+        speed_factor (float): Fraction of the maximum speed at which the path is followed, unless a deadline is
+                              missed. Default is 0.9.
+
+    Attributes:
+        x (numpy.ndarray): The planned state trajectory, shape (6, N+1), None if no path was found.
+        u (numpy.ndarray): The planned control inputs, shape (3, N+1), None if no path was found.
+        stats (dict): Planning time, number of goals, path length, number of expanded voxels, and whether the
+                      trajectory satisfies the specification and the bounds.
+
+    Methods:
+        plan(spec_ast, x0, N, dt, max_acc, max_speed):
+            Plans the trajectory and returns (x, u), or (None, None) if a goal cannot be reached.
+        apply(solver):
+            Sets the planned trajectory and the implied binary values as the start of a `MICPSolver`. Returns the
+            number of binary variables with a start value.
+    """
+    def __init__(self, objects, resolution=0.25, speed_factor=0.9):
+        self.objects = objects
+        self.resolution = resolution
+        self.speed_factor = speed_factor
+        self.x = None
+        self.u = None
+        self.stats = {}
+
+    def plan(self, spec_ast, x0, N, dt, max_acc, max_speed):
+        start_time = time.time()
+        self.x, self.u = None, None
+        goals, obstacles, region = self._tasks(spec_ast, N, x0)
+        self.stats = {'goals': len(goals), 'path_length': 0.0, 'expanded': 0, 'satisfied': False}
+
+        grid = _VoxelGrid(region[0], region[1], self.resolution)
+        always_blocked = grid.occupancy(obstacles)
+
+        # The first step follows from the initial velocity, the paths start from there
+        start = np.asarray(x0[:3] + dt*x0[3:], dtype=float)
+        paths = []
+        for i, goal in enumerate(goals):
+            # Obstacles guarded by a goal are avoided until the goal is reached
+            blocked = always_blocked | grid.occupancy([guard for later in goals[i:] for guard in later['guards']])
+            path = self._path(grid, blocked, paths[-1][-1] if paths else start, goal)
+            if path is None:
+                self.stats['time'] = time.time() - start_time
+                return None, None
+            self.stats['path_length'] += float(np.sum(np.linalg.norm(np.diff(path, axis=0), axis=1)))
+            paths.append(path)
+
+        # Follow the paths at a fraction of the maximum speed, or at the maximum speed if a deadline is missed
+        for speed_factor in (self.speed_factor, 1.0):
+            positions = [np.asarray(x0[:3], dtype=float), start]
+            for path, goal in zip(paths, goals):
+                positions += _sample(path, speed_factor*max_speed*dt)[1:]
+                # Hover in the goal until its window opens and for its dwell time
+                hover = max(goal['t1'] - (len(positions) - 1), 0) + goal['dwell']
+                positions += [positions[-1]]*hover
+
+            positions = (positions + [positions[-1]]*(N + 1 - len(positions)))[:N+1]
+            self.x, self.u = self._states(np.array(positions).T, x0, dt)
+            within_bounds = np.all(np.abs(self.x[3:]) <= max_speed + 1e-9) and np.all(np.abs(self.u) <= max_acc + 1e-9)
+            self.stats['satisfied'] = bool(within_bounds and progress(spec_ast, self.x, N+1) is True)
+            if self.stats['satisfied']:
+                break
+        self.stats['time'] = time.time() - start_time
+        return self.x, self.u
+
+    def apply(self, solver):
+        if self.x is None or solver.x.shape[1] != self.x.shape[1]:
+            return 0
+        solver.x.Start = self.x
+        solver.u.Start = self.u
+
+        y = solver.sys.C@self.x + solver.sys.D@self.u
+        predicates = {}
+        if solver.spec is not None:
+            _collect_predicates(solver.spec, 0, predicates, set())
+        started = 0
+        for key, z in solver.predicate_variables.items():
+            if key in predicates:
+                formula = predicates[key]
+                z.Start = float(formula.a.ravel()@y[:, key[1]] - float(np.ravel(formula.b)[0]) >= 0)
+                started += 1
+        for (index, t), (boxes, z) in getattr(solver, 'free_space_variables', {}).items():
+            free_space = solver.free_space[index][1]
+            inside = np.all((self.x[:3, t] >= free_space.lower[boxes] - 1e-9) &
+                            (self.x[:3, t] <= free_space.upper[boxes] + 1e-9), axis=1)
+            values = np.zeros(len(boxes))
+            if np.any(inside):
+                values[np.argmax(inside)] = 1.0
+            z.Start = values
+            started += len(boxes)
+        self.stats['start_values'] = started
+        return started
+
+    def _tasks(self, spec_ast, N, x0):
+        # Returns the goals in the order of their deadlines, the obstacles and the region of the grid
+        conjuncts = list(spec_ast.args) if isinstance(spec_ast, And) else [spec_ast]
+        lower, upper = workspace_bounds(self.objects, np.asarray(x0, dtype=float)[None, :3])
+        goals, obstacles = {}, []
+
+        def add_goal(cuboid, t1, t2, dwell=0, guards=()):
+            goal = goals.setdefault(cuboid.bounds, {'cuboid': cuboid, 't1': t1, 't2': t2, 'dwell': 0, 'guards': []})
+            goal['t1'], goal['t2'] = max(goal['t1'], t1), min(goal['t2'], t2)
+            goal['dwell'] = max(goal['dwell'], dwell)
+            goal['guards'] += list(guards)
+
+        for node in conjuncts:
+            if isinstance(node, Always) and isinstance(node.arg, Cuboid):
+                if node.arg.inside:
+                    lower = np.maximum(lower, _shrunk(node.arg)[0])
+                    upper = np.minimum(upper, _shrunk(node.arg)[1])
+                else:
+                    obstacles.append(_expanded(node.arg))
+            elif isinstance(node, Eventually) and _is_inside(node.arg):
+                add_goal(node.arg, node.t1, min(node.t2, N))
+            elif isinstance(node, Eventually) and isinstance(node.arg, Always) and _is_inside(node.arg.arg):
+                add_goal(node.arg.arg, node.t1 + node.arg.t1, min(node.t2, N), dwell=node.arg.t2 - node.arg.t1)
+            elif isinstance(node, Until) and _is_inside(node.right):
+                left = list(node.left.args) if isinstance(node.left, And) else [node.left]
+                add_goal(node.right, node.t1, min(node.t2, N),
+                         guards=[_expanded(c) for c in left if isinstance(c, Cuboid) and not c.inside])
+
+        ordered = sorted(goals.values(), key=lambda goal: (goal['t2'], goal['t1']))
+        return ordered, obstacles, (lower, upper)
+
+    def _path(self, grid, blocked, position, goal):
+        # The polyline from the position to a free voxel in the goal, or to the center of the goal if no voxel
+        # center is inside it
+        lower, upper = _shrunk(goal['cuboid'])
+        targets = np.all((grid.centers >= lower) & (grid.centers <= upper), axis=-1) & ~blocked
+        end = None
+        if not np.any(targets):
+            end = (lower + upper)/2
+            targets = np.zeros_like(blocked)
+            targets[grid.index(end)] = True
+        start = grid.index(position)
+        cells, expanded = _astar(blocked, start, targets)
+        self.stats['expanded'] += expanded
+        if cells is None:
+            return None
+        path = [position] + [grid.centers[cell] for cell in cells[1:]]
+        if end is not None:
+            path.append(end)
+        return np.array(path)
+
+    def _states(self, positions, x0, dt):
+        # Velocities and accelerations of the discrete dynamics p[t+1] = p[t] + dt*v[t], v[t+1] = v[t] + dt*u[t]
+        N = positions.shape[1] - 1
+        velocities = np.zeros_like(positions)
+        velocities[:, :N] = np.diff(positions, axis=1)/dt
+        velocities[:, 0] = x0[3:]
+        velocities[:, N] = velocities[:, N-1] if N > 0 else x0[3:]
+        u = np.zeros_like(positions)
+        u[:, :N] = np.diff(velocities, axis=1)/dt
+        return np.vstack([positions, velocities]), u
+
+
+class _VoxelGrid:
+    # A regular grid of voxels over the box [lower, upper]
+
+    def __init__(self, lower, upper, resolution):
+        self.lower = np.asarray(lower, dtype=float)
+        self.shape = tuple(np.maximum(np.ceil((np.asarray(upper) - self.lower)/resolution), 1).astype(int))
+        self.resolution = resolution
+        axes = [self.lower[i] + (np.arange(self.shape[i]) + 0.5)*resolution for i in range(3)]
+        self.centers = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+
+    def index(self, position):
+        index = np.floor((np.asarray(position) - self.lower)/self.resolution).astype(int)
+        return tuple(np.clip(index, 0, np.array(self.shape) - 1))
+
+    def occupancy(self, obstacles):
+        occupied = np.zeros(self.shape, dtype=bool)
+        half = self.resolution/2
+        for lower, upper in obstacles:
+            occupied |= np.all((self.centers - half < upper) & (self.centers + half > lower), axis=-1)
+        return occupied
+
+
+def _astar(blocked, start, targets):
+    # A* over the 26-connected free voxels from start to any target voxel. The speed bound holds per axis, so
+    # every move takes one time step: the cost is the number of moves (the Chebyshev length), with the
+    # Euclidean length as tie-breaker, and the heuristic the Chebyshev distance to the bounding box of the
+    # targets. Returns the list of voxels and the number of expanded voxels.
+    shape = blocked.shape
+    target_cells = np.argwhere(targets)
+    box_lower, box_upper = target_cells.min(axis=0).tolist(), target_cells.max(axis=0).tolist()
+    def heuristic(cell):
+        return max(max(l - c, c - u, 0) for c, l, u in zip(cell, box_lower, box_upper))
+    # No corner cutting: every voxel in the box spanned by a diagonal move must be free
+    moves = [(move, 1.0 + 1e-3*np.sqrt(sum(map(abs, move))),
+              [tuple(m*k for m, k in zip(move, corner)) for corner in itertools.product((0, 1), repeat=3)
+               if 0 < sum(corner[i]*abs(move[i]) for i in range(3)) < sum(map(abs, move))])
+             for move in itertools.product((-1, 0, 1), repeat=3) if any(move)]
+    blocked, targets = blocked.tolist(), targets.tolist()
+    free = lambda cell: (0 <= cell[0] < shape[0] and 0 <= cell[1] < shape[1] and 0 <= cell[2] < shape[2]
+                         and not blocked[cell[0]][cell[1]][cell[2]])
+
+    costs = {start: 0.0}
+    parents = {start: None}
+    queue = [(heuristic(start), 0.0, start)]
+    expanded = 0
+    while queue:
+        _, cost, cell = heapq.heappop(queue)
+        if cost > costs[cell]:
+            continue
+        expanded += 1
+        if targets[cell[0]][cell[1]][cell[2]]:
+            path = []
+            while cell is not None:
+                path.append(cell)
+                cell = parents[cell]
+            return path[::-1], expanded
+        for move, move_cost, corners in moves:
+            neighbour = (cell[0] + move[0], cell[1] + move[1], cell[2] + move[2])
+            if not free(neighbour) or not all(free((cell[0] + c[0], cell[1] + c[1], cell[2] + c[2])) for c in corners):
+                continue
+            new_cost = cost + move_cost
+            if new_cost < costs.get(neighbour, np.inf):
+                costs[neighbour] = new_cost
+                parents[neighbour] = cell
+                heapq.heappush(queue, (new_cost + heuristic(neighbour), new_cost, neighbour))
+    return None, expanded
+
+
+def _sample(path, step):
+    # Positions along the polyline, at most step apart on every axis, ending at its last point
+    lengths = np.abs(np.diff(path, axis=0)).max(axis=1)
+    distances = np.concatenate([[0.0], np.cumsum(lengths)])
+    count = int(np.ceil(distances[-1]/step)) if distances[-1] > 0 else 0
+    samples = np.minimum(np.arange(count + 1)*step, distances[-1])
+    return [np.array([np.interp(s, distances, path[:, i]) for i in range(3)]) for s in samples]
+
+
+def _collect_predicates(formula, t, predicates, visited):
+    # Maps (id(predicate), t) to the predicates of a compiled formula, as encoded by the `MICPSolver`
+    if (id(formula), t) in visited:
+        return
+    visited.add((id(formula), t))
+    if isinstance(formula, LinearPredicate):
+        predicates[(id(formula), t)] = formula
+        return
+    for i, subformula in enumerate(formula.subformula_list):
+        _collect_predicates(subformula, t + formula.timesteps[i], predicates, visited)
+
+
+def _is_inside(node):
+    return isinstance(node, Cuboid) and node.inside
+
+
+def _shrunk(cuboid):
+    return np.array(cuboid.bounds[0::2]) + cuboid.tolerance, np.array(cuboid.bounds[1::2]) - cuboid.tolerance
+
+
+def _expanded(cuboid):
+    return np.array(cuboid.bounds[0::2]) - cuboid.tolerance, np.array(cuboid.bounds[1::2]) + cuboid.tolerance
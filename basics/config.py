@@ -26,6 +26,11 @@ class Default_parameters:
         self.syntax_checker_enabled = False          # Enable syntax check for the trajectory
         self.spec_checker_enabled = False            # Enable specification check
         self.dynamicless_check_enabled = False       # Enable dynamicless specification check
+        self.reachability_check_enabled = True       # Reject kinematically infeasible specifications before solving
+        self.segment_collision_check_enabled = True  # Also check the segments between time steps for collisions
+        self.robustness_check_enabled = True         # Reject trajectories that violate the specification (no LLM)
+        self.robustness_tolerance = 1e-6             # Negative robustness accepted as numerical error of the solver
+        self.online_monitor_enabled = True           # Monitor the specifications of the accepted segments online
         self.manual_spec_check_enabled = True        # Enable manual specification check
         self.manual_trajectory_check_enabled = True  # Enable manual trajectory check
 
@@ -33,6 +38,7 @@ class Default_parameters:
         self.animate_final_trajectory = True         # Animate the final trajectory
         self.save_animation = False                  # Save the final trajectory animation
         self.show_map = False                        # Show a map of the scenario at the start of the program
+        self.scene_near_margin = None                # Only draw the objects within this distance of the trajectory (None for all)
 
         # Logging flags
         self.solver_verbose = False                  # Enable solver verbose
@@ -41,6 +47,7 @@ class Default_parameters:
         # Loop iteration limits
         self.syntax_check_limit = 5                  # Maximum number of syntax check iterations
         self.spec_check_limit = 5                    # Maximum number of specification check iterations
+        self.reachability_check_limit = 5            # Maximum number of specifications rejected as infeasible
 
         self.instructions_file = 'ChatGPT_instructions.txt'
         
@@ -54,6 +61,35 @@ class Default_parameters:
 
         self.STL_included = True                     # Include STL in the system
 
+        # Solve cache
+        self.solve_cache_enabled = True              # Reuse trajectories of previously solved specifications
+        self.solve_cache_size = 128                  # Maximum number of trajectories kept in memory
+        self.solve_cache_dir = None                  # On-disk solve cache, e.g. "STL/solve_cache/" (None for memory only)
+
+        # Solver backend
+        self.solver_backend = "gurobi"               # "gurobi", "highs" (open-source MILP) or "gradient" (approximate)
+        self.solver_objective = "quadratic"          # "quadratic" (MIQP), "l1" or "linf" (MILP) effort, or "feasibility"
+        self.tight_bounds_enabled = True             # Derive position bounds and big-M constants from the scenario
+        self.spec_simplification_enabled = True      # Remove redundant parts of the specification before encoding
+        self.obstacle_pruning_enabled = False        # Add avoidance constraints lazily, within the reachable tube
+        self.free_space_encoding_enabled = False     # Encode avoidance with boxes of free space (not with a session)
+        self.graph_warm_start_enabled = False        # Start Gurobi from an A* path on a voxel grid
+        self.planning_session_enabled = False        # Reuse the Gurobi model between feedback iterations
+        self.solver_time_limit = None                # Time limit of a solve in seconds (None for no limit)
+        self.solver_mip_gap = None                   # Relative MIP gap at which a solve stops (None for the default)
+        self.solver_feasible_first = False           # Return the first trajectory that satisfies the specification
+
+        # Planning mode
+        self.planning_mode = "monolithic"            # "monolithic", "receding_horizon", "coarse_to_fine" or "min_horizon"
+        self.receding_horizon_window = 30            # Time steps per receding-horizon window
+        self.receding_horizon_step = 10              # Time steps committed after every receding-horizon window
+        self.coarse_to_fine_factor = 4               # Ratio between the coarse and the target time step
+
+        # Portfolio of candidate specifications
+        self.portfolio_size = 1                      # Candidate specifications solved in parallel (1 disables the portfolio)
+        self.portfolio_first = True                  # Stop at the first candidate that passes (False: rank all by cost)
+        self.portfolio_threads_per_solve = None      # Gurobi threads per candidate (None divides the CPUs)
+
 
 class One_shot_parameters:
     def __init__(self, scenario_name="reach_avoid"):
@@ -68,6 +104,11 @@ class One_shot_parameters:
         self.syntax_checker_enabled = True           # Enable syntax check for the trajectory
         self.spec_checker_enabled = True             # Enable specification check
         self.dynamicless_check_enabled = False       # Enable dynamicless specification check
+        self.reachability_check_enabled = True       # Reject kinematically infeasible specifications before solving
+        self.segment_collision_check_enabled = True  # Also check the segments between time steps for collisions
+        self.robustness_check_enabled = True         # Reject trajectories that violate the specification (no LLM)
+        self.robustness_tolerance = 1e-6             # Negative robustness accepted as numerical error of the solver
+        self.online_monitor_enabled = True           # Monitor the specifications of the accepted segments online
         self.manual_spec_check_enabled = False       # Enable manual specification check
         self.manual_trajectory_check_enabled = False # Enable manual trajectory check
 
@@ -75,6 +116,7 @@ class One_shot_parameters:
         self.animate_final_trajectory = False        # Animate the final trajectory
         self.save_animation = False                  # Save the final trajectory animation
         self.show_map = False                        # Show a map of the scenario at the start of the program
+        self.scene_near_margin = None                # Only draw the objects within this distance of the trajectory (None for all)
 
         # Logging flags
         self.solver_verbose = False                  # Enable solver verbose
@@ -83,6 +125,7 @@ class One_shot_parameters:
         # Loop iteration limits
         self.syntax_check_limit = 5                  # Maximum number of syntax check iterations
         self.spec_check_limit = 5                    # Maximum number of specification check iterations
+        self.reachability_check_limit = 5            # Maximum number of specifications rejected as infeasible
 
         self.instructions_file = 'one_shot_ChatGPT_instructions.txt'
         
@@ -94,4 +137,33 @@ class One_shot_parameters:
         self.automated_user = True                   # Automated user flag
         self.automated_user_input = ""               # Initialisation of the automated user input
 
-        self.STL_included = True                     # Include STL in the system
\ No newline at end of file
+        self.STL_included = True                     # Include STL in the system
+
+        # Solve cache
+        self.solve_cache_enabled = True              # Reuse trajectories of previously solved specifications
+        self.solve_cache_size = 128                  # Maximum number of trajectories kept in memory
+        self.solve_cache_dir = None                  # On-disk solve cache, e.g. "STL/solve_cache/" (None for memory only)
+
+        # Solver backend
+        self.solver_backend = "gurobi"               # "gurobi", "highs" (open-source MILP) or "gradient" (approximate)
+        self.solver_objective = "quadratic"          # "quadratic" (MIQP), "l1" or "linf" (MILP) effort, or "feasibility"
+        self.tight_bounds_enabled = True             # Derive position bounds and big-M constants from the scenario
+        self.spec_simplification_enabled = True      # Remove redundant parts of the specification before encoding
+        self.obstacle_pruning_enabled = False        # Add avoidance constraints lazily, within the reachable tube
+        self.free_space_encoding_enabled = False     # Encode avoidance with boxes of free space (not with a session)
+        self.graph_warm_start_enabled = False        # Start Gurobi from an A* path on a voxel grid
+        self.planning_session_enabled = False        # Reuse the Gurobi model between feedback iterations
+        self.solver_time_limit = None                # Time limit of a solve in seconds (None for no limit)
+        self.solver_mip_gap = None                   # Relative MIP gap at which a solve stops (None for the default)
+        self.solver_feasible_first = False           # Return the first trajectory that satisfies the specification
+
+        # Planning mode
+        self.planning_mode = "monolithic"            # "monolithic", "receding_horizon", "coarse_to_fine" or "min_horizon"
+        self.receding_horizon_window = 30            # Time steps per receding-horizon window
+        self.receding_horizon_step = 10              # Time steps committed after every receding-horizon window
+        self.coarse_to_fine_factor = 4               # Ratio between the coarse and the target time step
+
+        # Portfolio of candidate specifications
+        self.portfolio_size = 1                      # Candidate specifications solved in parallel (1 disables the portfolio)
+        self.portfolio_first = True                  # Stop at the first candidate that passes (False: rank all by cost)
+        self.portfolio_threads_per_solve = None      # Gurobi threads per candidate (None divides the CPUs)
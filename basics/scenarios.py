@@ -1,5 +1,6 @@
 import numpy as np
 from PIL import Image
+from .spatial_index import SpatialIndex
 
 class Scenarios:
     """
@@ -12,6 +13,7 @@ class Scenarios:
         x0 (np.ndarray)             :   Initial state of the agent (position and velocity).
         T_initial (int)             :   Time horizon for the scenario.
         automated_user_input (str)  :   Predefined textual task for automated systems.
+        spatial_index (SpatialIndex):   Spatial index over the objects, built on first use.
     """
     def __init__(self, scenario_name):
         """
@@ -25,6 +27,19 @@ class Scenarios:
         self.x0 = self.get_starting_state()
         self.T_initial = self.get_time_horizon()
         self.automated_user_input = self.get_automated_user_input()
+        self._spatial_index = None
+
+    @property
+    def spatial_index(self):
+        """
+        The spatial index over the objects of the scenario, built once on first use.
+
+        Returns:
+            SpatialIndex: Index for queries of the objects near a point, box or segment.
+        """
+        if self._spatial_index is None:
+            self._spatial_index = SpatialIndex(self.objects)
+        return self._spatial_index
 
     def get_starting_state(self):
         """
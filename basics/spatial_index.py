@@ -0,0 +1,219 @@
+"""
+spatial_index.py
+
+A spatial index over the cuboid objects of a scenario, for maps with many objects.
+
+The objects are inserted into the cells of a uniform grid over their bounding box. A query for the objects
+near a point, a box or a segment only visits the cells that the query overlaps and tests the objects in those
+cells exactly, instead of scanning every object. Objects that cover many cells (e.g. the room bounds) are kept
+in a separate list that every query tests, so they do not fill the grid.
+
+The index is built once per scenario (see `Scenarios.spatial_index`) and shared by the trajectory analyzer,
+the obstacle pruning of the `STLSolver` and the visualizer.
+
+Classes:
+    - SpatialIndex: Uniform grid over the bounds of a set of cuboids.
+
+Functions:
+    - segment_box_intervals(lower, upper, start, delta): Slab test of segments against boxes.
+"""
+
+import numpy as np
+
+
+def segment_box_intervals(lower, upper, start, delta):
+    """
+    Intersects segments start + s*delta, s in [0, 1], with boxes (boundaries included) using the slab method: on
+    each axis the segment is inside the slab of the box for an interval of s, and it intersects the box where the
+    intervals of the three axes overlap.
+
+    Parameters:
+        lower, upper (numpy.ndarray): Box bounds, of shape (3, ...).
+        start, delta (numpy.ndarray): Segment starts and directions, of shape (3, ...).
+        The trailing dimensions of all four are broadcast against each other.
+
+    Returns:
+        tuple: (hit, entry, exit), boolean and float arrays of the broadcast shape. entry and exit are the values of
+               s at which the segment enters and leaves the box (nan where there is no hit).
+    """
+    entry, exit = None, None
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for axis in range(3):
+            # Parameters at which the segment crosses the two faces of the slab, ordered by the direction
+            s_lower = (lower[axis] - start[axis])/delta[axis]
+            s_upper = (upper[axis] - start[axis])/delta[axis]
+            near, far = np.minimum(s_lower, s_upper), np.maximum(s_lower, s_upper)
+            # A segment parallel to the slab is inside it everywhere or nowhere
+            parallel = delta[axis] == 0
+            inside = (lower[axis] <= start[axis]) & (start[axis] <= upper[axis])
+            near = np.where(parallel, np.where(inside, -np.inf, np.inf), near)
+            far = np.where(parallel, np.where(inside, np.inf, -np.inf), far)
+            entry = np.maximum(0.0, near) if entry is None else np.maximum(entry, near)
+            exit = np.minimum(1.0, far) if exit is None else np.minimum(exit, far)
+    hit = entry <= exit
+    entry = np.where(hit, entry, np.nan)
+    exit = np.where(hit, exit, np.nan)
+    return hit, entry, exit
+
+
+class SpatialIndex:
+    """
+    A uniform grid over the bounds of a set of cuboids, for queries of the cuboids near a point, box or segment.
+
+    Parameters:
+        objects (dict): Object names as keys and bounds (xmin, xmax, ymin, ymax, zmin, zmax) as values.
+        cell_size (float): Edge length of the cubic grid cells. Default is None, which uses the median object
+                           size (at least 1/64 of the extent of all objects).
+        max_cells (int): Objects that cover more cells are tested by every query instead of being inserted
+                         into the grid. Default is 64.
+
+    Attributes:
+        names (list): The object names, in the order of the dictionary.
+        bounds (numpy.ndarray): The object bounds, shape (n_obj, 6).
+        large (numpy.ndarray): Indices of the objects that are not inserted into the grid.
+        stats (dict): The number of objects, of non-empty cells and of large objects, and the cell size.
+
+    Methods:
+        candidates(lower, upper):
+            Returns the indices of the objects in the cells that overlap a box (a superset of the objects that
+            intersect it).
+        query_point(point, margin=0.0):
+            Returns the names of the objects that contain a point, or are within margin of it (per axis).
+        query_box(lower, upper):
+            Returns the names of the objects that intersect a box.
+        query_segment(start, end, margin=0.0):
+            Returns the names of the objects that a segment passes through, or passes within margin of.
+        occupancy(positions):
+            Returns the boolean (n_obj, T) array of the objects that contain each position (see `occupancy` in
+            `trajectory_analysis.py`).
+        segment_pairs(positions):
+            Returns the candidate (object, segment) pairs of the segments between consecutive positions.
+        find(bounds):
+            Returns the index of the object with the given bounds, or None.
+    """
+    def __init__(self, objects, cell_size=None, max_cells=64):
+        self.names = list(objects.keys())
+        self.bounds = np.array(list(objects.values()), dtype=float).reshape(-1, 6)
+        self.lower, self.upper = self.bounds[:, 0::2], self.bounds[:, 1::2]
+        self.by_bounds = {tuple(b): i for i, b in reversed(list(enumerate(self.bounds.tolist())))}
+        self.cells = {}
+
+        if not self.names:
+            self.origin, self.cell_size, self.shape = np.zeros(3), 1.0, np.ones(3, dtype=int)
+            self.large = np.zeros(0, dtype=int)
+            self.stats = {'objects': 0, 'cells': 0, 'large': 0, 'cell_size': 1.0}
+            return
+
+        self.origin = self.lower.min(axis=0)
+        extent = self.upper.max(axis=0) - self.origin
+        if cell_size is None:
+            cell_size = max(float(np.median(self.upper - self.lower)), float(extent.max())/64, 1e-9)
+        self.cell_size = float(cell_size)
+        self.shape = np.maximum(np.ceil(extent/self.cell_size).astype(int), 1)
+
+        large = []
+        cells = {}
+        for i in range(len(self.names)):
+            first, last = self._cell_range(self.lower[i], self.upper[i])
+            if np.prod(last - first + 1) > max_cells:
+                large.append(i)
+                continue
+            for cell in self._cell_ids(first, last):
+                cells.setdefault(cell, []).append(i)
+        self.cells = {cell: np.array(indices) for cell, indices in cells.items()}
+        self.large = np.array(large, dtype=int)
+        self.stats = {'objects': len(self.names), 'cells': len(self.cells), 'large': len(large),
+                      'cell_size': self.cell_size}
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, lower, upper):
+        lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+        if not self.names or np.any(upper < self.origin) or np.any(lower > self.origin + self.shape*self.cell_size):
+            return np.zeros(0, dtype=int)
+        first, last = self._cell_range(lower, upper)
+        if np.prod(last - first + 1) > len(self.names):
+            # A query that covers more cells than there are objects is cheaper as a (vectorized) scan of the objects
+            return np.flatnonzero(np.all((self.lower <= upper) & (lower <= self.upper), axis=1))
+        found = [self.cells[cell] for cell in self._cell_ids(first, last) if cell in self.cells]
+        return np.unique(np.concatenate(found + [self.large])).astype(int)
+
+    def query_point(self, point, margin=0.0):
+        point = np.asarray(point, dtype=float)[:3]
+        indices = self.candidates(point - margin, point + margin)
+        inside = np.all((self.lower[indices] - margin <= point) & (point <= self.upper[indices] + margin), axis=1)
+        return [self.names[i] for i in indices[inside]]
+
+    def query_box(self, lower, upper):
+        lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+        indices = self.candidates(lower, upper)
+        overlap = np.all((self.lower[indices] <= upper) & (lower <= self.upper[indices]), axis=1)
+        return [self.names[i] for i in indices[overlap]]
+
+    def query_segment(self, start, end, margin=0.0):
+        start, end = np.asarray(start, dtype=float)[:3], np.asarray(end, dtype=float)[:3]
+        indices = self.candidates(np.minimum(start, end) - margin, np.maximum(start, end) + margin)
+        hit, _, _ = segment_box_intervals((self.lower[indices] - margin).T, (self.upper[indices] + margin).T,
+                                          start[:, None], (end - start)[:, None])
+        return [self.names[i] for i in indices[hit]]
+
+    def occupancy(self, positions):
+        positions = np.asarray(positions, dtype=float)[:3]
+        inside = np.zeros((len(self.names), positions.shape[1]), dtype=bool)
+        if not self.names:
+            return inside
+
+        # Group the positions by cell, and test each group against the objects of its cell
+        # Positions outside the grid are outside every object
+        in_grid = np.all((positions >= self.origin[:, None])
+                         & (positions <= (self.origin + self.shape*self.cell_size)[:, None]), axis=0)
+        steps = np.flatnonzero(in_grid)
+        cells = np.clip(np.floor((positions[:, steps] - self.origin[:, None])/self.cell_size).astype(int),
+                        0, self.shape[:, None] - 1)
+        flat = np.ravel_multi_index(cells, self.shape)
+        objects, times = [], []
+        for cell in np.unique(flat):
+            group = steps[flat == cell]
+            indices = self.cells.get(int(cell), np.zeros(0, dtype=int))
+            objects.append(np.repeat(indices, len(group)))
+            times.append(np.tile(group, len(indices)))
+        if len(self.large):
+            objects.append(np.repeat(self.large, positions.shape[1]))
+            times.append(np.tile(np.arange(positions.shape[1]), len(self.large)))
+        objects, times = np.concatenate(objects).astype(int), np.concatenate(times).astype(int)
+        contained = np.all((self.lower[objects].T <= positions[:, times]) & (positions[:, times] <= self.upper[objects].T),
+                           axis=0)
+        inside[objects[contained], times[contained]] = True
+        return inside
+
+    def segment_pairs(self, positions):
+        """
+        Returns (objects, segments), the indices of the candidate pairs of objects and segments j (from position j
+        to j+1): the objects in the cells that overlap the bounding box of the segment.
+        """
+        positions = np.asarray(positions, dtype=float)[:3]
+        lower = np.minimum(positions[:, :-1], positions[:, 1:])
+        upper = np.maximum(positions[:, :-1], positions[:, 1:])
+        objects, segments = [], []
+        for j in range(lower.shape[1]):
+            indices = self.candidates(lower[:, j], upper[:, j])
+            objects.append(indices)
+            segments.append(np.full(len(indices), j))
+        if not objects:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        return np.concatenate(objects).astype(int), np.concatenate(segments).astype(int)
+
+    def find(self, bounds):
+        return self.by_bounds.get(tuple(float(v) for v in bounds))
+
+    def _cell_range(self, lower, upper):
+        # First and last cell (per axis) of a box, clipped to the grid
+        first = np.clip(np.floor((lower - self.origin)/self.cell_size).astype(int), 0, self.shape - 1)
+        last = np.clip(np.floor((upper - self.origin)/self.cell_size).astype(int), 0, self.shape - 1)
+        return first, last
+
+    def _cell_ids(self, first, last):
+        ranges = [np.arange(first[i], last[i] + 1) for i in range(3)]
+        grid = np.stack(np.meshgrid(*ranges, indexing='ij')).reshape(3, -1)
+        return np.ravel_multi_index(grid, self.shape).tolist()
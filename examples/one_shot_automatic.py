@@ -15,13 +15,14 @@ from experiments.save_results import save_results           # Import the save_re
 
 scenario_name = "treasure_hunt"                             # "reach_avoid", or "treasure_hunt"
 pars = One_shot_parameters(scenario_name = scenario_name)   # Get the parameters
+solver_telemetry = []                                       # Statistics of every solve
 
 try:
-    messages, task_accomplished, waypoints = main(pars)     # Run the main program
+    messages, task_accomplished, waypoints = main(pars, solver_telemetry) # Run the main program
 except Exception as e:
     print(e)
     task_accomplished = False
     messages = []
 
 if pars.save_results:
-        save_results(pars, messages, task_accomplished, waypoints) # Save the results
\ No newline at end of file
+        save_results(pars, messages, task_accomplished, waypoints, solver_telemetry) # Save the results
\ No newline at end of file
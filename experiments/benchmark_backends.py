@@ -0,0 +1,32 @@
+"""
+benchmark_backends.py
+
+Compares the optimization backends of the `STLSolver` (see `STL/backends.py`) on the benchmark
+specifications of both built-in scenarios.
+
+For every backend the table reports the build time, the solve time, the control effort sum(u^2) and
+the robustness of the trajectory, so the fastest backend that still finds a trajectory can be picked per
+scenario. Backends that are not available (e.g. no Gurobi license for the model size) are reported as failed.
+
+Usage:
+    python -m experiments.benchmark_backends
+"""
+
+import numpy as np
+
+from STL.STL_to_path import STLSolver
+from STL.spec_parser import SpecCompiler
+from experiments.benchmark_specs import get_benchmark_problem, timed_solve
+
+BACKENDS = ["gurobi", "highs", "gradient"]
+
+if __name__ == "__main__":
+    print(f"{'scenario':<15}{'backend':<10}{'build [s]':>11}{'solve [s]':>11}{'effort':>10}{'robustness':>12}")
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        scenario, spec, N = get_benchmark_problem(scenario_name)
+        for backend in BACKENDS:
+            solver = STLSolver(spec, scenario.objects, scenario.x0, scenario.T_initial, backend=backend)
+            spec_formula = SpecCompiler().compile(solver.get_spec_ast())
+            _, effort, robustness = timed_solve(solver.generate_trajectory, spec_formula)
+            build_time, solve_time = solver.backend.mean_times()
+            print(f"{scenario_name:<15}{backend:<10}{build_time:>11.2f}{solve_time:>11.2f}{effort:>10.3f}{robustness:>12.3f}")
@@ -0,0 +1,51 @@
+"""
+benchmark_batch.py
+
+Compares solving the reach-avoid benchmark specification from perturbed initial states with a new
+`STLSolver` per start against `STLSolver.generate_trajectory_batch` (see `STL/batch.py`), in one
+process and split over worker processes.
+
+For every setting the table reports the total wall-clock time, the total build and solve time and the
+number of starts with a trajectory.
+
+Usage:
+    python -m experiments.benchmark_batch [backend] [starts] [dt]
+"""
+
+import sys
+import time
+import numpy as np
+
+from STL.STL_to_path import STLSolver
+from basics.config import Default_parameters
+from experiments.benchmark_specs import get_benchmark_problem
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "gurobi"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    dt = float(sys.argv[3]) if len(sys.argv) > 3 else Default_parameters().dt
+    pars = Default_parameters()
+
+    scenario, spec, N = get_benchmark_problem("reach_avoid", dt)
+    x0s = np.tile(scenario.x0, (count, 1))
+    x0s[:, :3] += np.random.default_rng(0).uniform(-0.5, 0.5, (count, 3)) # perturbed initial positions
+
+    print(f"{'method':<16}{'wall [s]':>10}{'build [s]':>11}{'solve [s]':>11}{'feasible':>10}")
+
+    start_time = time.time()
+    build_time, solve_time, feasible = 0.0, 0.0, 0
+    for x0 in x0s:
+        solver = STLSolver(spec, scenario.objects, x0, scenario.T_initial, backend=backend)
+        x, _ = solver.generate_trajectory(dt, pars.max_acc, pars.max_speed)
+        build_time += solver.backend.timings[-1]['build_time']
+        solve_time += solver.backend.timings[-1]['solve_time']
+        feasible += x is not None
+    print(f"{'separate':<16}{time.time() - start_time:>10.2f}{build_time:>11.2f}{solve_time:>11.2f}{feasible:>10}")
+
+    for workers in [1, None]:
+        start_time = time.time()
+        solver = STLSolver(spec, scenario.objects, scenario.x0, scenario.T_initial, backend=backend)
+        batch = solver.generate_trajectory_batch(x0s, dt, pars.max_acc, pars.max_speed, workers=workers)
+        label = "batch" if workers == 1 else "batch parallel"
+        print(f"{label:<16}{time.time() - start_time:>10.2f}{sum(batch.build_times):>11.2f}"
+              f"{np.nansum(batch.solve_time):>11.2f}{batch.feasible.sum():>10}")
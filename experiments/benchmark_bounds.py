@@ -0,0 +1,42 @@
+"""
+benchmark_bounds.py
+
+Compares the MICP without position bounds (constant big-M) with the tight position bounds and big-M
+constants derived from the scenario geometry (see `STL/bounds.py`), on the benchmark specifications of both
+built-in scenarios.
+
+For both settings the table reports the number of branch-and-bound nodes, the solve time, the control
+effort and the robustness of the trajectory.
+
+Usage:
+    python -m experiments.benchmark_bounds [backend] [dt]
+
+The backend is "gurobi" (default, requires a license that allows models of the size of the scenarios)
+or "highs". A larger dt gives smaller models.
+"""
+
+import sys
+import numpy as np
+
+from STL.STL_to_path import STLSolver
+from STL.spec_parser import SpecCompiler
+from basics.config import Default_parameters
+from experiments.benchmark_specs import get_benchmark_problem, timed_solve
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "gurobi"
+    dt = float(sys.argv[2]) if len(sys.argv) > 2 else Default_parameters().dt
+
+    print(f"{'scenario':<15}{'bounds':<8}{'nodes':>9}{'solve [s]':>11}{'effort':>10}{'robustness':>12}")
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        scenario, spec, N = get_benchmark_problem(scenario_name, dt)
+        for tight_bounds in [False, True]:
+            solver = STLSolver(spec, scenario.objects, scenario.x0, scenario.T_initial,
+                               backend=backend, tight_bounds=tight_bounds)
+            spec_formula = SpecCompiler().compile(solver.get_spec_ast())
+
+            _, effort, robustness = timed_solve(solver.generate_trajectory, spec_formula, dt=dt)
+            timing = solver.backend.timings[-1] if solver.backend.timings else {}
+            label = "tight" if tight_bounds else "none"
+            print(f"{scenario_name:<15}{label:<8}{timing.get('nodes', np.nan):>9}"
+                  f"{timing.get('solve_time', np.nan):>11.2f}{effort:>10.3f}{robustness:>12.3f}")
@@ -0,0 +1,41 @@
+"""
+benchmark_coarse_to_fine.py
+
+Compares the monolithic solve of `STLSolver.generate_trajectory` with the coarse-to-fine mode
+`STLSolver.generate_trajectory_coarse_to_fine` for several coarsening factors, with the coarse binaries
+fixed or only used as hints, on the benchmark specifications of both built-in scenarios.
+
+For every configuration the table reports the total wall-clock time, the time of the coarse solve,
+the number of fixed binaries, the control effort sum(u^2) and the robustness of the final trajectory.
+
+Requires a Gurobi license that allows models of the size of the scenarios.
+
+Usage:
+    python -m experiments.benchmark_coarse_to_fine
+"""
+
+import numpy as np
+
+from STL.STL_to_path import STLSolver
+from STL.spec_parser import SpecCompiler
+from experiments.benchmark_specs import get_benchmark_problem, timed_solve
+
+CONFIGURATIONS = [(2, True), (4, True), (4, False), (8, True)] # (factor, fix_binaries) pairs
+
+if __name__ == "__main__":
+    print(f"{'scenario':<15}{'mode':<22}{'time [s]':>10}{'coarse [s]':>12}{'fixed':>8}{'effort':>10}{'robustness':>12}")
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        scenario, spec, N = get_benchmark_problem(scenario_name)
+        solver = STLSolver(spec, scenario.objects, scenario.x0, scenario.T_initial)
+        spec_formula = SpecCompiler().compile(solver.get_spec_ast())
+
+        solve_time, effort, robustness = timed_solve(solver.generate_trajectory, spec_formula)
+        print(f"{scenario_name:<15}{'monolithic':<22}{solve_time:>10.2f}{'-':>12}{'-':>8}{effort:>10.3f}{robustness:>12.3f}")
+
+        for factor, fix_binaries in CONFIGURATIONS:
+            solve_time, effort, robustness = timed_solve(solver.generate_trajectory_coarse_to_fine, spec_formula,
+                                                         factor=factor, fix_binaries=fix_binaries)
+            stats = solver.coarse_to_fine.stats
+            mode = f"x{factor} ({'fixed' if fix_binaries else 'hints'})"
+            print(f"{scenario_name:<15}{mode:<22}{solve_time:>10.2f}{stats.get('coarse_time', np.nan):>12.2f}"
+                  f"{stats.get('fixed', 0):>8}{effort:>10.3f}{robustness:>12.3f}")
@@ -0,0 +1,78 @@
+"""
+benchmark_encoding.py
+
+Compares the size of the mixed-integer program of the benchmark specifications when encoded with
+`stlpy`'s `GurobiMICPSolver` on freshly built formulas (the original pipeline, which evaluated the
+specification string) and with the `MICPSolver` on interned formulas compiled from the spec AST.
+
+The models are only built, not solved, so the benchmark runs without a full Gurobi license.
+
+Usage:
+    python -m experiments.benchmark_encoding
+"""
+
+import numpy as np
+from stlpy.STL import LinearPredicate
+from stlpy.solvers import GurobiMICPSolver
+
+from STL.STL_to_path import drone_dynamics
+from STL.micp_solver import MICPSolver
+from STL.spec_parser import Cuboid, And, Or, Always, Eventually, Until, SpecCompiler, parse_spec
+from experiments.benchmark_specs import get_benchmark_problem
+
+class LegacyCompiler(SpecCompiler):
+    """
+    Builds every cuboid formula from fresh predicates, like the original STL_formulas.
+    """
+    def compile(self, node):
+        if not isinstance(node, Cuboid):
+            return self._compile(node)
+
+        lower = [node.bounds[0], node.bounds[2], node.bounds[4]]
+        upper = [node.bounds[1], node.bounds[3], node.bounds[5]]
+        formula = None
+        for axis in range(3):
+            a = np.zeros((1,6)); a[:,axis] = 1
+            if node.inside:
+                sides = [LinearPredicate(a, lower[axis] + node.tolerance), LinearPredicate(-a, -upper[axis] + node.tolerance)]
+            else:
+                sides = [LinearPredicate(a, upper[axis] + node.tolerance), LinearPredicate(-a, -lower[axis] + node.tolerance)]
+            for side in sides:
+                if formula is None:
+                    formula = side
+                else:
+                    formula = formula & side if node.inside else formula | side
+        return formula
+
+    def _compile(self, node):
+        # Compile children with this (non-memoizing) compiler as well
+        if isinstance(node, (And, Or)):
+            formulas = [self.compile(arg) for arg in node.args]
+            formula = formulas[0]
+            for other in formulas[1:]:
+                formula = formula & other if isinstance(node, And) else formula | other
+            return formula
+        if isinstance(node, Always):
+            return self.compile(node.arg).always(node.t1, node.t2)
+        if isinstance(node, Eventually):
+            return self.compile(node.arg).eventually(node.t1, node.t2)
+        if isinstance(node, Until):
+            return self.compile(node.left).until(self.compile(node.right), node.t1, node.t2)
+
+def model_size(solver):
+    solver.model.update()
+    return solver.model.NumBinVars, solver.model.NumVars, solver.model.NumConstrs
+
+if __name__ == "__main__":
+    print(f"{'scenario':<15}{'encoding':<12}{'binaries':>10}{'variables':>11}{'constraints':>13}")
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        scenario, spec, N = get_benchmark_problem(scenario_name)
+        spec_ast = parse_spec(spec, scenario.objects)
+        sys = drone_dynamics(dt=0.7).getSystem()
+
+        legacy = GurobiMICPSolver(LegacyCompiler().compile(spec_ast), sys, scenario.x0, N, verbose=False)
+        shared = MICPSolver(SpecCompiler().compile(spec_ast), sys, scenario.x0, N, verbose=False)
+
+        for name, solver in [("original", legacy), ("shared", shared)]:
+            binaries, variables, constraints = model_size(solver)
+            print(f"{scenario_name:<15}{name:<12}{binaries:>10}{variables:>11}{constraints:>13}")
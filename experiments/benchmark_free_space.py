@@ -0,0 +1,50 @@
+"""
+benchmark_free_space.py
+
+Compares the disjunctive encoding of obstacle avoidance (six half-spaces per obstacle and time step) with the
+encoding on a decomposition of the free space into boxes (one binary per box and time step, see
+`STL/free_space.py`), on the treasure hunt scenario and on generated cluttered scenes.
+
+For both encodings the table reports the number of binary variables, the build and solve time, the control
+effort and the robustness of the trajectory for the full specification.
+
+Usage:
+    python -m experiments.benchmark_free_space [backend] [dt] [obstacles ...]
+
+The backend is "gurobi" (default, requires a license that allows models of the size of the scenarios)
+or "highs". A larger dt gives smaller models. The obstacle counts of the cluttered scenes default to 10 and 20.
+"""
+
+import sys
+import numpy as np
+
+from STL.STL_to_path import STLSolver
+from STL.spec_parser import SpecCompiler
+from basics.config import Default_parameters
+from experiments.benchmark_specs import get_benchmark_problem, get_cluttered_problem, timed_solve
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "gurobi"
+    dt = float(sys.argv[2]) if len(sys.argv) > 2 else Default_parameters().dt
+    counts = [int(count) for count in sys.argv[3:]] or [10, 20]
+
+    scenario, spec, N = get_benchmark_problem("treasure_hunt", dt)
+    problems = [("treasure_hunt", scenario.objects, scenario.x0, scenario.T_initial, spec)]
+    for count in counts:
+        objects, x0, T, spec, N = get_cluttered_problem(count, dt=dt)
+        problems.append((f"cluttered_{count}", objects, x0, T, spec))
+
+    print(f"{'scene':<16}{'encoding':<12}{'boxes':>7}{'binaries':>10}{'build [s]':>11}{'solve [s]':>11}"
+          f"{'effort':>10}{'robustness':>12}")
+    for name, objects, x0, T, spec in problems:
+        for free_space in [False, True]:
+            solver = STLSolver(spec, objects, x0, T, backend=backend, free_space=free_space)
+            spec_formula = SpecCompiler().compile(solver.get_spec_ast())
+
+            _, effort, robustness = timed_solve(solver.generate_trajectory, spec_formula, dt=dt)
+            result = solver.result
+            boxes = sum(len(decomposition) for decomposition in solver.decompositions.values())
+            label = "free space" if free_space else "disjunctive"
+            binaries = result.binaries if result is not None and result.binaries is not None else np.nan
+            print(f"{name:<16}{label:<12}{boxes:>7}{binaries:>10}{result.build_time:>11.2f}{result.solve_time:>11.2f}"
+                  f"{effort:>10.3f}{robustness:>12.3f}")
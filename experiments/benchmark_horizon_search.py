@@ -0,0 +1,48 @@
+"""
+benchmark_horizon_search.py
+
+Compares the solve at the fixed time horizon of a scenario with the search for the shortest feasible
+horizon (see `STL/horizon_search.py`), on the benchmark specifications of both built-in scenarios.
+
+For both modes the table reports the number of time steps of the trajectory, the number of solves, the
+total time and the control effort. The horizon search is run twice with a shared solve cache, the second
+run shows the budget that is saved by reusing cached results.
+
+Usage:
+    python -m experiments.benchmark_horizon_search [backend] [dt]
+
+The backend is "gurobi" (default, requires a license that allows models of the size of the scenarios)
+or "highs". A larger dt gives smaller models.
+"""
+
+import sys
+import time
+import numpy as np
+
+from STL.STL_to_path import STLSolver, TrajectoryCache
+from basics.config import Default_parameters
+from experiments.benchmark_specs import get_benchmark_problem
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "gurobi"
+    dt = float(sys.argv[2]) if len(sys.argv) > 2 else Default_parameters().dt
+    pars = Default_parameters()
+
+    print(f"{'scenario':<15}{'mode':<16}{'N':>5}{'solves':>8}{'time [s]':>10}{'effort':>10}")
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        scenario, spec, N = get_benchmark_problem(scenario_name, dt)
+        cache = TrajectoryCache()
+        runs = [("fixed", None), ("search", cache), ("search, cached", cache)]
+        for mode, run_cache in runs:
+            solver = STLSolver(spec, scenario.objects, scenario.x0, scenario.T_initial, backend=backend, cache=run_cache)
+            start_time = time.time()
+            if mode == "fixed":
+                x, u = solver.generate_trajectory(dt, pars.max_acc, pars.max_speed)
+                solves = 1
+            else:
+                x, u = solver.generate_trajectory_min_horizon(dt, pars.max_acc, pars.max_speed)
+                solves = solver.horizon_search.stats['solves']
+            total_time = time.time() - start_time
+            steps = x.shape[1] - 1 if x is not None else np.nan
+            effort = float(np.sum(u[:, :-1]**2)) if x is not None else np.nan
+            print(f"{scenario_name:<15}{mode:<16}{steps:>5}{solves:>8}{total_time:>10.2f}{effort:>10.3f}")
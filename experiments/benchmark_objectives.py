@@ -0,0 +1,57 @@
+"""
+benchmark_objectives.py
+
+Compares the objectives of the MICP backends (see `OBJECTIVES` in `STL/backends.py`) on the benchmark
+specifications of both built-in scenarios.
+
+For every objective the table reports the status and solve time, and the quality of the trajectory: the
+quadratic control effort sum(u^2), the L1 effort sum(|u|), the peak acceleration max(|u|) and the robustness
+for the full specification.
+
+Usage:
+    python -m experiments.benchmark_objectives [backend] [dt]
+
+The backend is "gurobi" (default, requires a license that allows models of the size of the scenarios)
+or "highs", which replaces the quadratic objective by the L1 effort. A larger dt gives smaller models.
+"""
+
+import sys
+import time
+import numpy as np
+
+from STL.STL_to_path import STLSolver
+from STL.backends import OBJECTIVES
+from STL.spec_parser import SpecCompiler
+from basics.config import Default_parameters
+from experiments.benchmark_specs import get_benchmark_problem
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "gurobi"
+    dt = float(sys.argv[2]) if len(sys.argv) > 2 else Default_parameters().dt
+    pars = Default_parameters()
+
+    print(f"{'scenario':<15}{'objective':<13}{'status':<11}{'solve [s]':>10}{'sum u^2':>10}{'sum |u|':>10}"
+          f"{'max |u|':>9}{'robustness':>12}")
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        scenario, spec, N = get_benchmark_problem(scenario_name, dt)
+        for objective in OBJECTIVES:
+            solver = STLSolver(spec, scenario.objects, scenario.x0, scenario.T_initial, backend=backend,
+                               objective=objective)
+            spec_formula = SpecCompiler().compile(solver.get_spec_ast())
+            start_time = time.time()
+            try:
+                x, u = solver.generate_trajectory(dt, pars.max_acc, pars.max_speed)
+                status = solver.result.status
+            except RuntimeError as e:
+                print(f"    failed: {e}")
+                x, u, status = None, None, "failed"
+            solve_time = time.time() - start_time
+
+            if x is not None:
+                effort = u[:, :-1]
+                quality = (float(np.sum(effort**2)), float(np.sum(np.abs(effort))), float(np.max(np.abs(effort))),
+                           float(spec_formula.robustness(x, 0)[0]))
+            else:
+                quality = (np.nan,)*4
+            print(f"{scenario_name:<15}{objective:<13}{status:<11}{solve_time:>10.2f}{quality[0]:>10.3f}"
+                  f"{quality[1]:>10.3f}{quality[2]:>9.3f}{quality[3]:>12.3f}")
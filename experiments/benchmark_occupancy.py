@@ -0,0 +1,88 @@
+"""
+benchmark_occupancy.py
+
+Compares the vectorized occupancy matrix of `TrajectoryAnalyzer.get_inside_objects_array` (see `occupancy` in
+`STL/trajectory_analysis.py`) with the previous implementation, a loop over objects and time steps calling
+`is_inside` per cell, and with the occupancy computed through the spatial index of the objects (see
+`basics/spatial_index.py`).
+
+The trajectories are random walks through the workspace of the scenarios, the objects are the objects of the
+treasure hunt scenario, sets of random cuboids and a warehouse map with rows of shelves. For every size the
+table reports the time of the three implementations, the speedup of the vectorized one over the loop and whether
+they agree.
+
+Usage:
+    python -m experiments.benchmark_occupancy [repeats]
+"""
+
+import sys
+import time
+import numpy as np
+
+from STL.trajectory_analysis import TrajectoryAnalyzer
+from basics.scenarios import Scenarios
+from basics.spatial_index import SpatialIndex
+
+def loop_occupancy(analyzer):
+    """
+    The previous implementation of `get_inside_objects_array`, returning a float matrix.
+    """
+    T = analyzer.x.shape[1]
+    inside_array = np.zeros((len(analyzer.objects), T))
+    for i, object in enumerate(analyzer.objects.values()):
+        for j in range(T):
+            inside_array[i,j] = analyzer.is_inside(analyzer.x[:3,j], object)
+    return inside_array
+
+def random_objects(count, rng):
+    """
+    Returns `count` random cuboids in the workspace [-5, 5] x [-5, 5] x [0, 3].
+    """
+    corners = rng.uniform([-5., -5., 0.], [4., 4., 2.5], size=(count, 3))
+    sizes = rng.uniform(0.2, 1.0, size=(count, 3))
+    return {f"object{i}": tuple(float(v) for pair in zip(corner, corner + size) for v in pair)
+            for i, (corner, size) in enumerate(zip(corners, sizes))}
+
+def warehouse_objects(rows, shelves):
+    """
+    Returns a warehouse map of `rows` rows of `shelves` shelving boxes (0.8 x 0.4 x 2.5 m, 1.2 m apart).
+    """
+    return {f"shelf_{i}_{j}": (-5. + 1.2*j, -4.2 + 1.2*j, -5. + 1.2*i, -4.6 + 1.2*i, 0., 2.5)
+            for i in range(rows) for j in range(shelves)}
+
+def random_walk(T, rng):
+    """
+    Returns a random state trajectory of shape (6, T) inside the workspace.
+    """
+    steps = rng.normal(scale=0.2, size=(3, T))
+    positions = np.clip(np.cumsum(steps, axis=1), [[-5.], [-5.], [0.]], [[5.], [5.], [3.]])
+    return np.vstack([positions, np.zeros((3, T))])
+
+def best_time(function, repeats):
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start_time)
+    return min(times), result
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rng = np.random.default_rng(0)
+    cases = [("treasure_hunt", Scenarios("treasure_hunt").objects, T) for T in [100, 1000]]
+    cases += [(f"random_{count}", random_objects(count, rng), T) for count, T in [(100, 1000), (1000, 1000), (1000, 10000)]]
+    cases += [("warehouse", warehouse_objects(25, 25), 10000)]
+
+    print(f"{'objects':<15}{'count':>7}{'T':>8}{'loop [s]':>11}{'vectorized [s]':>16}{'indexed [s]':>13}"
+          f"{'speedup':>9}{'agree':>7}")
+    for name, objects, T in cases:
+        x = random_walk(T, rng)
+        analyzer = TrajectoryAnalyzer(objects, x, T - 1, 0.7)
+        indexed_analyzer = TrajectoryAnalyzer(objects, x, T - 1, 0.7, SpatialIndex(objects))
+        loop_time, expected = best_time(lambda: loop_occupancy(analyzer), 1 if len(objects)*T > 1e6 else repeats)
+        vector_time, inside = best_time(analyzer.get_inside_objects_array, repeats)
+        index_time, indexed_inside = best_time(indexed_analyzer.get_inside_objects_array, repeats)
+        agree = (inside.dtype == float and np.array_equal(inside, expected)
+                 and np.array_equal(indexed_inside, inside))
+        print(f"{name:<15}{len(objects):>7}{T:>8}{loop_time:>11.4f}{vector_time:>16.5f}{index_time:>13.5f}"
+              f"{loop_time/vector_time:>9.0f}{'yes' if agree else 'no':>7}")
@@ -0,0 +1,42 @@
+"""
+benchmark_receding_horizon.py
+
+Compares the monolithic solve of `STLSolver.generate_trajectory` with the receding-horizon mode
+`STLSolver.generate_trajectory_receding_horizon` for several window lengths, on the benchmark
+specifications of both built-in scenarios.
+
+For every configuration the table reports the wall-clock time, the control effort sum(u^2), the
+robustness of the final trajectory with respect to the full specification and, for the receding
+horizon, the number of windows and the slowest window.
+
+Requires a Gurobi license that allows models of the size of the scenarios.
+
+Usage:
+    python -m experiments.benchmark_receding_horizon
+"""
+
+import numpy as np
+
+from STL.STL_to_path import STLSolver
+from STL.spec_parser import SpecCompiler
+from experiments.benchmark_specs import get_benchmark_problem, timed_solve
+
+WINDOWS = [(20, 5), (30, 10), (40, 10)] # (window, step) pairs
+
+if __name__ == "__main__":
+    print(f"{'scenario':<15}{'mode':<22}{'time [s]':>10}{'effort':>10}{'robustness':>12}{'windows':>9}{'max window [s]':>16}")
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        scenario, spec, N = get_benchmark_problem(scenario_name)
+        solver = STLSolver(spec, scenario.objects, scenario.x0, scenario.T_initial)
+        spec_formula = SpecCompiler().compile(solver.get_spec_ast())
+
+        solve_time, effort, robustness = timed_solve(solver.generate_trajectory, spec_formula)
+        print(f"{scenario_name:<15}{'monolithic':<22}{solve_time:>10.2f}{effort:>10.3f}{robustness:>12.3f}{1:>9}{solve_time:>16.2f}")
+
+        for window, step in WINDOWS:
+            solve_time, effort, robustness = timed_solve(solver.generate_trajectory_receding_horizon, spec_formula,
+                                                         window=window, step=step)
+            stats = solver.receding_horizon.window_stats
+            max_window = max((w['solve_time'] for w in stats), default=np.nan)
+            mode = f"receding ({window}/{step})"
+            print(f"{scenario_name:<15}{mode:<22}{solve_time:>10.2f}{effort:>10.3f}{robustness:>12.3f}{len(stats):>9}{max_window:>16.2f}")
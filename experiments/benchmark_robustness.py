@@ -0,0 +1,53 @@
+"""
+benchmark_robustness.py
+
+Compares the vectorized and the online robustness monitors (see `STL/robustness.py`) with the recursive
+robustness of the compiled `stlpy` formula, on the benchmark specifications of both built-in scenarios.
+
+The trajectories are random walks from the initial state of the scenario. For every scenario and time step the
+table reports the mean evaluation time of `stlpy` and of the vectorized monitor, the speedup, the mean time per
+state of the online monitor (fed one state at a time) and the largest difference of the robustness values.
+
+Usage:
+    python -m experiments.benchmark_robustness [trajectories]
+"""
+
+import sys
+import time
+import numpy as np
+
+from STL.robustness import RobustnessMonitor, OnlineRobustnessMonitor
+from STL.spec_parser import parse_spec, SpecCompiler
+from experiments.benchmark_specs import get_benchmark_problem
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rng = np.random.default_rng(0)
+
+    print(f"{'scenario':<15}{'dt':>6}{'N':>6}{'stlpy [ms]':>12}{'monitor [ms]':>14}{'speedup':>9}{'online [us/state]':>19}{'max diff':>10}")
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        for dt in [0.7, 0.35]:
+            scenario, spec, N = get_benchmark_problem(scenario_name, dt)
+            spec_ast = parse_spec(spec, scenario.objects)
+            formula = SpecCompiler().compile(spec_ast)
+            monitor = RobustnessMonitor(spec_ast)
+
+            stlpy_time, monitor_time, online_time, difference = 0.0, 0.0, 0.0, 0.0
+            for _ in range(count):
+                x = scenario.x0[:, None] + np.cumsum(rng.normal(scale=0.3, size=(6, N + 1)), axis=1)
+                start_time = time.perf_counter()
+                expected = float(formula.robustness(x, 0)[0])
+                stlpy_time += time.perf_counter() - start_time
+                start_time = time.perf_counter()
+                robustness = monitor.evaluate(x)
+                monitor_time += time.perf_counter() - start_time
+                online = OnlineRobustnessMonitor(spec_ast)
+                start_time = time.perf_counter()
+                for state in x.T:
+                    online.update(state)
+                online_robustness = online.finish()
+                online_time += time.perf_counter() - start_time
+                difference = max(difference, abs(robustness - expected), abs(online_robustness - expected))
+
+            print(f"{scenario_name:<15}{dt:>6}{N:>6}{1e3*stlpy_time/count:>12.2f}{1e3*monitor_time/count:>14.3f}"
+                  f"{stlpy_time/monitor_time:>9.0f}{1e6*online_time/(count*(N + 1)):>19.0f}{difference:>10.1e}")
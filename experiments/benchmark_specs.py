@@ -0,0 +1,106 @@
+"""
+benchmark_specs.py
+
+Representative specifications for the built-in scenarios, used by the solver benchmarks in this folder.
+
+The specifications are of the form the LLM typically returns for the automated user inputs of the
+scenarios (see `Scenarios.get_automated_user_input`), with the time horizon of the scenario.
+
+Functions:
+- get_benchmark_problem(scenario_name, dt=0.7): Returns the scenario, specification and number of time steps.
+- get_cluttered_problem(count, seed=0, dt=0.7): Returns a generated cluttered scene, specification and number of time steps.
+- timed_solve(method, spec_formula, dt=None, **kwargs): Runs a trajectory generation method and measures the result.
+"""
+
+import time
+import numpy as np
+from basics.config import Default_parameters
+from basics.scenarios import Scenarios
+
+def get_benchmark_spec(scenario_name, N):
+    """
+    Returns a representative specification string for a scenario with N time steps.
+    """
+    if scenario_name == "reach_avoid":
+        parts = [f'STL_formulas.inside_cuboid(objects["goal"]).eventually(0, {N})']
+        for i in range(1, 8):
+            parts.append(f'STL_formulas.outside_cuboid(objects["obstacle{i}"]).always(0, {N})')
+
+    elif scenario_name == "treasure_hunt":
+        key_deadline = int(30/70*N) # "Go to the key in the first 30 seconds"
+        parts = [f'STL_formulas.inside_cuboid(objects["door_key"]).eventually(0, {key_deadline})',
+                 f'STL_formulas.inside_cuboid(objects["chest"]).eventually(0, {N})',
+                 f'STL_formulas.outside_cuboid(objects["door"]).until(STL_formulas.inside_cuboid(objects["door_key"]), 0, {key_deadline})',
+                 f'STL_formulas.inside_cuboid(objects["room_bounds"]).always(0, {N})']
+        for wall in ["NE_inside_wall", "south_mid_inside_wall", "north_mid_inside_wall", "west_inside_wall", "above_door_wall"]:
+            parts.append(f'STL_formulas.outside_cuboid(objects["{wall}"]).always(0, {N})')
+
+    else:
+        raise ValueError(f"No benchmark specification for scenario '{scenario_name}'")
+
+    return " & ".join(parts)
+
+def get_benchmark_problem(scenario_name, dt=0.7):
+    """
+    Returns (scenario, spec, N) for a built-in scenario.
+    """
+    scenario = Scenarios(scenario_name)
+    N = int(scenario.T_initial/dt)
+    return scenario, get_benchmark_spec(scenario_name, N), N
+
+def get_cluttered_problem(count, seed=0, dt=0.7):
+    """
+    Returns (objects, x0, T, spec, N) of a generated scene: a room with `count` random obstacles between
+    the start in one corner and the goal in the opposite corner, with the specification to reach the goal
+    while avoiding all obstacles and staying in the room.
+    """
+    rng = np.random.default_rng(seed)
+    x0 = np.array([-4., -4., 1., 0., 0., 0.])
+    T = 25
+    N = int(T/dt)
+    objects = {"goal": (3.5, 4.5, 3.5, 4.5, 0.5, 1.5),
+               "room_bounds": (-5., 5., -5., 5., 0., 3.)}
+    keep_out = [(x0[0]-0.5, x0[0]+0.5, x0[1]-0.5, x0[1]+0.5, 0., 3.), objects["goal"]]
+    while len(objects) < count + 2:
+        size = rng.uniform([0.5, 0.5, 1.], [1.5, 1.5, 3.])
+        corner = rng.uniform([-5., -5., 0.], np.array([5., 5., 3.]) - size)
+        obstacle = tuple(float(v) for pair in zip(corner, corner + size) for v in pair)
+        if not any(all(obstacle[2*i] < other[2*i+1] + 0.3 and other[2*i] - 0.3 < obstacle[2*i+1] for i in range(3))
+                   for other in keep_out):
+            objects[f"obstacle{len(objects) - 1}"] = obstacle
+
+    parts = [f'STL_formulas.inside_cuboid(objects["goal"]).eventually(0, {N})',
+             f'STL_formulas.inside_cuboid(objects["room_bounds"]).always(0, {N})']
+    for name in objects:
+        if name.startswith("obstacle"):
+            parts.append(f'STL_formulas.outside_cuboid(objects["{name}"]).always(0, {N})')
+    return objects, x0, T, " & ".join(parts), N
+
+def timed_solve(method, spec_formula, dt=None, **kwargs):
+    """
+    Runs a trajectory generation method of an `STLSolver` with the default parameters.
+
+    Parameters:
+    - method (callable): E.g. `solver.generate_trajectory`.
+    - spec_formula (STLFormula): Compiled specification, used to compute the robustness of the result.
+    - dt (float): Time step. Default is the time step of the default parameters.
+    - kwargs: Additional keyword arguments of the method.
+
+    Returns:
+    - tuple: (solve time in seconds, control effort sum(u^2), robustness). Effort and robustness are nan
+             if no trajectory was found.
+    """
+    pars = Default_parameters()
+    start_time = time.time()
+    try:
+        x, u = method(pars.dt if dt is None else dt, pars.max_acc, pars.max_speed, **kwargs)
+    except RuntimeError as e:
+        print(f"    failed: {e}")
+        x, u = None, None
+    solve_time = time.time() - start_time
+
+    if x is None:
+        return solve_time, np.nan, np.nan
+    effort = float(np.sum(u[:, :-1]**2))
+    robustness = float(spec_formula.robustness(x, 0)[0])
+    return solve_time, effort, robustness
@@ -0,0 +1,49 @@
+"""
+benchmark_warm_start.py
+
+Compares the Gurobi solve with and without the graph-search warm start (see `STL/warm_start.py`), on the
+benchmark specifications of both built-in scenarios and a generated cluttered scene.
+
+For both settings the table reports the time until the first trajectory satisfying the specification, the
+total solve time and the control effort of the final trajectory. With the warm start, the time to the first
+trajectory includes the planning time of the warm start, which is also reported separately.
+
+Usage:
+    python -m experiments.benchmark_warm_start [dt]
+
+Requires a Gurobi license that allows models of the size of the scenarios. A larger dt gives smaller models.
+"""
+
+import sys
+import time
+import numpy as np
+
+from STL.STL_to_path import STLSolver
+from basics.config import Default_parameters
+from experiments.benchmark_specs import get_benchmark_problem, get_cluttered_problem
+
+if __name__ == "__main__":
+    dt = float(sys.argv[1]) if len(sys.argv) > 1 else Default_parameters().dt
+    pars = Default_parameters()
+
+    problems = []
+    for scenario_name in ["reach_avoid", "treasure_hunt"]:
+        scenario, spec, N = get_benchmark_problem(scenario_name, dt)
+        problems.append((scenario_name, scenario.objects, scenario.x0, scenario.T_initial, spec))
+    objects, x0, T, spec, N = get_cluttered_problem(15, dt=dt)
+    problems.append(("cluttered_15", objects, x0, T, spec))
+
+    print(f"{'scenario':<15}{'warm start':<12}{'plan [s]':>10}{'first [s]':>11}{'total [s]':>11}{'effort':>10}")
+    for name, objects, x0, T, spec in problems:
+        for warm_start in [False, True]:
+            solver = STLSolver(spec, objects, x0, T, graph_warm_start=warm_start)
+            incumbents = []
+            start_time = time.time()
+            x, u = solver.generate_trajectory(dt, pars.max_acc, pars.max_speed,
+                                              incumbent_callback=lambda x, u, objective: incumbents.append(time.time()))
+            total_time = time.time() - start_time
+            first_time = incumbents[0] - start_time if incumbents else np.nan
+            plan_time = solver.warm_start.stats.get('time', np.nan) if solver.warm_start is not None else np.nan
+            effort = float(np.sum(u[:, :-1]**2)) if x is not None else np.nan
+            print(f"{name:<15}{'yes' if warm_start else 'no':<12}{plan_time:>10.2f}{first_time:>11.2f}"
+                  f"{total_time:>11.2f}{effort:>10.3f}")
@@ -6,16 +6,17 @@ optional waypoints to organized directories based on the scenario and user mode
 
 The results include:
 - Messages exchanged during the experiment.
-- Metadata about the experiment configuration and execution.
+- Metadata about the experiment configuration and execution, including the solver telemetry of every solve
+  (model size, presolve reductions, nodes, runtime, MIP gap, objective and the shape of the specification).
 - Waypoints generated during the experiment (if available).
 
 The results are saved in unique files within a scenario-specific directory, ensuring that 
 each experiment is logged separately.
 
 Functions:
-- save_results(pars, messages, task_accomplished, waypoints=None): Saves the experiment data to disk.
+- save_results(pars, messages, task_accomplished, waypoints=None, solver_telemetry=None): Saves the experiment data to disk.
 - save_messages(experiments_directory, experiment_id, messages): Saves exchanged messages to a JSON file.
-- save_metadata(experiments_directory, experiment_id, messages, pars, task_accomplished): Saves experiment metadata to a JSON file.
+- save_metadata(experiments_directory, experiment_id, messages, pars, task_accomplished, solver_telemetry=None): Saves experiment metadata to a JSON file.
 - save_waypoints(experiments_directory, experiment_id, waypoints): Saves waypoints to a .npy file (if provided).
 """
 
@@ -24,7 +25,7 @@ import json
 from basics.logger import color_text
 import numpy as np
 
-def save_results(pars, messages, task_accomplished, waypoints=None):
+def save_results(pars, messages, task_accomplished, waypoints=None, solver_telemetry=None):
     """
     Saves the results of an experiment, including messages, metadata, and optional waypoints.
 
@@ -33,6 +34,7 @@ def save_results(pars, messages, task_accomplished, waypoints=None):
     - messages (list): List of message objects exchanged during the experiment.
     - task_accomplished (bool): Indicates whether the experiment's task was successfully completed.
     - waypoints (numpy.ndarray, optional): Waypoints generated during the experiment. Defaults to None.
+    - solver_telemetry (list, optional): `STLSolver.telemetry()` of every solve during the experiment. Defaults to None.
 
     This function creates an organized directory structure based on the scenario name and user mode
     (automatic or conversational). It sequentially saves the following files:
@@ -64,7 +66,7 @@ def save_results(pars, messages, task_accomplished, waypoints=None):
     new_experiment_id = last_experiment_id + 1
 
     save_messages(experiments_directory, new_experiment_id, messages)                           # Save the messages to a file
-    save_metadata(experiments_directory, new_experiment_id, messages, pars, task_accomplished)  # Save the metadata to a file
+    save_metadata(experiments_directory, new_experiment_id, messages, pars, task_accomplished, solver_telemetry) # Save the metadata to a file
     save_waypoints(experiments_directory, new_experiment_id, waypoints)                         # Save the waypoints to a file
 
     print(color_text(f"Results saved in {experiments_directory}", 'yellow'))
@@ -91,7 +93,7 @@ def save_messages(experiments_directory, experiment_id, messages):
         json.dump(messages, f) # Save the messages to the messages file
 
 
-def save_metadata(experiments_directory, experiment_id, messages, pars, task_accomplished):    
+def save_metadata(experiments_directory, experiment_id, messages, pars, task_accomplished, solver_telemetry=None):
     """
     Saves metadata about the experiment to a JSON file.
 
@@ -101,8 +103,10 @@ def save_metadata(experiments_directory, experiment_id, messages, pars, task_acc
     - messages (list): List of message objects exchanged during the experiment.
     - pars (object): Contains experiment parameters and settings.
     - task_accomplished (bool): Indicates whether the experiment's task was successfully completed.
+    - solver_telemetry (list, optional): `STLSolver.telemetry()` of every solve during the experiment. Defaults to None.
 
-    The metadata includes experiment parameters, the number of user messages, and task accomplishment status.
+    The metadata includes experiment parameters, the number of user messages, the task accomplishment status,
+    and the solver telemetry with the total solve time over all solves.
     The file is named as <experiment_id>_METADATA.json and is saved in the specified directory.
 
     Returns:
@@ -112,10 +116,15 @@ def save_metadata(experiments_directory, experiment_id, messages, pars, task_acc
     # find and count number of user messages
     user_message_count = sum(1 for message in messages if message['role'] == 'user')
 
+    solver_telemetry = [entry for entry in (solver_telemetry or []) if entry is not None]
+
     metadata = {
         **vars(pars), # Include all parameters in `pars`
         "task_accomplished": task_accomplished,
         "user_message_count": user_message_count,
+        "solve_count": len(solver_telemetry),
+        "total_solve_time": sum(entry["solve_time"] or 0.0 for entry in solver_telemetry),
+        "solver_telemetry": solver_telemetry,
     }
 
     metadata_file_name = f'{experiment_id}_METADATA.json'
@@ -15,8 +15,14 @@ Author: Teun van de Laar
 """
 
 from LLM.NL_to_STL import NL_to_STL
-from STL.STL_to_path import STLSolver, STL_formulas
+from STL.STL_to_path import STLSolver, STL_formulas, TrajectoryCache
+from STL.spec_parser import SpecSyntaxError
+from STL.reachability import SpecInfeasibleError
+from STL.session import PlanningSession
+from STL.background import SolveHandle
+from STL.portfolio import solve_portfolio
 from STL.trajectory_analysis import TrajectoryAnalyzer
+from STL.robustness import RobustnessMonitor, OnlineRobustnessMonitor
 from basics.logger import color_text
 from basics.scenarios import Scenarios
 from basics.config import Default_parameters
@@ -26,7 +32,155 @@ from visuals.visualization import Visualizer
 import numpy as np
 import matplotlib.pyplot as plt
 
-def main(pars=Default_parameters()):
+def generate_trajectory(solver, pars, incumbent_callback=None):
+    """
+    Generates a trajectory with the planning mode of the parameters.
+
+    Parameters:
+        solver (STLSolver): The solver with the specification.
+        pars (Default_parameters): The parameters.
+        incumbent_callback (callable): Called with every improved trajectory of a monolithic solve. Default is None.
+
+    Returns:
+        tuple: (x, u), None if no trajectory was found.
+    """
+    if pars.planning_mode == "receding_horizon":
+        return solver.generate_trajectory_receding_horizon(
+            pars.dt, 
+            pars.max_acc, 
+            pars.max_speed, 
+            window=pars.receding_horizon_window, 
+            step=pars.receding_horizon_step, 
+            verbose=pars.solver_verbose, 
+            )
+    elif pars.planning_mode == "coarse_to_fine":
+        return solver.generate_trajectory_coarse_to_fine(
+            pars.dt, 
+            pars.max_acc, 
+            pars.max_speed, 
+            factor=pars.coarse_to_fine_factor, 
+            verbose=pars.solver_verbose, 
+            )
+    elif pars.planning_mode == "min_horizon":
+        return solver.generate_trajectory_min_horizon(
+            pars.dt, 
+            pars.max_acc, 
+            pars.max_speed, 
+            verbose=pars.solver_verbose, 
+            time_limit=pars.solver_time_limit, 
+            mip_gap=pars.solver_mip_gap, 
+            )
+    return solver.generate_trajectory(
+        pars.dt, 
+        pars.max_acc, 
+        pars.max_speed, 
+        verbose=pars.solver_verbose, 
+        include_dynamics=True, 
+        time_limit=pars.solver_time_limit, 
+        mip_gap=pars.solver_mip_gap, 
+        feasible_first=pars.solver_feasible_first, 
+        incumbent_callback=incumbent_callback, 
+        )
+
+def solve_candidates(translator, messages, scenario, x0, T, pars, solver_telemetry=None):
+    """
+    Solves the specification of the conversation together with alternative specifications from GPT in
+    parallel processes (see `STL.portfolio`), instead of trying them one by one in the feedback loop.
+
+    Returns:
+        PortfolioEntry: The best candidate that passed the local checks, None if no candidate passed.
+        The telemetry of every solved candidate is appended to `solver_telemetry`, if given.
+    """
+    candidates = translator.get_candidate_specs(messages, pars.portfolio_size)
+    print(color_text(f"Solving {len(candidates)} candidate specifications in parallel...", 'yellow'))
+    entries = solve_portfolio(
+        candidates, 
+        scenario.objects, 
+        x0, 
+        T, 
+        pars.dt, 
+        pars.max_acc, 
+        pars.max_speed, 
+        first=pars.portfolio_first, 
+        threads_per_solve=pars.portfolio_threads_per_solve, 
+        cache_dir=pars.solve_cache_dir if pars.solve_cache_enabled else None, 
+        solve_kwargs={'time_limit': pars.solver_time_limit, 
+                      'mip_gap': pars.solver_mip_gap, 
+                      'feasible_first': pars.solver_feasible_first}, 
+        backend=pars.solver_backend, 
+        precheck=pars.reachability_check_enabled, 
+        tight_bounds=pars.tight_bounds_enabled, 
+        simplify=pars.spec_simplification_enabled, 
+        prune_obstacles=pars.obstacle_pruning_enabled, 
+        free_space=pars.free_space_encoding_enabled, 
+        graph_warm_start=pars.graph_warm_start_enabled, 
+        objective=pars.solver_objective, 
+        )
+    for entry in entries:
+        result = f"cost {entry.cost:.4f}" if entry.passed else (entry.error or entry.status)
+        print(f"Candidate {entry.index}: {result} <{entry.spec}>")
+        if solver_telemetry is not None and entry.telemetry is not None:
+            solver_telemetry.append(entry.telemetry)
+    return entries[0] if entries and entries[0].passed else None
+
+def wait_for_solve(handle):
+    """
+    Waits for a trajectory generation running in a `SolveHandle` and reports improved trajectories.
+    Ctrl-C interrupts the waiting instead of the session, and lets the user cancel the solve (keeping the
+    best trajectory found so far), refine the specification while the solve continues, or keep waiting.
+
+    Returns:
+        tuple: (x, refine)
+            - x: The trajectory, None if there is none.
+            - refine: True if the user chose to refine the specification.
+    """
+    reported = None
+    while True:
+        try:
+            while not handle.wait(0.2):
+                if handle.incumbent is not None and handle.incumbent is not reported:
+                    reported = handle.incumbent
+                    print(f"Best trajectory so far: cost {reported[2]:.4f}")
+            x, _ = handle.result()
+            return x, False
+        except KeyboardInterrupt:
+            choice = input(color_text("\nSolve interrupted. ", 'yellow') + 
+                           "(c)ancel and keep the best trajectory so far, (r)efine the specification, or (w)ait? ")
+            if choice.lower() == 'c':
+                x, _ = handle.cancel()
+                return x, False
+            if choice.lower() == 'r':
+                return None, True
+
+def append_segment(all_x, x, spec_ast, flight_specs, flight_monitors, pars):
+    """
+    Appends an accepted trajectory segment to the full trajectory. The online monitors of the specifications of
+    the earlier segments are extended with the new states, and a monitor of the specification of the segment is
+    started at its first state.
+
+    Parameters:
+        all_x (numpy.ndarray): The full trajectory, of shape (6, n).
+        x (numpy.ndarray): The segment, starting at the last state of the full trajectory.
+        spec_ast (SpecNode): The specification of the segment.
+        flight_specs (list): The (specification, first time step) of every segment, appended to.
+        flight_monitors (list): The online monitors of the specifications of the segments, appended to.
+        pars (Default_parameters): The parameters.
+
+    Returns:
+        numpy.ndarray: The full trajectory with the segment.
+    """
+    if pars.online_monitor_enabled:
+        for k, monitor in enumerate(flight_monitors):
+            verdict = monitor.verdict
+            if monitor.extend(x[:, 1:]) == "violated" and verdict != "violated":
+                print(color_text(f"The full trajectory violates the specification of segment {k+1}.", 'yellow'))
+        monitor = OnlineRobustnessMonitor(spec_ast, pars.robustness_tolerance)
+        monitor.extend(x)
+        flight_specs.append((spec_ast, all_x.shape[1] - 1))
+        flight_monitors.append(monitor)
+    return np.hstack((all_x, x[:,1:]))
+
+def main(pars=Default_parameters(), solver_telemetry=None):
     """
     Orchestrates the VernaCopter framework. Sets up a scenario, handles conversations 
     for task specification, generates trajectories, and visualizes results.
@@ -34,6 +188,8 @@ def main(pars=Default_parameters()):
     Parameters:
         pars (Default_parameters): Configurable parameters for the system, including 
         scenario details, solver limits, and user settings.
+        solver_telemetry (list): Optional list to which the `STLSolver.telemetry()` of every solve is appended,
+        also if the session ends with an exception (see `experiments/save_results.py`).
 
     Returns:
         tuple: (messages, task_accomplished, all_x)
@@ -50,10 +206,19 @@ def main(pars=Default_parameters()):
     status = "active"                           # Initialize the status of the conversation
     x0 = scenario.x0                            # Initial position
     all_x = np.expand_dims(x0, axis=1)          # Initialize the full trajectory
+    flight_specs = []                           # Specifications of the accepted segments, with their first time step
+    flight_monitors = []                        # Online monitors of the specifications of the accepted segments
     processing_feedback = False                 # Initialize the feedback processing flag
     syntax_checked_spec = None                  # Initialize the syntax checked specification
     spec_checker_iteration = 0                  # Initialize the specification check iteration
+    reachability_rejections = 0                 # Initialize the number of infeasible specifications
     syntax_checker_iteration = 0                # Initialize the syntax check iteration
+    pending_solve = None                        # Background solve that continues while the specification is refined
+    portfolio_entry = None                      # Candidate specification solved by the portfolio
+    solve_cache = TrajectoryCache(pars.solve_cache_size, pars.solve_cache_dir) \
+        if pars.solve_cache_enabled else None   # Cache of solved trajectories
+    session = PlanningSession(scenario.objects) if pars.planning_session_enabled \
+        and pars.solver_backend == "gurobi" else None # Gurobi model reused between iterations
 
     if pars.show_map: scenario.show_map()       # Display the map if enabled
 
@@ -76,6 +241,7 @@ def main(pars=Default_parameters()):
 
         # Initialize/reset flags for validation and feedback
         trajectory_accepted = False
+        robustness_rejected = False
 
         # Generate STL specification
         if syntax_checked_spec is None: 
@@ -85,8 +251,15 @@ def main(pars=Default_parameters()):
                 processing_feedback=processing_feedback, 
                 status=status, automated_user=pars.automated_user, 
                 automated_user_input=scenario.automated_user_input,
+                background_solve=pending_solve,
                 )
             
+            if pending_solve is not None: # Superseded by the new specification
+                if not pending_solve.done():
+                    print(color_text("Waiting for the previous trajectory generation to stop...", 'yellow'))
+                pending_solve.cancel() # the next solve must not start while the worker still uses the model
+                pending_solve = None
+
             if status == "exited": # Break loop if user exits
                 break
             
@@ -94,6 +267,13 @@ def main(pars=Default_parameters()):
             spec = translator.get_specs(messages)
             processing_feedback = False
 
+            # Solve alternative specifications in parallel, and continue with the best one
+            if pars.portfolio_size > 1 and pars.planning_mode == "monolithic":
+                portfolio_entry = solve_candidates(translator, messages, scenario, x0, T, pars, solver_telemetry)
+                if portfolio_entry is not None and portfolio_entry.spec != spec:
+                    spec = portfolio_entry.spec
+                    messages.append({"role": "system", "content": f"The alternative specification <{spec}> is used."})
+
         else:
             # Use syntax-checked STL specification
             spec = syntax_checked_spec
@@ -101,33 +281,65 @@ def main(pars=Default_parameters()):
         print("Extracted specification: ", spec)
 
         # Initialize the solver with the STL specification
-        solver = STLSolver(spec, scenario.objects, x0, T,)
+        solver = STLSolver(spec, scenario.objects, x0, T, cache=solve_cache, backend=pars.solver_backend, 
+                           precheck=pars.reachability_check_enabled, tight_bounds=pars.tight_bounds_enabled, 
+                           session=session, simplify=pars.spec_simplification_enabled, 
+                           prune_obstacles=pars.obstacle_pruning_enabled, 
+                           free_space=pars.free_space_encoding_enabled, 
+                           graph_warm_start=pars.graph_warm_start_enabled, 
+                           objective=pars.solver_objective, spatial_index=scenario.spatial_index)
 
-        print(color_text("Generating the trajectory...", 'yellow'))
         try:
-            # Generate trajectory
-            x,_ = solver.generate_trajectory(
-                pars.dt, 
-                pars.max_acc, 
-                pars.max_speed, 
-                verbose=pars.solver_verbose, 
-                include_dynamics=True
-                )
-            trajectory_analyzer = TrajectoryAnalyzer(scenario.objects, x, N, pars.dt)    # Initialize the specification checker
+            if portfolio_entry is not None:
+                # Already solved by the portfolio
+                x, portfolio_entry = portfolio_entry.x, None
+            else:
+                print(color_text("Generating the trajectory...", 'yellow'), "(press Ctrl-C to cancel or refine)")
+                # Generate the trajectory in a worker thread, so the solve can be cancelled or refined
+                solve_handle = SolveHandle(solver, generate_trajectory, solver, pars)
+                x, refine = wait_for_solve(solve_handle)
+                if refine:
+                    # Continue the conversation, the solve is cancelled once a new specification is given
+                    pending_solve = solve_handle
+                    previous_messages = messages
+                    continue
+                if solver_telemetry is not None and solver.result is not None:
+                    solver_telemetry.append(solver.telemetry())
+                if x is None and solve_handle.cancelled:
+                    raise Exception("The solve was cancelled before a trajectory was found.")
+            if solver.result is not None and solver.result.status not in ("optimal", "infeasible"):
+                print(color_text(f"The solve is {solver.result.status}", 'yellow'), f"(gap: {solver.result.gap:.2%})")
+            N_x = N if x is None else x.shape[1] - 1     # the "min_horizon" mode can return a shorter trajectory
+            trajectory_analyzer = TrajectoryAnalyzer(scenario.objects, x, N_x, pars.dt, scenario.spatial_index)  # Initialize the specification checker
             inside_objects_array = trajectory_analyzer.get_inside_objects_array()  # Get array with trajectory analysis
-            visualizer = Visualizer(x, scenario)                            # Initialize the visualizer
+            crossings = trajectory_analyzer.get_crossings() if pars.segment_collision_check_enabled else None
+            visualizer = Visualizer(x, scenario, pars.scene_near_margin)    # Initialize the visualizer
             fig, ax = visualizer.visualize_trajectory()                     # Visualize the trajectory
             plt.pause(1)                                                    # Pause for visualization
             fig, ax = trajectory_analyzer.visualize_spec(inside_objects_array) # Visualize the trajectory analysis
             plt.pause(1)                                                    # Pause for visualization
 
-            # Specification checker
-            if pars.spec_checker_enabled and spec_checker_iteration < pars.spec_check_limit:
+            # Deterministic specification check: reject trajectories with a negative robustness
+            if pars.robustness_check_enabled and x is not None:
+                monitor = RobustnessMonitor(solver.get_spec_ast())
+                robustness = monitor.evaluate(x)
+                print("Robustness of the specification: ", robustness)
+                if robustness < -pars.robustness_tolerance:
+                    report = monitor.report(pars.dt)
+                    print(color_text("The trajectory violates the specification:", 'yellow'), report)
+                    messages.append({"role": "system", "content": f"Robustness check: {report}"})
+                    robustness_rejected = True
+                    processing_feedback = True
+                    spec_checker_iteration += 1 # counts toward the limit of the specification checks
+
+            # Specification checker, for the intent of the specification
+            if pars.spec_checker_enabled and not robustness_rejected and spec_checker_iteration < pars.spec_check_limit:
                 # Check the specification
                 spec_check_response = trajectory_analyzer.GPT_spec_check(
                     scenario.objects, 
                     inside_objects_array, 
-                    messages)
+                    messages, 
+                    crossings)
                 # Check if the trajectory is accepted
                 trajectory_accepted = translator.spec_accepted_check(spec_check_response)
 
@@ -148,7 +360,7 @@ def main(pars=Default_parameters()):
             if np.isnan(x).all():
                 raise Exception("The trajectory is infeasible.")
         
-            if pars.manual_trajectory_check_enabled:
+            if pars.manual_trajectory_check_enabled and not robustness_rejected:
                 # Ask the user to accept or reject the trajectory
                 while True:
                     response = input("Accept the trajectory? (y/n): ")
@@ -165,13 +377,28 @@ def main(pars=Default_parameters()):
 
             if trajectory_accepted:
                 # Add the trajectory to the full trajectory
-                all_x = np.hstack((all_x, x[:,1:]))
+                all_x = append_segment(all_x, x, solver.get_spec_ast(), flight_specs, flight_monitors, pars)
                 x0 = x[:, -1] # Update the initial position for the next trajectory
                 print("New position after trajectory: ", x0)
 
+        # Feed provably infeasible specifications back to the conversation
+        except SpecInfeasibleError as e:
+            print(color_text("The specification is infeasible:", 'yellow'), e)
+            messages.append({"role": "system", "content": f"Reachability check: {e}"})
+            processing_feedback = True
+            reachability_rejections += 1
+
+            # Terminate the program if the maximum number of infeasible specifications is reached
+            if reachability_rejections > pars.reachability_check_limit:
+                print(color_text("The program is terminated.", 'yellow'), "Exceeded the maximum number of infeasible specifications.")
+                break
+
         # If the trajectory generation fails, break the loop
-        except:
-            print(color_text("The trajectory is infeasible.", 'yellow'))
+        except Exception as e:
+            if isinstance(e, SpecSyntaxError):
+                print(color_text("The specification could not be parsed:", 'yellow'), e)
+            else:
+                print(color_text("The trajectory is infeasible.", 'yellow'))
             if pars.syntax_checker_enabled and syntax_checker_iteration <= pars.syntax_check_limit: 
                 # Check the syntax of the specification
                 print(color_text("Checking the syntax of the specification...", 'yellow')) 
@@ -187,9 +414,9 @@ def main(pars=Default_parameters()):
         previous_messages = messages # Update the conversation history
 
         # Exit the loop directly if the automated user is enabled and the trajectory is accepted
-        if pars.automated_user and (trajectory_accepted or not pars.spec_checker_enabled):
+        if pars.automated_user and (trajectory_accepted or not (pars.spec_checker_enabled or robustness_rejected)):
             if x is not None:
-                all_x = np.hstack((all_x, x[:,1:]))
+                all_x = append_segment(all_x, x, solver.get_spec_ast(), flight_specs, flight_monitors, pars)
             break
         
     # Visualize the full trajectory
@@ -198,13 +425,19 @@ def main(pars=Default_parameters()):
         print(color_text("No trajectories were accepted. Exiting the program.", 'yellow'))
     else:
         print(color_text("The full trajectory is generated.", 'yellow'))
-        simulate(pars, scenario, all_x) # Animate the final trajectory if enabled
+        for k, monitor in enumerate(flight_monitors):
+            robustness = monitor.finish()
+            print(f"Robustness of the specification of segment {k+1}: ", robustness, f"({monitor.verdict})")
+        simulate(pars, scenario, all_x, flight_specs) # Animate the final trajectory if enabled
 
     # Check if the task is accomplished using the specification checker module
-    trajectory_analyzer = TrajectoryAnalyzer(scenario.objects, all_x, N, pars.dt)
+    trajectory_analyzer = TrajectoryAnalyzer(scenario.objects, all_x, N, pars.dt, scenario.spatial_index)
     inside_objects_array = trajectory_analyzer.get_inside_objects_array()
-    task_accomplished = trajectory_analyzer.task_accomplished_check(inside_objects_array, pars.scenario_name)
+    crossings = trajectory_analyzer.get_crossings() if pars.segment_collision_check_enabled else None
+    task_accomplished = trajectory_analyzer.task_accomplished_check(inside_objects_array, pars.scenario_name, crossings)
 
+    if solve_cache is not None:
+        print("Solve cache statistics: ", solve_cache.stats())
     print(color_text("The program is completed.", 'yellow'))
 
     return messages, task_accomplished, all_x
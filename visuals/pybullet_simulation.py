@@ -87,7 +87,10 @@ def run(waypoints,
         simulation_freq_hz=DEFAULT_SIMULATION_FREQ_HZ,
         control_freq_hz=DEFAULT_CONTROL_FREQ_HZ,
         output_folder=DEFAULT_OUTPUT_FOLDER,
-        colab=DEFAULT_COLAB
+        colab=DEFAULT_COLAB,
+        monitors=(),
+        monitor_every=1,
+        near_margin=None
         ):
     """
     Run a simulation with given waypoints and scenario.
@@ -109,6 +112,11 @@ def run(waypoints,
         control_freq_hz (int): Control frequency in Hz.
         output_folder (str): Folder to save results.
         colab (bool): Whether running in Google Colab.
+        monitors (list): Online robustness monitors (see `STL/robustness.py`) that are updated with the state of
+            the first drone at every monitor_every-th waypoint, and report the verdicts as soon as they are decided.
+        monitor_every (int): Waypoints per time step of the monitored specifications.
+        near_margin (float): If given, only the objects within this distance (per axis) of the waypoints are
+            created, found with the spatial index of the scenario (the door and its key are always created).
 
     Returns:
         None
@@ -174,7 +182,14 @@ def run(waypoints,
         ctrl = [DSLPIDControl(drone_model=drone) for i in range(num_drones)]
 
     #### Customize the envionment ##############################
+    near = None
+    if near_margin is not None:
+        near = {"door", "door_key"} # removed when the key is reached
+        for j in range(NUM_WP - 1):
+            near.update(scenario.spatial_index.query_segment(waypoints[j], waypoints[j+1], near_margin))
     for object in scenario.objects:
+        if near is not None and object not in near:
+            continue
         if scenario.scenario_name == "reach_avoid": 
             if 'obstacle' in object: # check if object name contains 'obstacle'
                 cube_color = [1., 0., 0.]
@@ -272,6 +287,14 @@ def run(waypoints,
                     
             last_pos = cur_pos
 
+            #### Monitor the specifications online ####################
+            if j == 0 and monitors and i % monitor_every == 0 and i < NUM_WP:
+                for k, monitor in enumerate(monitors):
+                    verdict = monitor.verdict
+                    if monitor.update(cur_pos) != verdict:
+                        print(f"Specification {k+1} {monitor.verdict} at time step {monitor.start + monitor.decided_at} "
+                              f"(robustness bounds: {monitor.robustness_bounds()})")
+
             #### Log the simulation ####################################
             logger.log(drone=j,
                        timestamp=i/env.CTRL_FREQ,
@@ -290,6 +313,11 @@ def run(waypoints,
     #### Close the environment #################################
     env.close()
 
+    #### Report the robustness of the flown trajectory ##########
+    for k, monitor in enumerate(monitors):
+        robustness = monitor.finish()
+        print(f"Specification {k+1} {monitor.verdict} by the flown trajectory (robustness: {robustness:.3f})")
+
     #### Plot the simulation results ###########################
     if plot:
         logger.plot()
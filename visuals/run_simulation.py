@@ -2,8 +2,9 @@ from basics.logger import color_text
 import numpy as np
 from .pybullet_simulation import run
 from basics.scenarios import *
+from STL.robustness import OnlineRobustnessMonitor
 
-def simulate(pars, scenario, all_x):
+def simulate(pars, scenario, all_x, flight_specs=None):
     """
     Animates the final trajectory simulation.
 
@@ -18,6 +19,9 @@ def simulate(pars, scenario, all_x):
     all_x : ndarray
         Array of waypoints with shape (n_dimensions, n_timesteps).
         The first three rows correspond to x, y, z positions of the waypoints.
+    flight_specs : list, optional
+        The (specification AST, first time step) of every segment of all_x. If given, and
+        online_monitor_enabled is set, the specifications are monitored online on the flown states.
 
     Notes:
     -----
@@ -42,13 +46,22 @@ def simulate(pars, scenario, all_x):
 
                 INIT_RPYS = np.array([[0, 0, 0]])
 
+                # Monitor the specifications on the states at the time steps of the trajectory
+                monitors = []
+                if flight_specs and pars.online_monitor_enabled:
+                    monitors = [OnlineRobustnessMonitor(spec_ast, pars.robustness_tolerance, start=first_step)
+                                for spec_ast, first_step in flight_specs]
+
                 # start simulation when the user presses enter
                 input("Press Enter to start the simulation.")
 
                 run(waypoints=TARGET_POS, 
                 initial_rpys=INIT_RPYS,    
                 scenario=scenario,
-                save_animation=pars.save_animation)
+                save_animation=pars.save_animation,
+                monitors=monitors,
+                monitor_every=N_extra_points+1,
+                near_margin=pars.scene_near_margin)
 
             except Exception as e:
                 print(color_text(f"Failed to animate the final trajectory: {e}", 'yellow'))
\ No newline at end of file
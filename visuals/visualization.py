@@ -16,6 +16,10 @@ class Visualizer:
         Name of the scenario.
     objects : dict
         Dictionary containing object boundaries.
+    spatial_index : SpatialIndex
+        Spatial index over the objects of the scenario.
+    drawn_objects : list
+        Names of the objects that are drawn: all objects, or only the objects near the trajectory.
     dt : float
         Time step.
     dT : float
@@ -27,7 +31,7 @@ class Visualizer:
     N : int
         Total number of time steps.
     """
-    def __init__(self, x, scenario): 
+    def __init__(self, x, scenario, near_margin=None): 
         """
         Initialize the Visualizer object.
 
@@ -39,10 +43,14 @@ class Visualizer:
             The scenario object containing objects and scenario name.
         animate : bool, optional
             Whether to enable animation (default is False).
+        near_margin : float, optional
+            If given, only the objects within this distance (per axis) of the trajectory are drawn, found with the
+            spatial index, e.g. for large maps (default is None, which draws all objects).
         """
         self.x = x[:3, :]                               # waypoints (only positions)
         self.scenario_name = scenario.scenario_name     # scenario name
         self.objects = scenario.objects                 # objects
+        self.spatial_index = scenario.spatial_index     # spatial index over the objects
         self.dt = 0.05                                  # time step
         self.dT = 1                                     # time to reach target
         n = int(self.dT/self.dt)                        # number of time steps between two targets
@@ -50,6 +58,8 @@ class Visualizer:
         self.times = np.linspace(0, self.dT, n)         # time array
         T = (self.n_points-1)*self.dT                   # total time
         self.N = int(T/self.dt)                         # number of time steps
+        self.drawn_objects = list(self.objects) if near_margin is None \
+            else self.get_objects_near_trajectory(near_margin) # objects that are drawn
     
     def visualize_trajectory(self):
         """
@@ -88,7 +98,7 @@ class Visualizer:
         """
         Visualize objects specific to the 'reach_avoid' scenario.
         """
-        for object in self.objects:
+        for object in self.drawn_objects:
             center, length, width, height = self.get_clwh(object)
             X, Y, Z = self.make_cuboid(center, (length, width, height))
             color = 'r' if 'obstacle' in object else '#28d778' # red for obstacles, green for goals
@@ -121,7 +131,7 @@ class Visualizer:
             'bounds': 0.02,
         }
 
-        for object in self.objects:
+        for object in self.drawn_objects:
             # Determine the object type
             keywords = ['key', 'wall', 'chest', 'door', 'bounds']
             for keyword in keywords:
@@ -148,6 +158,25 @@ class Visualizer:
         ax.set_ylim(-4.5, 4.5)
         ax.set_zlim(0, 6.4)
 
+    def get_objects_near_trajectory(self, margin=0.5):
+        """
+        Get the objects that the straight segments between the waypoints pass within a margin of.
+
+        Parameters
+        ----------
+        margin : float, optional
+            Distance per axis within which an object counts as near (default is 0.5).
+
+        Returns
+        -------
+        list
+            Names of the objects near the trajectory, in the order of the scenario objects.
+        """
+        near = set()
+        for j in range(max(self.n_points - 1, 1)):
+            near.update(self.spatial_index.query_segment(self.x[:,j], self.x[:,min(j + 1, self.n_points - 1)], margin))
+        return [object for object in self.objects if object in near]
+
     def get_clwh(self, object):
         """
         Get the center, length, width, and height of an object.